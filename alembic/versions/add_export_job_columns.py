@@ -0,0 +1,42 @@
+"""add export job columns
+
+Revision ID: add_export_job_columns
+Revises: create_sensor_readings_table
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_export_job_columns'
+down_revision = 'create_sensor_readings_table'
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = (
+    ('params', '导出参数（JSON），后台任务据此生成文件'),
+    ('file_path', '导出文件路径'),
+    ('error_message', '失败原因'),
+    ('cache_key', '导出缓存键（规范化查询条件的哈希），为空表示不可缓存'),
+)
+
+
+def upgrade() -> None:
+    # 新建的库由 create_all 直接建出完整的表，这里只为旧表补充缺少的列
+    inspector = sa.inspect(op.get_bind())
+    existing = {column['name'] for column in inspector.get_columns('export_records')}
+    for name, comment in COLUMNS:
+        if name not in existing:
+            op.add_column('export_records', sa.Column(name, sa.Text(), nullable=True, comment=comment))
+
+    indexes = {index['name'] for index in inspector.get_indexes('export_records')}
+    if op.f('ix_export_records_cache_key') not in indexes:
+        op.create_index(op.f('ix_export_records_cache_key'), 'export_records', ['cache_key'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_export_records_cache_key'), table_name='export_records')
+    for name, _ in reversed(COLUMNS):
+        op.drop_column('export_records', name)
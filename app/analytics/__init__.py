@@ -0,0 +1,11 @@
+# 流式分析模块：在 Worker 进程中随每条传感器记录增量计算，不回扫原始数据
+from .energy import EnergyAccumulator, ENERGY_CHANNELS
+from .stats import RunningStats, LineStatsTracker, merge_stats
+
+__all__ = [
+    "EnergyAccumulator",
+    "ENERGY_CHANNELS",
+    "RunningStats",
+    "LineStatsTracker",
+    "merge_stats",
+]
@@ -0,0 +1,201 @@
+"""
+能耗累计：对各电流通道按采样间隔做梯形积分（电流 × 电压 × 功率因数 × 时间），
+在内存中维护每条生产线的累计电量，并按小时聚合待写入的增量。
+
+积分状态只存在于单个 Worker 进程内，同一 (生产线, 部件) 的记录必须全部由同一个 Worker 处理
+（见 app.mqtt.routing），否则各 Worker 看到的是交错的子序列，会各自对整个时间段积分导致重复计量。
+"""
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.latest_values import LatestValueCache
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# 参与能耗计算的电流通道（单位：A）
+ENERGY_CHANNELS = (
+    "current_body_zone1",
+    "current_body_zone2",
+    "current_body_zone3",
+    "current_body_zone4",
+    "current_flange_zone1",
+    "current_flange_zone2",
+    "current_mold_zone1",
+    "current_mold_zone2",
+    "motor_current",
+)
+
+# 1 kWh = 3.6e6 J
+_JOULES_PER_KWH = 3.6e6
+
+# 运行累计电量在共享内存表中使用的部件键（每条生产线一个槽位）
+RUNNING_TOTAL_COMPONENT = "energy_total"
+
+
+def parse_timestamp(value: Any) -> datetime:
+    """解析记录中的时间戳（datetime 或 ISO 字符串）"""
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+def hour_bucket(value: datetime) -> datetime:
+    """向下取整到小时"""
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+class EnergyAccumulator:
+    """
+    单个 Worker 进程内的能耗累加器
+
+    - add_sample: 每条记录 O(通道数) 更新，按 (生产线, 部件) 分别积分，按上一采样点所在小时归档增量
+    - totals: 进程启动以来每条生产线、每个通道的累计 kWh
+    - drain: 取出尚未写库的按小时增量，由调用方写入 energy_hourly 表
+    """
+
+    def __init__(
+        self,
+        default_voltage: float = 380.0,
+        channel_voltages: Optional[Dict[str, float]] = None,
+        power_factor: float = 1.0,
+        max_gap_seconds: float = 10.0,
+        flush_interval_seconds: float = 60.0,
+    ):
+        self.voltages = {
+            channel: (channel_voltages or {}).get(channel, default_voltage)
+            for channel in ENERGY_CHANNELS
+        }
+        self.power_factor = power_factor
+        self.max_gap_seconds = max_gap_seconds
+        self.flush_interval_seconds = flush_interval_seconds
+
+        # (line_id, component_id) -> (上一采样时间, {通道: 电流})
+        self._last: Dict[Tuple[str, str], Tuple[datetime, Dict[str, float]]] = {}
+        # line_id -> {通道: 累计 kWh}
+        self.totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        # line_id -> 最近一次积分的采样时间
+        self.updated_at: Dict[str, datetime] = {}
+        # (小时, line_id, 通道) -> [kWh 增量, 积分秒数]
+        self._pending: Dict[Tuple[datetime, str, str], List[float]] = {}
+        self._last_flush = time.monotonic()
+
+    @classmethod
+    def from_settings(cls) -> "EnergyAccumulator":
+        """按全局配置创建累加器"""
+        from app.core.config import settings
+
+        return cls(
+            default_voltage=settings.ENERGY_DEFAULT_VOLTAGE,
+            channel_voltages=settings.ENERGY_CHANNEL_VOLTAGES,
+            power_factor=settings.ENERGY_POWER_FACTOR,
+            max_gap_seconds=settings.ENERGY_MAX_GAP_SECONDS,
+            flush_interval_seconds=settings.ENERGY_FLUSH_INTERVAL_SECONDS,
+        )
+
+    def add_sample(self, record: Dict[str, Any]) -> None:
+        """累加一条传感器记录"""
+        line_id = record.get("line_id")
+        if not line_id or record.get("timestamp") is None:
+            return
+
+        ts = parse_timestamp(record["timestamp"])
+        currents = {
+            channel: float(record[channel])
+            for channel in ENERGY_CHANNELS
+            if record.get(channel) is not None
+        }
+        if not currents:
+            return
+
+        # 同一生产线的不同部件各自是独立的采样序列
+        key = (line_id, record.get("component_id") or "")
+        previous = self._last.get(key)
+        if previous is not None and ts <= previous[0]:
+            # 乱序或重复记录不参与积分，也不回退状态
+            return
+        self._last[key] = (ts, currents)
+        if previous is None:
+            return
+
+        prev_ts, prev_currents = previous
+        dt = (ts - prev_ts).total_seconds()
+        if dt > self.max_gap_seconds:
+            # 采样中断期间的能耗未知，不做积分
+            return
+
+        hour = hour_bucket(prev_ts)
+        line_totals = self.totals[line_id]
+        self.updated_at[line_id] = ts
+        for channel, current in currents.items():
+            prev_current = prev_currents.get(channel)
+            if prev_current is None:
+                continue
+            watts = self.voltages[channel] * self.power_factor * (prev_current + current) / 2
+            kwh = watts * dt / _JOULES_PER_KWH
+            line_totals[channel] += kwh
+
+            pending = self._pending.setdefault((hour, line_id, channel), [0.0, 0.0])
+            pending[0] += kwh
+            pending[1] += dt
+
+    def should_flush(self) -> bool:
+        """是否到达写库间隔"""
+        return bool(self._pending) and time.monotonic() - self._last_flush >= self.flush_interval_seconds
+
+    def drain(self) -> List[Tuple[datetime, str, str, float, float]]:
+        """取出待写库的增量 [(小时, line_id, 通道, kWh, 秒数)] 并清空"""
+        rows = [
+            (hour, line_id, channel, kwh, seconds)
+            for (hour, line_id, channel), (kwh, seconds) in self._pending.items()
+        ]
+        self._pending = {}
+        self._last_flush = time.monotonic()
+        return rows
+
+    def restore(self, rows: List[Tuple[datetime, str, str, float, float]]) -> None:
+        """写库失败时把增量放回，下次一并写入"""
+        for hour, line_id, channel, kwh, seconds in rows:
+            pending = self._pending.setdefault((hour, line_id, channel), [0.0, 0.0])
+            pending[0] += kwh
+            pending[1] += seconds
+
+    def line_total_kwh(self, line_id: str) -> float:
+        """进程启动以来某条生产线的累计电量"""
+        return sum(self.totals.get(line_id, {}).values())
+
+    def publish(self, cache: LatestValueCache, line_id: str) -> None:
+        """把某条生产线的运行累计电量写入共享内存，供 API 进程读取"""
+        if line_id not in self.updated_at:
+            return
+        cache.put({
+            "line_id": line_id,
+            "component_id": RUNNING_TOTAL_COMPONENT,
+            "timestamp": self.updated_at[line_id],
+            **self.totals[line_id],
+        })
+
+
+# API 进程中的全局实例，由 MQTT 管理器启动时创建；每条生产线只由负责它的 Worker 写入
+energy_totals_cache: Optional[LatestValueCache] = None
+
+
+def init_energy_totals_cache() -> LatestValueCache:
+    """创建全局运行累计电量表（幂等）"""
+    from app.core.config import settings
+
+    global energy_totals_cache
+    if energy_totals_cache is None:
+        energy_totals_cache = LatestValueCache(ENERGY_CHANNELS, slots=settings.LATEST_VALUE_CACHE_SLOTS)
+        logger.info(f"Energy totals cache initialized: {energy_totals_cache.name}")
+    return energy_totals_cache
+
+
+def close_energy_totals_cache() -> None:
+    """释放全局运行累计电量表"""
+    global energy_totals_cache
+    if energy_totals_cache is not None:
+        energy_totals_cache.close()
+        energy_totals_cache = None
@@ -0,0 +1,128 @@
+"""
+生产批次跟踪：按 (生产线, 批次号) 累计起止时间、记录数和直径/长度摘要，
+批次号变化或到达写库间隔时产出增量，由调用方合并写入 production_runs 表。
+"""
+import math
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.analytics.energy import parse_timestamp
+
+
+class RunDelta:
+    """单个 (生产线, 批次) 自上次写库以来的增量"""
+
+    __slots__ = (
+        "start_ts", "end_ts", "row_count",
+        "diameter_count", "diameter_sum", "diameter_min", "diameter_max",
+        "max_length", "target_length",
+    )
+
+    def __init__(self, ts: datetime):
+        self.start_ts = ts
+        self.end_ts = ts
+        self.row_count = 0
+        self.diameter_count = 0
+        self.diameter_sum = 0.0
+        self.diameter_min = math.inf
+        self.diameter_max = -math.inf
+        self.max_length: Optional[float] = None
+        self.target_length: Optional[float] = None
+
+    def add(self, ts: datetime, record: Dict[str, Any]) -> None:
+        if ts < self.start_ts:
+            self.start_ts = ts
+        if ts > self.end_ts:
+            self.end_ts = ts
+        self.row_count += 1
+
+        diameter = record.get("diameter")
+        if diameter is not None:
+            diameter = float(diameter)
+            self.diameter_count += 1
+            self.diameter_sum += diameter
+            self.diameter_min = min(self.diameter_min, diameter)
+            self.diameter_max = max(self.diameter_max, diameter)
+
+        length = record.get("current_length")
+        if length is not None and (self.max_length is None or length > self.max_length):
+            self.max_length = float(length)
+        if record.get("target_length") is not None:
+            self.target_length = float(record["target_length"])
+
+    def merge(self, other: "RunDelta") -> None:
+        """合并另一份增量（写库失败后放回时使用）"""
+        self.start_ts = min(self.start_ts, other.start_ts)
+        self.end_ts = max(self.end_ts, other.end_ts)
+        self.row_count += other.row_count
+        self.diameter_count += other.diameter_count
+        self.diameter_sum += other.diameter_sum
+        self.diameter_min = min(self.diameter_min, other.diameter_min)
+        self.diameter_max = max(self.diameter_max, other.diameter_max)
+        if other.max_length is not None and (self.max_length is None or other.max_length > self.max_length):
+            self.max_length = other.max_length
+        if other.target_length is not None:
+            self.target_length = other.target_length
+
+
+class ProductionRunTracker:
+    """
+    Worker 进程内的批次跟踪
+
+    - update: 每条记录 O(1) 累加到 (生产线, 批次) 的增量，返回该生产线批次号是否发生变化
+    - drain: 取出全部增量并清空；同一批次可能由多个 Worker 写入，合并在写库时完成
+    """
+
+    def __init__(self, flush_interval_seconds: float = 30.0):
+        self.flush_interval_seconds = flush_interval_seconds
+        # line_id -> 当前批次号
+        self.current_batch: Dict[str, str] = {}
+        # (line_id, 批次号) -> 增量
+        self._pending: Dict[Tuple[str, str], RunDelta] = {}
+        self._last_flush = time.monotonic()
+
+    @classmethod
+    def from_settings(cls) -> "ProductionRunTracker":
+        """按全局配置创建"""
+        from app.core.config import settings
+
+        return cls(flush_interval_seconds=settings.PRODUCTION_RUN_FLUSH_INTERVAL_SECONDS)
+
+    def update(self, record: Dict[str, Any]) -> bool:
+        """累加一条传感器记录，返回批次号是否变化（变化时调用方应立即写库）"""
+        line_id = record.get("line_id")
+        batch = record.get("batch_product_number")
+        if not line_id or not batch or record.get("timestamp") is None:
+            return False
+
+        ts = parse_timestamp(record["timestamp"])
+        key = (line_id, batch)
+        delta = self._pending.get(key)
+        if delta is None:
+            delta = self._pending[key] = RunDelta(ts)
+        delta.add(ts, record)
+
+        previous = self.current_batch.get(line_id)
+        self.current_batch[line_id] = batch
+        return previous is not None and previous != batch
+
+    def should_flush(self) -> bool:
+        """是否到达写库间隔"""
+        return bool(self._pending) and time.monotonic() - self._last_flush >= self.flush_interval_seconds
+
+    def drain(self) -> List[Tuple[str, str, RunDelta]]:
+        """取出待写库的增量 [(line_id, 批次号, 增量)] 并清空"""
+        rows = [(line_id, batch, delta) for (line_id, batch), delta in self._pending.items()]
+        self._pending = {}
+        self._last_flush = time.monotonic()
+        return rows
+
+    def restore(self, rows: List[Tuple[str, str, RunDelta]]) -> None:
+        """写库失败时把增量放回，下次一并写入"""
+        for line_id, batch, delta in rows:
+            pending = self._pending.get((line_id, batch))
+            if pending is None:
+                self._pending[(line_id, batch)] = delta
+            else:
+                pending.merge(delta)
@@ -0,0 +1,298 @@
+"""
+统计过程控制（SPC）：按 (生产线, 部件, 批次, 参数) 增量计算 X-bar/R、EWMA 和 CUSUM 控制图，
+并对子组均值检查 Western Electric 判异规则。每个样本的计算量为 O(1)。
+
+控制限来自前若干个子组（基线阶段）的总均值和平均极差，基线确定后冻结；
+批次（batch_product_number）变化时对该生产线/部件重新建立基线。
+
+控制图只适用于围绕稳定均值波动的信号。单调累加的计数器（如 current_length）不能直接作图，
+可配置为 "<参数>_rate"，按相邻两个样本的每秒变化量作图（计数器回退视为换卷，跳过该样本）；
+基线极差为 0 的参数（如设定值 target_length）无法给出有意义的控制限，不做判异。
+"""
+import math
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.analytics.energy import parse_timestamp
+
+# 派生参数后缀：按相邻样本的每秒变化量作图
+RATE_SUFFIX = "_rate"
+
+# 子组大小 -> (A2, D3, D4, d2)
+_XBAR_R_CONSTANTS = {
+    2: (1.880, 0.0, 3.267, 1.128),
+    3: (1.023, 0.0, 2.574, 1.693),
+    4: (0.729, 0.0, 2.282, 2.059),
+    5: (0.577, 0.0, 2.114, 2.326),
+    6: (0.483, 0.0, 2.004, 2.534),
+    7: (0.419, 0.076, 1.924, 2.704),
+    8: (0.373, 0.136, 1.864, 2.847),
+    9: (0.337, 0.184, 1.816, 2.970),
+    10: (0.308, 0.223, 1.777, 3.078),
+}
+
+
+class SpcViolation(NamedTuple):
+    """一次判异结果"""
+    timestamp: datetime
+    line_id: str
+    parameter: str
+    value: float
+    code: str
+    message: str
+
+
+class SpcChart:
+    """单个 (生产线, 批次, 参数) 的控制图状态"""
+
+    __slots__ = (
+        "subgroup_size", "baseline_subgroups", "ewma_lambda", "ewma_l", "cusum_k", "cusum_h",
+        "_subgroup_sum", "_subgroup_count", "_subgroup_min", "_subgroup_max",
+        "_baseline_count", "_baseline_mean_sum", "_baseline_range_sum",
+        "center", "mean_range", "sigma", "_zones",
+        "ewma", "_ewma_n", "_ewma_out", "cusum_high", "cusum_low",
+    )
+
+    def __init__(
+        self,
+        subgroup_size: int = 5,
+        baseline_subgroups: int = 20,
+        ewma_lambda: float = 0.2,
+        ewma_l: float = 3.0,
+        cusum_k: float = 0.5,
+        cusum_h: float = 5.0,
+    ):
+        if subgroup_size not in _XBAR_R_CONSTANTS:
+            raise ValueError(f"子组大小必须在 2-10 之间: {subgroup_size}")
+        self.subgroup_size = subgroup_size
+        self.baseline_subgroups = baseline_subgroups
+        self.ewma_lambda = ewma_lambda
+        self.ewma_l = ewma_l
+        self.cusum_k = cusum_k
+        self.cusum_h = cusum_h
+
+        self._reset_subgroup()
+        self._baseline_count = 0
+        self._baseline_mean_sum = 0.0
+        self._baseline_range_sum = 0.0
+
+        # 基线确定后的控制图参数
+        self.center: Optional[float] = None
+        self.mean_range: Optional[float] = None
+        self.sigma: Optional[float] = None   # 过程标准差估计 R̄/d2
+        # 最近 8 个子组均值所在区域（带符号，±1/±2/±3，0 表示恰在中心线）
+        self._zones: Deque[int] = deque(maxlen=8)
+
+        self.ewma: Optional[float] = None
+        self._ewma_n = 0
+        # EWMA 当前是否处于失控状态：只在受控 -> 失控时报警
+        self._ewma_out = False
+        self.cusum_high = 0.0
+        self.cusum_low = 0.0
+
+    def _reset_subgroup(self) -> None:
+        self._subgroup_sum = 0.0
+        self._subgroup_count = 0
+        self._subgroup_min = math.inf
+        self._subgroup_max = -math.inf
+
+    @property
+    def ready(self) -> bool:
+        """基线是否已经确定"""
+        return self.center is not None
+
+    def limits(self) -> Optional[Dict[str, float]]:
+        """当前 X-bar/R 控制限"""
+        if not self.ready:
+            return None
+        a2, d3, d4, _ = _XBAR_R_CONSTANTS[self.subgroup_size]
+        return {
+            "center": self.center,
+            "xbar_ucl": self.center + a2 * self.mean_range,
+            "xbar_lcl": self.center - a2 * self.mean_range,
+            "r_center": self.mean_range,
+            "r_ucl": d4 * self.mean_range,
+            "r_lcl": d3 * self.mean_range,
+        }
+
+    def update(self, value: float) -> List[Tuple[str, str]]:
+        """加入一个样本，返回触发的 [(规则代码, 说明)]"""
+        violations: List[Tuple[str, str]] = []
+        if self.ready and self.sigma > 0:
+            # sigma 为 0（基线阶段取值恒定）时无法判异
+            violations.extend(self._check_individual(value))
+
+        self._subgroup_sum += value
+        self._subgroup_count += 1
+        if value < self._subgroup_min:
+            self._subgroup_min = value
+        if value > self._subgroup_max:
+            self._subgroup_max = value
+
+        if self._subgroup_count == self.subgroup_size:
+            xbar = self._subgroup_sum / self.subgroup_size
+            sample_range = self._subgroup_max - self._subgroup_min
+            self._reset_subgroup()
+            if self.ready and self.sigma > 0:
+                violations.extend(self._check_subgroup(xbar, sample_range))
+            else:
+                self._add_baseline(xbar, sample_range)
+        return violations
+
+    def _add_baseline(self, xbar: float, sample_range: float) -> None:
+        self._baseline_count += 1
+        self._baseline_mean_sum += xbar
+        self._baseline_range_sum += sample_range
+        if self._baseline_count >= self.baseline_subgroups:
+            self.center = self._baseline_mean_sum / self._baseline_count
+            self.mean_range = self._baseline_range_sum / self._baseline_count
+            self.sigma = self.mean_range / _XBAR_R_CONSTANTS[self.subgroup_size][3]
+
+    def _check_individual(self, value: float) -> List[Tuple[str, str]]:
+        """EWMA 和 CUSUM 对单个样本判异"""
+        violations = []
+
+        lam = self.ewma_lambda
+        # EWMA 从中心线开始（z0 = 中心线），否则基线后的第一个正常样本就会超限
+        previous = self.center if self.ewma is None else self.ewma
+        self.ewma = lam * value + (1 - lam) * previous
+        self._ewma_n += 1
+        width = self.ewma_l * self.sigma * math.sqrt(lam / (2 - lam) * (1 - (1 - lam) ** (2 * self._ewma_n)))
+        out = abs(self.ewma - self.center) > width
+        if out and not self._ewma_out:
+            violations.append(("SPC_EWMA", f"EWMA={self.ewma:.4g} 超出控制限 {self.center:.4g}±{width:.4g}"))
+        self._ewma_out = out
+
+        k = self.cusum_k * self.sigma
+        h = self.cusum_h * self.sigma
+        self.cusum_high = max(0.0, self.cusum_high + value - self.center - k)
+        self.cusum_low = max(0.0, self.cusum_low + self.center - value - k)
+        if self.cusum_high > h or self.cusum_low > h:
+            direction = "向上" if self.cusum_high > h else "向下"
+            violations.append(("SPC_CUSUM", f"CUSUM 检测到{direction}偏移"))
+            # 报警后重新累计，避免同一次偏移持续报警
+            self.cusum_high = 0.0
+            self.cusum_low = 0.0
+        return violations
+
+    def _check_subgroup(self, xbar: float, sample_range: float) -> List[Tuple[str, str]]:
+        """X-bar/R 图判异（Western Electric 规则 1-4 + 极差超限）"""
+        violations = []
+        limits = self.limits()
+        if sample_range > limits["r_ucl"] or sample_range < limits["r_lcl"]:
+            violations.append(("SPC_R", f"子组极差 {sample_range:.4g} 超出 R 图控制限"))
+
+        sigma_xbar = self.sigma / math.sqrt(self.subgroup_size)
+        deviation = (xbar - self.center) / sigma_xbar
+        zone = min(3, int(abs(deviation)) + 1) if deviation else 0
+        self._zones.append(int(math.copysign(zone, deviation)) if zone else 0)
+        zones = self._zones
+
+        if abs(deviation) > 3:
+            violations.append(("SPC_WE1", f"子组均值 {xbar:.4g} 超出 3σ 控制限"))
+        elif _same_side_count(zones, 3, 3) >= 2:
+            violations.append(("SPC_WE2", "连续 3 个子组均值中有 2 个超出 2σ"))
+        elif _same_side_count(zones, 5, 2) >= 4:
+            violations.append(("SPC_WE3", "连续 5 个子组均值中有 4 个超出 1σ"))
+        elif len(zones) == zones.maxlen and (all(z > 0 for z in zones) or all(z < 0 for z in zones)):
+            violations.append(("SPC_WE4", "连续 8 个子组均值位于中心线同一侧"))
+        return violations
+
+
+def _same_side_count(zones: Deque[int], window: int, min_zone: int) -> int:
+    """最近 window 个子组中，与最新子组同侧且区域不低于 min_zone 的个数"""
+    if len(zones) < window or abs(zones[-1]) < min_zone:
+        return 0
+    sign = 1 if zones[-1] > 0 else -1
+    return sum(1 for i in range(1, window + 1) if zones[-i] * sign >= min_zone)
+
+
+class SpcMonitor:
+    """
+    Worker 进程内的 SPC 监控
+
+    每个 (生产线, 部件) 只保留当前批次的控制图；批次变化时丢弃旧批次状态并重新建立基线。
+    """
+
+    def __init__(self, parameters: Iterable[str], **chart_options: Any):
+        self.parameters = tuple(parameters)
+        self.chart_options = chart_options
+        # (line_id, component_id) -> (批次号, {参数: 控制图})
+        self._lines: Dict[Tuple[str, str], Tuple[Optional[str], Dict[str, SpcChart]]] = {}
+        # (line_id, component_id) -> (上一样本时间, {参数: 值})，用于 _rate 派生参数
+        self._previous: Dict[Tuple[str, str], Tuple[datetime, Dict[str, float]]] = {}
+
+    @classmethod
+    def from_settings(cls) -> "SpcMonitor":
+        """按全局配置创建"""
+        from app.core.config import settings
+
+        return cls(
+            parameters=settings.SPC_PARAMETERS,
+            subgroup_size=settings.SPC_SUBGROUP_SIZE,
+            baseline_subgroups=settings.SPC_BASELINE_SUBGROUPS,
+            ewma_lambda=settings.SPC_EWMA_LAMBDA,
+            ewma_l=settings.SPC_EWMA_L,
+            cusum_k=settings.SPC_CUSUM_K,
+            cusum_h=settings.SPC_CUSUM_H,
+        )
+
+    def update(self, record: Dict[str, Any]) -> List[SpcViolation]:
+        """用一条传感器记录更新控制图，返回判异结果"""
+        line_id = record.get("line_id")
+        if not line_id or record.get("timestamp") is None:
+            return []
+
+        key = (line_id, record.get("component_id") or "")
+        batch = record.get("batch_product_number")
+        entry = self._lines.get(key)
+        if entry is None or entry[0] != batch:
+            entry = (batch, {})
+            self._lines[key] = entry
+        charts = entry[1]
+
+        ts = parse_timestamp(record["timestamp"])
+        signals = self._signals(key, ts, record)
+        violations: List[SpcViolation] = []
+        for parameter in self.parameters:
+            value = signals.get(parameter)
+            if value is None:
+                continue
+            chart = charts.get(parameter)
+            if chart is None:
+                chart = charts[parameter] = SpcChart(**self.chart_options)
+            for code, message in chart.update(float(value)):
+                violations.append(SpcViolation(ts, line_id, parameter, float(value), code, message))
+        return violations
+
+    def _signals(self, key: Tuple[str, str], ts: datetime, record: Dict[str, Any]) -> Dict[str, float]:
+        """本条记录中各控制图参数的取值（含 _rate 派生参数）"""
+        signals: Dict[str, float] = {}
+        current: Dict[str, float] = {}
+        previous = self._previous.get(key)
+        for parameter in self.parameters:
+            if not parameter.endswith(RATE_SUFFIX):
+                if record.get(parameter) is not None:
+                    signals[parameter] = float(record[parameter])
+                continue
+
+            base = parameter[:-len(RATE_SUFFIX)]
+            if record.get(base) is None:
+                continue
+            value = current[base] = float(record[base])
+            if previous is None or base not in previous[1]:
+                continue
+            dt = (ts - previous[0]).total_seconds()
+            delta = value - previous[1][base]
+            # 乱序、重复或计数器回退（换卷）时不作图
+            if dt > 0 and delta >= 0:
+                signals[parameter] = delta / dt
+        if current:
+            self._previous[key] = (ts, current)
+        return signals
+
+    def get_chart(self, line_id: str, parameter: str, component_id: Optional[str] = None) -> Optional[SpcChart]:
+        """读取某条生产线/部件当前批次的控制图"""
+        entry = self._lines.get((line_id, component_id or ""))
+        return entry[1].get(parameter) if entry else None
@@ -0,0 +1,166 @@
+"""
+滚动统计：每条记录 O(1) 更新每个 (生产线, 参数) 的计数、均值、方差（Welford）、最值和 EWMA，
+按固定时间窗口（默认 1 小时）滚动，供快照写库后直接读取。
+"""
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.analytics.energy import parse_timestamp
+
+
+class RunningStats:
+    """单个参数的增量统计量（Welford 算法 + EWMA）"""
+
+    __slots__ = ("count", "mean", "m2", "min", "max", "ewma", "last_ts")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.ewma: Optional[float] = None
+        self.last_ts: Optional[datetime] = None
+
+    def update(self, value: float, alpha: float, ts: Optional[datetime] = None) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.ewma = value if self.ewma is None else alpha * value + (1 - alpha) * self.ewma
+        self.last_ts = ts
+
+    @property
+    def variance(self) -> Optional[float]:
+        """样本方差，少于两个样本时为 None"""
+        return self.m2 / (self.count - 1) if self.count > 1 else None
+
+    @property
+    def std(self) -> Optional[float]:
+        variance = self.variance
+        return math.sqrt(variance) if variance is not None else None
+
+
+def merge_stats(a: RunningStats, b: RunningStats) -> RunningStats:
+    """
+    合并两组统计量（Chan 并行算法），用于合并多个 Worker 各自的快照
+    EWMA 取最近更新的一方
+    """
+    if a.count == 0:
+        return b
+    if b.count == 0:
+        return a
+
+    merged = RunningStats()
+    merged.count = a.count + b.count
+    delta = b.mean - a.mean
+    merged.mean = a.mean + delta * b.count / merged.count
+    merged.m2 = a.m2 + b.m2 + delta * delta * a.count * b.count / merged.count
+    merged.min = min(a.min, b.min)
+    merged.max = max(a.max, b.max)
+    newer = b if (b.last_ts or datetime.min) >= (a.last_ts or datetime.min) else a
+    merged.ewma = newer.ewma
+    merged.last_ts = newer.last_ts
+    return merged
+
+
+def window_start(ts: datetime, window_seconds: int) -> datetime:
+    """按窗口长度向下对齐（相对当天零点）"""
+    midnight = ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    offset = int((ts - midnight).total_seconds()) // window_seconds * window_seconds
+    return midnight + timedelta(seconds=offset)
+
+
+class LineStatsTracker:
+    """
+    Worker 进程内的 (生产线, 参数) 滚动统计
+
+    每个键只保留当前窗口的 RunningStats；样本进入新窗口时当前窗口归档（保持脏标记等待快照），
+    EWMA 跨窗口延续。
+    """
+
+    def __init__(
+        self,
+        parameters: Iterable[str],
+        window_seconds: int = 3600,
+        ewma_alpha: float = 0.1,
+        snapshot_interval_seconds: float = 10.0,
+    ):
+        self.parameters = tuple(parameters)
+        self.window_seconds = window_seconds
+        self.ewma_alpha = ewma_alpha
+        self.snapshot_interval_seconds = snapshot_interval_seconds
+
+        # (line_id, parameter) -> (窗口开始时间, 统计量)
+        self.current: Dict[Tuple[str, str], Tuple[datetime, RunningStats]] = {}
+        # 等待写库的 (窗口开始时间, line_id, parameter) -> 统计量
+        self._dirty: Dict[Tuple[datetime, str, str], RunningStats] = {}
+        self._last_snapshot = time.monotonic()
+
+    @classmethod
+    def from_settings(cls) -> "LineStatsTracker":
+        """按全局配置创建，跟踪全部数值型参数"""
+        from app.core.config import settings
+        from app.models.sensor_data import PARAMETER_COLUMNS
+
+        return cls(
+            parameters=PARAMETER_COLUMNS,
+            window_seconds=settings.STATS_WINDOW_SECONDS,
+            ewma_alpha=settings.STATS_EWMA_ALPHA,
+            snapshot_interval_seconds=settings.STATS_SNAPSHOT_INTERVAL_SECONDS,
+        )
+
+    def update(self, record: Dict[str, Any]) -> None:
+        """用一条传感器记录更新全部参数的统计量"""
+        line_id = record.get("line_id")
+        if not line_id or record.get("timestamp") is None:
+            return
+
+        ts = parse_timestamp(record["timestamp"])
+        start = window_start(ts, self.window_seconds)
+        for parameter in self.parameters:
+            value = record.get(parameter)
+            if value is None:
+                continue
+
+            key = (line_id, parameter)
+            entry = self.current.get(key)
+            if entry is None or start > entry[0]:
+                stats = RunningStats()
+                if entry is not None:
+                    stats.ewma = entry[1].ewma
+                entry = (start, stats)
+                self.current[key] = entry
+            elif start < entry[0]:
+                # 迟到的上一窗口数据不再计入
+                continue
+
+            entry[1].update(float(value), self.ewma_alpha, ts)
+            self._dirty[(entry[0], line_id, parameter)] = entry[1]
+
+    def get(self, line_id: str, parameter: str) -> Optional[RunningStats]:
+        """读取当前窗口统计量（O(1)）"""
+        entry = self.current.get((line_id, parameter))
+        return entry[1] if entry else None
+
+    def should_snapshot(self) -> bool:
+        """是否到达快照间隔"""
+        return bool(self._dirty) and time.monotonic() - self._last_snapshot >= self.snapshot_interval_seconds
+
+    def drain(self) -> List[Tuple[datetime, str, str, RunningStats]]:
+        """取出自上次快照以来有变化的统计量"""
+        rows = [(start, line_id, parameter, stats) for (start, line_id, parameter), stats in self._dirty.items()]
+        self._dirty = {}
+        self._last_snapshot = time.monotonic()
+        return rows
+
+    def restore(self, rows: List[Tuple[datetime, str, str, RunningStats]]) -> None:
+        """写库失败时重新标记为待写入"""
+        for start, line_id, parameter, stats in rows:
+            self._dirty.setdefault((start, line_id, parameter), stats)
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 from app.api.v1.endpoints import users, auth, sensor_data, websocket, alarm_rules, alarm_records, production_lines, export_record, audit_log
-from app.api.v1.endpoints import mqtt
+from app.api.v1.endpoints import mqtt, energy, production_runs
 
 api_router = APIRouter()
 
@@ -9,6 +9,8 @@ api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(users.router, prefix="/users", tags=["users management"])
 api_router.include_router(production_lines.router, prefix="/production-lines", tags=["production lines"])
 api_router.include_router(sensor_data.router, prefix="/sensor-data", tags=["sensor data"])
+api_router.include_router(energy.router, prefix="/energy", tags=["energy"])
+api_router.include_router(production_runs.router, prefix="/production-runs", tags=["production runs"])
 api_router.include_router(alarm_rules.router, prefix="/alarm-rules", tags=["alarm rules"])
 api_router.include_router(alarm_records.router, prefix="/alarm-records", tags=["alarm records"])
 api_router.include_router(export_record.router, prefix="/export-records", tags=["export records"])
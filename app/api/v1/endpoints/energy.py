@@ -0,0 +1,49 @@
+from typing import Any
+from fastapi import APIRouter, Depends, HTTPException, Body
+from sqlalchemy.orm import Session
+from app.api import deps
+from app.analytics import energy as energy_analytics
+from app.schemas.energy import EnergyQuery, EnergyResponse, LineRunningEnergy, RunningEnergyResponse
+from app.services.energy_service import EnergyService
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+router = APIRouter()
+
+
+@router.post("/summary", response_model=EnergyResponse)
+def get_energy_summary(
+    db: Session = Depends(deps.get_db),
+    query: EnergyQuery = Body(...),
+) -> Any:
+    """
+    按生产线和电流通道统计能耗（kWh），数据来自 Worker 维护的小时能耗表。
+    """
+    if query.end_time <= query.start_time:
+        raise HTTPException(status_code=400, detail="结束时间必须晚于开始时间")
+
+    service = EnergyService(db)
+    return service.get_energy(query)
+
+
+@router.get("/running", response_model=RunningEnergyResponse)
+def get_running_energy() -> Any:
+    """
+    各生产线的运行累计电量（来自 Worker 维护的共享内存表，不访问数据库）。
+    Worker 重启后从 0 开始累计，历史电量请使用 /summary。
+    """
+    cache = energy_analytics.energy_totals_cache
+    if cache is None:
+        return RunningEnergyResponse(items=[])
+
+    items = []
+    for record, _ in cache.get_all():
+        zones = {channel: record[channel] for channel in energy_analytics.ENERGY_CHANNELS if record.get(channel) is not None}
+        items.append(LineRunningEnergy(
+            line_id=record["line_id"],
+            total_kwh=sum(zones.values()),
+            zones=zones,
+            updated_at=record["timestamp"] or None,
+        ))
+    return RunningEnergyResponse(items=sorted(items, key=lambda item: item.line_id))
@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import os
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Dict, Any
 from app.core.logging import get_logger
@@ -11,6 +13,8 @@ from app.schemas.export_record import (
     ExportRecordListResponse
 )
 from app.services.export_record_service import ExportRecordService
+from app.exporters import EXPORT_FORMATS
+from app.utils.http_range import parse_range_header, iter_file_range, RangeNotSatisfiable
 
 router = APIRouter()
 
@@ -57,3 +61,78 @@ def get_export_records(
             detail=f"获取导出记录失败: {str(e)}"
         )
 
+
+
+@router.get("/{export_id}", response_model=ExportRecordInDB)
+def get_export_record(
+    export_id: int,
+    db: Session = Depends(get_db),
+    current_user: Dict[str, Any] = Depends(get_current_active_user)
+):
+    """查询导出任务状态"""
+    record = ExportRecordService(db).get_export_record_by_id(export_id)
+    if not record:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="导出任务不存在")
+    return record
+
+
+@router.get("/{export_id}/download")
+def download_export_file(
+    export_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: Dict[str, Any] = Depends(get_current_active_user)
+):
+    """
+    下载导出文件，支持 Range 断点续传。
+    文件在任务完成时已生成（或来自导出缓存），重复下载直接读取文件，不再重新查询数据。
+    """
+    record = ExportRecordService(db).get_export_record_by_id(export_id)
+    if not record:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="导出任务不存在")
+    if record.status == 'expired':
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="导出文件已过期清理，请重新导出")
+    if record.status != 'completed':
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"导出任务尚未完成，当前状态: {record.status}")
+    if not record.file_path or not os.path.exists(record.file_path):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="导出文件已不存在，请重新导出")
+
+    size = os.path.getsize(record.file_path)
+    clean_line_ids = record.line_names.replace(',', '_').replace(' ', '_').replace('-', '_')
+    filename = (
+        f"sensor_data_export_{clean_line_ids}_{record.start_time.strftime('%Y%m%d%H%M%S')}"
+        f"_{record.end_time.strftime('%Y%m%d%H%M%S')}_{record.id}.{record.format}"
+    )
+    headers = {
+        "Content-Disposition": f"attachment; filename={filename}",
+        "Accept-Ranges": "bytes",
+        # 缓存文件以缓存键标识，多个导出记录共享同一个 ETag
+        "ETag": f'"{record.cache_key or record.id}-{size}"',
+    }
+
+    # If-Range 与当前文件不一致时忽略 Range，返回整个文件
+    if_range = request.headers.get("if-range")
+    range_header = request.headers.get("range") if not if_range or if_range == headers["ETag"] else None
+    try:
+        byte_range = parse_range_header(range_header, size)
+    except RangeNotSatisfiable:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="请求的字节范围无效",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+
+    media_type = EXPORT_FORMATS[record.format][1] if record.format in EXPORT_FORMATS else "application/octet-stream"
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(iter_file_range(record.file_path, 0, size - 1), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        iter_file_range(record.file_path, start, end),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=media_type,
+        headers=headers,
+    )
@@ -0,0 +1,26 @@
+from typing import Any
+from fastapi import APIRouter, Depends, HTTPException, Body
+from sqlalchemy.orm import Session
+from app.api import deps
+from app.schemas.production_run import ProductionRunQuery, ProductionRunResponse
+from app.services.production_run_service import ProductionRunService
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+router = APIRouter()
+
+
+@router.post("/list", response_model=ProductionRunResponse)
+def list_production_runs(
+    db: Session = Depends(deps.get_db),
+    query: ProductionRunQuery = Body(...),
+) -> Any:
+    """
+    查询生产批次（起止时间、记录数、直径/长度摘要），数据来自 Worker 维护的批次索引表。
+    """
+    if query.start_time and query.end_time and query.end_time <= query.start_time:
+        raise HTTPException(status_code=400, detail="结束时间必须晚于开始时间")
+
+    service = ProductionRunService(db)
+    return service.list_runs(query)
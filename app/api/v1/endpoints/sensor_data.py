@@ -4,13 +4,30 @@ from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
 from app import crud, schemas
 from app.api import deps
-from app.schemas.sensor_data import SensorDataFilter, SensorDataListResponse, UtilizationResponse, SensorDataExportFilter
+from app.schemas.sensor_data import (
+    SensorDataFilter, SensorDataListResponse, UtilizationResponse, SensorDataExportFilter, SensorDataStreamFormat,
+    SensorDataColumnsFilter, SensorDataColumnsResponse, SensorDataColumnsFormat,
+    UtilizationQuery, UtilizationDailyResponse, KpiQuery, KpiResponse
+)
 from app.services.audit_log_service import AuditLogService
 from app.services.export_record_service import ExportRecordService
+from app.services.export_job_service import export_job_manager
+from app.schemas.export_record import ExportRecordCreate, ExportRecordInDB
 from app.services.sensor_data_service import SensorDataService
+from app.services.utilization_service import UtilizationService
+from app.services.kpi_service import KpiService
+from app.services.sensor_stats_service import SensorStatsService
+from app.schemas.sensor_stats import SensorStatsQuery, SensorStatsResponse
+from app.utils.stream_encoders import (
+    NDJSON_MEDIA_TYPE, ARROW_STREAM_MEDIA_TYPE, is_arrow_available, encode_columns_json, encode_columns_arrow
+)
 from datetime import datetime
 import io
+import os
 from app.core.logging import get_logger
+from app.core import latest_values
+from app.exporters import EXPORT_FORMATS, check_format_available, export_cache_key, get_export_cache
+from app.core.config import settings
 
 logger = get_logger(__name__)
 
@@ -24,9 +41,74 @@ def list_sensor_data(
 ) -> Any:
     """
     Retrieve sensor data.
+    parameter_name 可传逗号分隔的参数列表，只返回这些参数列。
     """
     service = SensorDataService(db)
-    return service.list_sensor_data(filters)
+    try:
+        return service.list_sensor_data(filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/stream")
+def stream_sensor_data(
+    db: Session = Depends(deps.get_db),
+    filters: SensorDataFilter = Body(...),
+    format: SensorDataStreamFormat = Query("ndjson", description="输出格式: ndjson | arrow"),
+) -> Any:
+    """
+    流式返回传感器数据（NDJSON 或 Arrow IPC），大时间范围下内存占用恒定。
+    """
+    if format == "arrow" and not is_arrow_available():
+        raise HTTPException(status_code=400, detail="服务器未安装 pyarrow，无法输出 Arrow 格式")
+
+    service = SensorDataService(db)
+    try:
+        # 提前校验参数列，生成器开始执行后再报错就无法返回 400
+        service.resolve_parameter_names(filters.parameter_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return StreamingResponse(
+        service.stream_sensor_data(filters, format),
+        media_type=ARROW_STREAM_MEDIA_TYPE if format == "arrow" else NDJSON_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache"}
+    )
+
+@router.post("/columns", response_model=SensorDataColumnsResponse)
+def get_sensor_data_columns(
+    db: Session = Depends(deps.get_db),
+    filters: SensorDataColumnsFilter = Body(...),
+    format: SensorDataColumnsFormat = Query("json", description="输出格式: json | arrow"),
+) -> Any:
+    """
+    列式返回传感器数据：只查询指定参数列，返回 timestamps[] 与各参数数组（JSON 或 Arrow IPC），
+    适合图表客户端直接使用。
+    """
+    if format == "arrow" and not is_arrow_available():
+        raise HTTPException(status_code=400, detail="服务器未安装 pyarrow，无法输出 Arrow 格式")
+
+    service = SensorDataService(db)
+    try:
+        timestamps_ms, columns = service.get_sensor_data_columns(filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if format == "arrow":
+        return Response(content=encode_columns_arrow(timestamps_ms, columns), media_type=ARROW_STREAM_MEDIA_TYPE)
+    return Response(content=encode_columns_json(filters.line_id, timestamps_ms, columns), media_type="application/json")
+
+@router.get("/latest")
+def get_latest_sensor_data() -> Any:
+    """
+    获取所有生产线/组件的最新数据（来自 Worker 维护的共享内存缓存，不访问数据库）。
+    """
+    cache = latest_values.latest_value_cache
+    if cache is None:
+        return {"items": []}
+
+    return {
+        "items": [dict(record, alarms=alarms) for record, alarms in cache.get_all()]
+    }
 
 @router.post("/utilization", response_model=UtilizationResponse)
 def get_utilization(
@@ -39,29 +121,81 @@ def get_utilization(
     service = SensorDataService(db)
     return service.get_utilization(filters)
 
-@router.post("/export")
+@router.post("/utilization/daily", response_model=UtilizationDailyResponse)
+def get_daily_utilization(
+    db: Session = Depends(deps.get_db),
+    query: UtilizationQuery = Body(...),
+) -> Any:
+    """
+    一次查询返回多条生产线按天的运行/空闲/离线时间。
+    """
+    if query.end_time <= query.start_time:
+        raise HTTPException(status_code=400, detail="结束时间必须晚于开始时间")
+
+    service = UtilizationService(db)
+    return service.get_daily_utilization(query)
+
+@router.post("/kpi", response_model=KpiResponse)
+def get_kpis(
+    db: Session = Depends(deps.get_db),
+    query: KpiQuery = Body(...),
+) -> Any:
+    """
+    批量获取多条生产线的 KPI（运行/空闲/离线时间、产出长度、平均温度），
+    一次分组查询完成，结果按 (生产线集合, 时间范围桶) 缓存。
+    """
+    if query.end_time <= query.start_time:
+        raise HTTPException(status_code=400, detail="结束时间必须晚于开始时间")
+
+    service = KpiService(db)
+    return service.get_kpis(query)
+
+@router.post("/stats", response_model=SensorStatsResponse)
+def get_sensor_stats(
+    db: Session = Depends(deps.get_db),
+    query: SensorStatsQuery = Body(default=SensorStatsQuery()),
+) -> Any:
+    """
+    获取 (生产线, 参数) 的窗口统计（计数、均值、标准差、最值、EWMA），
+    数据来自 Worker 增量维护的快照，无需扫描原始数据。
+    """
+    service = SensorStatsService(db)
+    return service.get_stats(query)
+
+@router.post("/export", response_model=ExportRecordInDB, status_code=202)
 def export_sensor_data(
     db: Session = Depends(deps.get_db),
     filters: SensorDataExportFilter = Body(...),
     current_user: Dict[str, Any] = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    流式导出传感器数据到Excel文件，适用于大数据量场景。
-    使用临时文件避免内存溢出。
+    创建传感器数据导出任务，立即返回导出记录。
+    文件由后台导出进程生成，通过 /export-records/{id} 查询状态，
+    完成后通过 /export-records/{id}/download 下载（支持 Range 断点续传）。
     """
+    if not filters.start_time or not filters.end_time:
+        raise HTTPException(status_code=400, detail="导出需要指定开始时间和结束时间")
+    unavailable = check_format_available(filters.format)
+    if unavailable:
+        raise HTTPException(status_code=400, detail=unavailable)
+
     try:
+        # 已过去的时间段命中导出缓存时直接返回已完成的导出记录，不再生成文件
+        cache = get_export_cache()
+        cache_key = export_cache_key(filters, settings.EXPORT_CACHE_MIN_AGE_SECONDS)
+        cached_path = cache.get(cache_key, filters.format) if cache_key else None
+
         export_record_service = ExportRecordService(db)
-        service = SensorDataService(db, export_record_service=export_record_service)
-            
-        # 生成文件名
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        start_time = filters.start_time.strftime("%Y%m%d%H%M%S")
-        end_time = filters.end_time.strftime("%Y%m%d%H%M%S")
-        # 清理文件名中的特殊字符
-        clean_line_ids = str(filters.line_ids).replace(',', '_').replace(' ', '_').replace('-', '_')
-        filename = f"sensor_data_export_{clean_line_ids}_{start_time}_{end_time}_{timestamp}.xlsx"
-        
-        logger.info("Starting streaming Excel export")
+        export_record = export_record_service.create_export_record(ExportRecordCreate(
+            line_names=filters.line_ids,
+            fields=filters.parameter_names or '',
+            start_time=filters.start_time,
+            end_time=filters.end_time,
+            format=filters.format,
+            created_by=current_user.get("email"),
+            params=filters.model_dump_json(),
+            cache_key=cache_key,
+        ))
 
         AuditLogService(db).create_log_entry(
             email=current_user.get("email"),
@@ -69,20 +203,56 @@ def export_sensor_data(
             detail=f"导出传感器数据: {filters.line_ids} {filters.start_time} {filters.end_time}"
         )
 
-        # 使用流式导出
-        return StreamingResponse(
-            service.export_sensor_data_streaming(filters),
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}",
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive"
-            }
-        )
-        
+        if cached_path:
+            logger.info(f"导出缓存命中: {cache_key}")
+            return export_record_service.update_export_record_status_and_size(
+                export_record.id, 'completed', os.path.getsize(cached_path), file_path=cached_path
+            )
+
+        export_job_manager.submit(export_record.id)
+        return export_record
+
     except Exception as e:
-        logger.error(f"Error in streaming export: {e}", exc_info=True)
+        logger.error(f"Error creating export job: {e}", exc_info=True)
         raise HTTPException(
             status_code=500,
-            detail=f"流式导出失败: {str(e)}"
+            detail=f"创建导出任务失败: {str(e)}"
         )
+
+
+@router.post("/export/stream")
+def export_sensor_data_stream(
+    db: Session = Depends(deps.get_db),
+    filters: SensorDataExportFilter = Body(...),
+    current_user: Dict[str, Any] = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    直接流式导出传感器数据（CSV / csv.gz / csv.zst / Parquet / Arrow），
+    边从数据库游标读取边写入响应，不创建后台任务；Excel 请使用 /export。
+    """
+    if filters.format == 'xlsx':
+        raise HTTPException(status_code=400, detail="Excel 格式不支持流式导出，请使用 /export 创建导出任务")
+    unavailable = check_format_available(filters.format)
+    if unavailable:
+        raise HTTPException(status_code=400, detail=unavailable)
+
+    AuditLogService(db).create_log_entry(
+        email=current_user.get("email"),
+        action="export_sensor_data",
+        detail=f"流式导出传感器数据({filters.format}): {filters.line_ids} {filters.start_time} {filters.end_time}"
+    )
+
+    extension, media_type = EXPORT_FORMATS[filters.format]
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    clean_line_ids = str(filters.line_ids).replace(',', '_').replace(' ', '_').replace('-', '_')
+    filename = f"sensor_data_export_{clean_line_ids}_{timestamp}.{extension}"
+
+    service = SensorDataService(db)
+    return StreamingResponse(
+        service.export_sensor_data_stream(filters),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "Cache-Control": "no-cache",
+        }
+    )
@@ -4,6 +4,7 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
 from typing import Optional
 from app.core.logging import get_logger
 from app.websocket.manager import websocket_manager
+from app.websocket.frames import select_subprotocol
 
 router = APIRouter()
 logger = get_logger(__name__)
@@ -12,16 +13,26 @@ logger = get_logger(__name__)
 async def websocket_endpoint(
     websocket: WebSocket,
     client_id: Optional[str] = Query(None, description="客户端ID"),
-    channels: Optional[str] = Query(None, description="订阅频道，逗号分隔")
+    channels: Optional[str] = Query(None, description="订阅频道，逗号分隔，如 production_data:3,*:5"),
+    client_class: Optional[str] = Query(None, description="客户端类别（realtime / dashboard / overview），决定数据合并窗口"),
+    protocol: int = Query(1, description="协议版本，2 为 production_data 增量协议"),
+    replay_seconds: float = Query(0, ge=0, description="连接后回放最近 N 秒的历史数据")
 ):
-    """WebSocket连接端点"""
+    """
+    WebSocket连接端点
+    子协议：scada.msgpack（MessagePack 二进制帧）或 scada.json（默认 JSON 文本帧）
+    """
     logger.info(f"WebSocket connected: {client_id}")
-    await websocket_manager.connect(websocket, client_id)
+    # 指定了频道时在订阅后按订阅回放
+    subprotocol = select_subprotocol(websocket.scope.get("subprotocols", []))
+    await websocket_manager.connect(
+        websocket, client_id, client_class, protocol, 0 if channels else replay_seconds, subprotocol
+    )
     
     # 处理频道订阅
     if channels:
         channel_list = [ch.strip() for ch in channels.split(",") if ch.strip()]
-        await websocket_manager.subscribe_client(websocket, channel_list)
+        await websocket_manager.subscribe_client(websocket, channel_list, replay_seconds)
     
     try:
         while True:
@@ -66,14 +66,85 @@ class Settings(BaseSettings):
     MQTT_WORKER_PROCESSES: int = 2
     MQTT_QUEUE_SIZE: int = 200
     MQTT_BATCH_SIZE: int = 10
+    MQTT_SIMULATE_SENSOR_DATA: bool = True  # Worker 自行生成模拟数据（按分区生成所属生产线），不读取 MQTT 任务队列
+    # 本进程是否启动采集系统（MQTT 客户端和 Worker 进程池）；多个 API 进程共享广播总线（postgres/mqtt）时，
+    # 只在一个进程中开启，其余进程只订阅总线推送给自己的客户端，否则每条数据会被采集和推送多次
+    INGEST_WORKERS_ENABLED: bool = True
 
     MQTT_SENSORS_TOPIC: str = "kmf/scada/sensors/+/data"
 
     KMF_LINES: list[int] = [1, 2, 3, 4, 5, 6, 7, 8] # 生产线数量
     KMF_DEVICES: list[str] = ["master", "winder"]   # 设备类型
 
+    # Sensor Data Query
+    SENSOR_DATA_STREAM_BATCH_SIZE: int = 5000  # 流式查询每批次行数（服务端游标 yield_per）
+
+    # Utilization
+    UTILIZATION_RUN_SPEED_THRESHOLD: float = 0.1    # 螺杆转速高于该值视为运行
+    UTILIZATION_GAP_CAP_SECONDS: float = 10.0        # 相邻采样间隔上限，超出部分计为离线
+    UTILIZATION_RAW_MAX_SECONDS: int = 6 * 3600      # 超过该时长的范围改用 1 分钟连续聚合计算
+    UTILIZATION_TIMEZONE: str = "Asia/Shanghai"      # 按天汇总使用的工厂时区
+
+    # KPI
+    KPI_CACHE_BUCKET_SECONDS: int = 60   # KPI 查询时间范围对齐粒度（同时作为缓存键）
+    KPI_CACHE_TTL_SECONDS: int = 60      # 包含当前时间或刚结束的范围缓存时长
+    KPI_CACHE_CLOSED_TTL_SECONDS: int = 3600  # 结束时间早于迟到数据窗口的范围缓存时长
+    KPI_CACHE_LATE_DATA_SECONDS: int = 300    # 迟到数据窗口：结束时间早于当前时间该秒数以上才视为不再变化
+    KPI_CACHE_MAX_ENTRIES: int = 256
+
+    # Energy
+    ENERGY_DEFAULT_VOLTAGE: float = 380.0              # 电流通道默认电压（V）
+    ENERGY_CHANNEL_VOLTAGES: dict[str, float] = {}     # 按通道覆盖电压，如 {"motor_current": 380}
+    ENERGY_POWER_FACTOR: float = 1.0                   # 功率系数（三相可设为 √3 × cosφ）
+    ENERGY_MAX_GAP_SECONDS: float = 10.0               # 采样间隔超过该值时不做积分
+    ENERGY_FLUSH_INTERVAL_SECONDS: float = 60.0        # Worker 写入小时能耗表的间隔
+
+    # Rolling Stats
+    STATS_WINDOW_SECONDS: int = 3600                   # 滚动统计窗口长度
+    STATS_EWMA_ALPHA: float = 0.1                      # EWMA 平滑系数
+    STATS_SNAPSHOT_INTERVAL_SECONDS: float = 10.0      # Worker 写入统计快照的间隔
+
+    # Latest Value Cache
+    LATEST_VALUE_CACHE_SLOTS: int = 64                 # 共享内存最新值表的 (line_id, component_id) 槽位数
+
+    # Export Jobs
+    EXPORT_DIR: str = "exports"                         # 导出文件保存目录
+    EXPORT_WORKERS: int = 2                             # 后台导出进程数
+    EXPORT_LINE_WORKERS: int = 4                        # 单个多生产线导出任务的并行分片进程数（1 表示顺序导出）
+    EXPORT_CACHE_DIR: str = "exports/cache"             # 导出结果缓存目录
+    EXPORT_CACHE_MAX_BYTES: int = 5 * 1024 ** 3         # 导出缓存总大小上限，超出后淘汰最久未使用的文件
+    EXPORT_CACHE_MIN_AGE_SECONDS: int = 300             # 结束时间早于当前时间该秒数以上的导出才缓存
+    EXPORT_RETENTION_SECONDS: int = 7 * 24 * 3600       # EXPORT_DIR 中（不可缓存的）导出文件保留时长，过期删除并标记记录为 expired
+    EXPORT_RETENTION_SWEEP_INTERVAL_SECONDS: int = 3600  # 过期导出文件清理间隔
+
+    # Production Runs
+    PRODUCTION_RUN_FLUSH_INTERVAL_SECONDS: float = 30.0  # Worker 写入生产批次索引表的间隔
+
+    # SPC
+    SPC_ENABLED: bool = True
+    SPC_PARAMETERS: list[str] = ["diameter", "current_length_rate"]  # 控制图参数（累加计数器用 <参数>_rate）
+    SPC_SUBGROUP_SIZE: int = 5                         # X-bar/R 子组大小（2-10）
+    SPC_BASELINE_SUBGROUPS: int = 20                   # 建立控制限所需的子组数
+    SPC_EWMA_LAMBDA: float = 0.2                       # EWMA 控制图平滑系数
+    SPC_EWMA_L: float = 3.0                            # EWMA 控制限宽度（σ 倍数）
+    SPC_CUSUM_K: float = 0.5                           # CUSUM 允许偏移量（σ 倍数）
+    SPC_CUSUM_H: float = 5.0                           # CUSUM 判定阈值（σ 倍数）
+
     # WebSocket Configuration
     WEBSOCKET_BROADCAST_QUEUE_SIZE: int = 50
+    WEBSOCKET_BRIDGE_BUFFER_BYTES: int = 4 * 1024 * 1024  # Worker 到事件循环广播通道的 socket 缓冲区大小
+    WEBSOCKET_BUS_BACKEND: str = "local"               # 广播总线：local（单个 API 进程）/ postgres（LISTEN/NOTIFY）/ mqtt
+    WEBSOCKET_BUS_CHANNEL: str = "scada_ws_broadcast"  # postgres 总线的通知频道
+    WEBSOCKET_BUS_CONNECT_TIMEOUT_SECONDS: int = 5     # postgres 总线建立连接的超时时间
+    WEBSOCKET_BUS_MQTT_TOPIC: str = "kmf/scada/ws"     # mqtt 总线的主题前缀
+    WEBSOCKET_CLIENT_QUEUE_SIZE: int = 100          # 每个客户端发送队列长度，满时丢弃最早的消息
+    WEBSOCKET_SEND_TIMEOUT_SECONDS: float = 5.0     # 单条消息发送超时，超时断开该客户端
+    WEBSOCKET_SLOW_CLIENT_DROP_LIMIT: int = 500     # 连续丢弃超过该数量的客户端视为掉队并断开
+    # 各客户端类别的合并窗口（秒）：窗口内同一生产线/部件只发送最新一帧，0 表示不合并
+    WEBSOCKET_COALESCE_WINDOWS: dict[str, float] = {"realtime": 0.0, "dashboard": 0.2, "overview": 1.0}
+    WEBSOCKET_DEFAULT_CLIENT_CLASS: str = "dashboard"  # 未指定类别的客户端
+    WEBSOCKET_REPLAY_SECONDS: int = 600             # 历史回放最长时间（秒），0 表示不保留
+    WEBSOCKET_REPLAY_MAX_SAMPLES: int = 3600        # 每条生产线/部件最多保留的帧数
     
     class Config:
         env_file = ".env"
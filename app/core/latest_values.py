@@ -0,0 +1,228 @@
+"""
+最新值缓存：基于共享内存的 (line_id, component_id) -> 最新记录表
+
+Worker 进程在保存每条记录后写入，API 进程无锁读取（seqlock），
+用于 /sensor-data/latest 与新 WebSocket 客户端的首屏数据，无需访问数据库。
+"""
+import math
+import struct
+from multiprocessing import Lock, shared_memory
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+_KEY_BYTES = 64
+_TIMESTAMP_BYTES = 40
+_BATCH_BYTES = 32
+_HEADER = struct.Struct("<Q")  # 已分配的槽位数
+_MAX_READ_RETRIES = 100
+
+
+def _encode(value: Optional[str], size: int) -> bytes:
+    return (value or "").encode("utf-8")[:size]
+
+
+def _decode(value: bytes) -> str:
+    return value.rstrip(b"\x00").decode("utf-8", errors="ignore")
+
+
+class LatestValueCache:
+    """
+    共享内存最新值表
+
+    每个槽位布局：seq(u64) | key | timestamp | batch | alarm_mask(u64) | values(float64 × N)
+    写入时 seq 先变为奇数、写完再变为偶数；读取方在 seq 为偶数且前后一致时接受数据。
+    写入方之间通过进程锁互斥，槽位分配也在锁内完成。
+    """
+
+    def __init__(self, parameters: Sequence[str], slots: int = 64, name: Optional[str] = None, lock=None):
+        self.parameters = tuple(parameters)
+        self.slots = slots
+        self._slot = struct.Struct(f"<Q{_KEY_BYTES}s{_TIMESTAMP_BYTES}s{_BATCH_BYTES}sQ{len(self.parameters)}d")
+        self._size = _HEADER.size + self._slot.size * slots
+        self._lock = lock or Lock()
+        self._owner = name is None
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=self._size)
+            self._shm.buf[:self._size] = bytes(self._size)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        # 本进程内的 key -> 槽位索引缓存
+        self._index: Dict[bytes, int] = {}
+
+    @classmethod
+    def create(cls, slots: int = 64) -> "LatestValueCache":
+        """在主进程创建，跟踪全部数值型参数"""
+        from app.models.sensor_data import PARAMETER_COLUMNS
+
+        return cls(PARAMETER_COLUMNS, slots=slots)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    # 通过 multiprocessing 传给 Worker 时按名字重新挂载共享内存
+    def __getstate__(self):
+        return {"parameters": self.parameters, "slots": self.slots, "name": self.name, "lock": self._lock}
+
+    def __setstate__(self, state):
+        self.__init__(state["parameters"], slots=state["slots"], name=state["name"], lock=state["lock"])
+
+    def _offset(self, index: int) -> int:
+        return _HEADER.size + index * self._slot.size
+
+    def _used(self) -> int:
+        return min(_HEADER.unpack_from(self._shm.buf, 0)[0], self.slots)
+
+    def _read_key(self, index: int) -> bytes:
+        start = self._offset(index) + 8
+        return bytes(self._shm.buf[start:start + _KEY_BYTES]).rstrip(b"\x00")
+
+    def _find_slot(self, key: bytes, allocate: bool) -> Optional[int]:
+        index = self._index.get(key)
+        if index is not None:
+            return index
+
+        for i in range(self._used()):
+            self._index[self._read_key(i)] = i
+        index = self._index.get(key)
+        if index is not None or not allocate:
+            return index
+
+        used = self._used()
+        if used >= self.slots:
+            logger.warning(f"最新值缓存槽位已满({self.slots})，忽略 {key!r}")
+            return None
+        self._shm.buf[self._offset(used) + 8:self._offset(used) + 8 + _KEY_BYTES] = key.ljust(_KEY_BYTES, b"\x00")
+        _HEADER.pack_into(self._shm.buf, 0, used + 1)
+        self._index[key] = used
+        return used
+
+    def put(self, record: Dict[str, Any], alarms: Iterable[str] = ()) -> None:
+        """写入一条记录（alarms 为处于报警状态的参数名）"""
+        line_id = record.get("line_id")
+        component_id = record.get("component_id")
+        if not line_id or not component_id:
+            return
+
+        key = _encode(f"{line_id}\x00{component_id}", _KEY_BYTES)
+        alarm_set = set(alarms)
+        mask = 0
+        for bit, parameter in enumerate(self.parameters):
+            if parameter in alarm_set:
+                mask |= 1 << bit
+        values = [
+            float(record[parameter]) if record.get(parameter) is not None else math.nan
+            for parameter in self.parameters
+        ]
+        timestamp = record.get("timestamp")
+        timestamp = timestamp.isoformat() if hasattr(timestamp, "isoformat") else str(timestamp or "")
+
+        with self._lock:
+            index = self._find_slot(key, allocate=True)
+            if index is None:
+                return
+            offset = self._offset(index)
+            seq = struct.unpack_from("<Q", self._shm.buf, offset)[0]
+            struct.pack_into("<Q", self._shm.buf, offset, seq + 1)
+            self._slot.pack_into(
+                self._shm.buf, offset, seq + 1, key,
+                _encode(timestamp, _TIMESTAMP_BYTES),
+                _encode(record.get("batch_product_number"), _BATCH_BYTES),
+                mask, *values,
+            )
+            struct.pack_into("<Q", self._shm.buf, offset, seq + 2)
+
+    def _read_slot(self, index: int) -> Optional[Tuple]:
+        offset = self._offset(index)
+        for _ in range(_MAX_READ_RETRIES):
+            fields = self._slot.unpack_from(self._shm.buf, offset)
+            seq = fields[0]
+            if seq % 2 == 0 and struct.unpack_from("<Q", self._shm.buf, offset)[0] == seq:
+                return fields if seq else None
+        return None
+
+    def _to_record(self, fields: Tuple) -> Tuple[Dict[str, Any], List[str]]:
+        _, key, timestamp, batch, mask, *values = fields
+        line_id, _, component_id = _decode(key).partition("\x00")
+        record: Dict[str, Any] = {
+            "timestamp": _decode(timestamp),
+            "line_id": line_id,
+            "component_id": component_id,
+            "batch_product_number": _decode(batch) or None,
+        }
+        alarms = []
+        for bit, (parameter, value) in enumerate(zip(self.parameters, values)):
+            record[parameter] = None if math.isnan(value) else value
+            if mask >> bit & 1:
+                alarms.append(parameter)
+        return record, alarms
+
+    def get(self, line_id: str, component_id: str) -> Optional[Tuple[Dict[str, Any], List[str]]]:
+        """读取单个 (line_id, component_id) 的最新记录及报警参数"""
+        index = self._find_slot(_encode(f"{line_id}\x00{component_id}", _KEY_BYTES), allocate=False)
+        if index is None:
+            return None
+        fields = self._read_slot(index)
+        return self._to_record(fields) if fields else None
+
+    def get_all(self) -> List[Tuple[Dict[str, Any], List[str]]]:
+        """读取全部最新记录及报警参数"""
+        items = []
+        for index in range(self._used()):
+            fields = self._read_slot(index)
+            if fields:
+                items.append(self._to_record(fields))
+        return items
+
+    def close(self) -> None:
+        """断开共享内存；创建方同时释放"""
+        try:
+            self._shm.close()
+            if self._owner:
+                self._shm.unlink()
+        except Exception as e:
+            logger.error(f"Error closing latest value cache: {e}")
+
+
+# API 进程中的全局实例，由 MQTT 管理器启动时创建
+latest_value_cache: Optional[LatestValueCache] = None
+
+
+def init_latest_value_cache() -> LatestValueCache:
+    """创建全局最新值缓存（幂等）"""
+    from app.core.config import settings
+
+    global latest_value_cache
+    if latest_value_cache is None:
+        latest_value_cache = LatestValueCache.create(settings.LATEST_VALUE_CACHE_SLOTS)
+        logger.info(f"Latest value cache initialized: {latest_value_cache.name}")
+    return latest_value_cache
+
+
+def close_latest_value_cache() -> None:
+    """释放全局最新值缓存"""
+    global latest_value_cache
+    if latest_value_cache is not None:
+        latest_value_cache.close()
+        latest_value_cache = None
+
+
+def to_production_data(record: Dict[str, Any], alarms: Iterable[str]) -> Dict[str, Any]:
+    """把最新记录转换为与 Worker 广播一致的 production_data 结构"""
+    alarm_set = set(alarms)
+    skip_params = ['batch_product_number', 'timestamp', 'line_id', 'component_id']
+    data = {}
+    for k, v in record.items():
+        if k in skip_params:
+            data[k] = v
+            continue
+        data[k] = {
+            "value": v,
+            "alarm": k in alarm_set,
+            "alarmCode": "",
+            "alarmMessage": ""
+        }
+    return data
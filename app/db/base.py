@@ -3,6 +3,9 @@
 from app.db.base_class import Base  # noqa
 from app.models.sensor_data import SensorData  # noqa
 from app.models.production_line import ProductionLine  # noqa
+from app.models.energy import EnergyHourly  # noqa
+from app.models.sensor_stats import SensorStats  # noqa
+from app.models.production_run import ProductionRun  # noqa
 
 # Import TimescaleDB functions
 from app.db.timescale import init as tc_init, create_hypertable, get_hypertable_info
@@ -2,6 +2,7 @@
 TimescaleDB initialization and management module
 """
 from sqlalchemy import text
+from app.core.config import settings
 from app.core.database import engine
 from app.core.logging import get_logger
 
@@ -10,6 +11,7 @@ logger = get_logger(__name__)
 def init() -> None:
     create_extensions()
     create_hypertable("sensor_data")
+    create_continuous_aggregates()
 
 
 def create_extensions() -> None:
@@ -109,3 +111,55 @@ def create_hypertable(table_name: str, time_column: str = "timestamp", chunk_int
     except Exception as e:
         logger.error(f"Failed to create hypertable for {table_name}: {e}")
         return False
+
+
+# 1 分钟粒度的运行状态连续聚合，供长时间范围的利用率统计使用
+SENSOR_DATA_1M_VIEW = "sensor_data_1m"
+
+
+def create_continuous_aggregates() -> bool:
+    """
+    创建 sensor_data 的 1 分钟连续聚合（运行/采样计数与首末采样时间）及刷新策略
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        with engine.connect() as conn:
+            conn.execute(text(f"""
+                CREATE MATERIALIZED VIEW IF NOT EXISTS {SENSOR_DATA_1M_VIEW}
+                WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+                SELECT time_bucket(INTERVAL '1 minute', timestamp) AS bucket,
+                       line_id,
+                       count(*) AS samples,
+                       count(*) FILTER (WHERE motor_screw_speed > {float(settings.UTILIZATION_RUN_SPEED_THRESHOLD)}) AS run_samples,
+                       min(timestamp) AS first_ts,
+                       max(timestamp) AS last_ts
+                FROM sensor_data
+                WHERE motor_screw_speed IS NOT NULL
+                GROUP BY bucket, line_id
+                WITH NO DATA
+            """))
+            conn.execute(text(f"""
+                SELECT add_continuous_aggregate_policy('{SENSOR_DATA_1M_VIEW}',
+                    start_offset => INTERVAL '1 day',
+                    end_offset => INTERVAL '1 minute',
+                    schedule_interval => INTERVAL '1 minute',
+                    if_not_exists => TRUE)
+            """))
+            conn.commit()
+            logger.info(f"Continuous aggregate {SENSOR_DATA_1M_VIEW} created/verified")
+            return True
+
+    except Exception as e:
+        logger.error(f"Failed to create continuous aggregate {SENSOR_DATA_1M_VIEW}: {e}")
+        return False
+
+
+def continuous_aggregate_exists(conn, view_name: str) -> bool:
+    """检查连续聚合视图是否存在"""
+    result = conn.execute(
+        text("SELECT 1 FROM timescaledb_information.continuous_aggregates WHERE view_name = :name"),
+        {"name": view_name}
+    )
+    return result.first() is not None
@@ -0,0 +1,28 @@
+from .xlsx import XlsxStreamWriter, EXCEL_MAX_ROWS
+from .cache import ExportCache, export_cache_key, get_export_cache
+from .tabular import (
+    EXPORT_FORMATS,
+    ChunkSink,
+    CsvExporter,
+    ParquetExporter,
+    ArrowExporter,
+    create_exporter,
+    check_format_available,
+    merge_parts,
+)
+
+__all__ = [
+    "XlsxStreamWriter",
+    "EXCEL_MAX_ROWS",
+    "EXPORT_FORMATS",
+    "ChunkSink",
+    "CsvExporter",
+    "ParquetExporter",
+    "ArrowExporter",
+    "create_exporter",
+    "check_format_available",
+    "merge_parts",
+    "ExportCache",
+    "export_cache_key",
+    "get_export_cache",
+]
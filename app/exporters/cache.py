@@ -0,0 +1,123 @@
+"""
+导出结果缓存：以规范化查询条件的哈希为键，把已生成的导出文件保存在磁盘上，
+重复导出同一时间段时直接发送文件。只缓存结束时间已经过去的查询，按总大小做 LRU 淘汰
+（以文件修改时间作为最近使用时间，多进程共享同一目录）。
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Optional, Tuple
+
+
+def _split(value: Any) -> List[str]:
+    if not value:
+        return []
+    items = value.split(",") if isinstance(value, str) else list(value)
+    result = []
+    for item in items:
+        item = str(item).strip()
+        if item and item not in result:
+            result.append(item)
+    return result
+
+
+def _utc(value: Optional[datetime]) -> Optional[str]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+
+def export_cache_key(filters: Any, min_age_seconds: float = 300, now: Optional[datetime] = None) -> Optional[str]:
+    """
+    计算导出查询的缓存键；结束时间未过去 min_age_seconds（数据可能还会补录）的查询不缓存，返回 None
+    生产线和参数保持请求顺序（决定工作表和列的顺序），只去掉空白和重复项
+    """
+    if filters.start_time is None or filters.end_time is None:
+        return None
+    now = now or datetime.now(timezone.utc)
+    end_time = filters.end_time if filters.end_time.tzinfo else filters.end_time.replace(tzinfo=timezone.utc)
+    if end_time > now - timedelta(seconds=min_age_seconds):
+        return None
+
+    normalized = {
+        "line_ids": _split(filters.line_ids),
+        "parameter_names": _split(filters.parameter_names),
+        "component_id": filters.component_id or None,
+        "batch_product_number": getattr(filters, "batch_product_number", None) or None,
+        "start_time": _utc(filters.start_time),
+        "end_time": _utc(filters.end_time),
+        "format": filters.format,
+    }
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExportCache:
+    """磁盘导出缓存（按总大小 LRU 淘汰）"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path(self, key: str, file_format: str) -> str:
+        return os.path.join(self.directory, f"{key}.{file_format}")
+
+    def get(self, key: str, file_format: str) -> Optional[str]:
+        """命中时刷新最近使用时间并返回文件路径"""
+        path = self.path(key, file_format)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, file_format: str, source_path: str) -> str:
+        """把生成好的文件移动到缓存目录（原子替换），然后按容量淘汰，返回缓存路径"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key, file_format)
+        os.replace(source_path, path)
+        self.evict(keep=path)
+        return path
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """删除最久未使用的文件直到总大小不超过上限，返回删除的文件数"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+
+def get_export_cache() -> ExportCache:
+    """按全局配置创建导出缓存"""
+    from app.core.config import settings
+
+    return ExportCache(settings.EXPORT_CACHE_DIR, settings.EXPORT_CACHE_MAX_BYTES)
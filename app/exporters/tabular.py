@@ -0,0 +1,197 @@
+"""
+表格导出格式：CSV（可选 gzip / zstd 压缩）、Parquet、Arrow IPC。
+所有写入器都按批次追加行并写入二进制 sink，既可以写文件，也可以配合 ChunkSink
+边查询边输出到 HTTP 响应；内存占用只与单批次大小有关。
+"""
+import csv
+import gzip
+import io
+import shutil
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Tuple
+
+from app.utils.stream_encoders import ARROW_STREAM_MEDIA_TYPE, arrow_schema, is_arrow_available
+
+# 格式 -> (文件扩展名, Content-Type)
+EXPORT_FORMATS: Dict[str, Tuple[str, str]] = {
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("csv", "text/csv; charset=utf-8"),
+    "csv.gz": ("csv.gz", "application/gzip"),
+    "csv.zst": ("csv.zst", "application/zstd"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "arrow": ("arrow", ARROW_STREAM_MEDIA_TYPE),
+}
+
+
+def is_zstd_available() -> bool:
+    """检查 zstandard 是否可用"""
+    try:
+        import zstandard  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def check_format_available(fmt: str) -> Optional[str]:
+    """检查导出格式依赖是否已安装，不可用时返回原因"""
+    if fmt in ("parquet", "arrow") and not is_arrow_available():
+        return "服务器未安装 pyarrow，无法导出 Parquet / Arrow 格式"
+    if fmt == "csv.zst" and not is_zstd_available():
+        return "服务器未安装 zstandard，无法导出 zstd 压缩的 CSV"
+    return None
+
+
+class ChunkSink(io.RawIOBase):
+    """只追加的内存 sink，drain() 取出自上次以来写入的字节，用于流式响应"""
+
+    def __init__(self):
+        super().__init__()
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+class CsvExporter:
+    """CSV 写入器，compression 可为 None / "gzip" / "zstd"；未压缩时带 UTF-8 BOM 便于 Excel 打开"""
+
+    def __init__(self, sink: BinaryIO, names: Sequence[str], compression: Optional[str] = None, header: bool = True):
+        self._compressor = None
+        if compression == "gzip":
+            self._compressor = gzip.GzipFile(fileobj=sink, mode="wb", compresslevel=6)
+            self._out = self._compressor
+        elif compression == "zstd":
+            import zstandard
+
+            self._compressor = zstandard.ZstdCompressor(level=3).stream_writer(sink, closefd=False)
+            self._out = self._compressor
+        else:
+            self._out = sink
+            if header:
+                self._out.write(b"\xef\xbb\xbf")
+
+        self._text = io.StringIO()
+        self._writer = csv.writer(self._text)
+        # 并行导出的分片不带表头，合并时统一写入
+        if header:
+            self.write_rows([names])
+
+    def write_rows(self, rows: List[Sequence[Any]]) -> None:
+        """追加一批行"""
+        for row in rows:
+            self._writer.writerow([value.isoformat() if isinstance(value, datetime) else value for value in row])
+        self._out.write(self._text.getvalue().encode("utf-8"))
+        self._text.seek(0)
+        self._text.truncate()
+        if self._compressor is not None:
+            # 把已压缩的数据推到 sink，流式响应才能及时输出
+            self._compressor.flush()
+
+    def close(self) -> None:
+        if self._compressor is not None:
+            self._compressor.close()
+
+
+class ParquetExporter:
+    """Parquet 写入器，每批行写成一个 row group（zstd 压缩）"""
+
+    def __init__(self, sink: BinaryIO, names: Sequence[str]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self.schema = arrow_schema(names)
+        self._writer = pq.ParquetWriter(sink, self.schema, compression="zstd")
+
+    def write_rows(self, rows: List[Sequence[Any]]) -> None:
+        if rows:
+            self._writer.write_batch(_record_batch(self._pa, self.schema, rows))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+class ArrowExporter:
+    """Arrow IPC 流写入器"""
+
+    def __init__(self, sink: BinaryIO, names: Sequence[str]):
+        import pyarrow as pa
+
+        self._pa = pa
+        self.schema = arrow_schema(names)
+        self._writer = pa.ipc.new_stream(sink, self.schema)
+
+    def write_rows(self, rows: List[Sequence[Any]]) -> None:
+        if rows:
+            self._writer.write_batch(_record_batch(self._pa, self.schema, rows))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def _record_batch(pa, schema, rows: List[Sequence[Any]]):
+    columns = list(zip(*rows))
+    arrays = [pa.array(column, type=field.type) for column, field in zip(columns, schema)]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+_CSV_COMPRESSION = {"csv": None, "csv.gz": "gzip", "csv.zst": "zstd"}
+
+
+def create_exporter(fmt: str, sink: BinaryIO, names: Sequence[str], header: bool = True):
+    """按格式创建写入器（xlsx 由 XlsxStreamWriter 单独处理）；header=False 用于 CSV 分片"""
+    if fmt in _CSV_COMPRESSION:
+        return CsvExporter(sink, names, compression=_CSV_COMPRESSION[fmt], header=header)
+    if fmt == "parquet":
+        return ParquetExporter(sink, names)
+    if fmt == "arrow":
+        return ArrowExporter(sink, names)
+    raise ValueError(f"不支持的导出格式: {fmt}")
+
+
+def merge_parts(fmt: str, names: Sequence[str], part_paths: Sequence[str], sink: BinaryIO) -> None:
+    """
+    合并并行导出的分片文件
+    - CSV：写入表头后直接拼接分片字节（gzip 成员、zstd 帧都可以首尾相接）
+    - Parquet / Arrow：逐批读取分片并写入同一个文件，不整体加载
+    """
+    if fmt in _CSV_COMPRESSION:
+        create_exporter(fmt, sink, names).close()
+        for path in part_paths:
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, sink, 1024 * 1024)
+        return
+
+    import pyarrow as pa
+
+    schema = arrow_schema(names)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        for path in part_paths:
+            for batch in pq.ParquetFile(path).iter_batches():
+                writer.write_batch(batch)
+    elif fmt == "arrow":
+        writer = pa.ipc.new_stream(sink, schema)
+        for path in part_paths:
+            with pa.OSFile(path, "rb") as f:
+                for batch in pa.ipc.open_stream(f):
+                    writer.write_batch(batch)
+    else:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    writer.close()
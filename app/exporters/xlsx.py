@@ -0,0 +1,70 @@
+"""
+流式 XLSX 写入：基于 openpyxl write_only 模式，行数据边读边写入临时文件，
+内存占用与行数无关；单个工作表超过 Excel 行数上限时自动拆分为多个工作表。
+"""
+from typing import Any, Iterable, List, Optional, Sequence
+
+from openpyxl import Workbook
+
+# Excel 单个工作表的最大行数（含表头）
+EXCEL_MAX_ROWS = 1_048_576
+# 工作表名称最大长度
+_SHEET_TITLE_MAX = 31
+
+
+class XlsxStreamWriter:
+    """
+    常量内存的 XLSX 写入器
+
+    with XlsxStreamWriter(path) as writer:
+        writer.write_sheet("生产线_LINE_001", ["时间戳", "diameter"], rows)
+    """
+
+    def __init__(self, path: str, max_rows: int = EXCEL_MAX_ROWS):
+        if max_rows < 2:
+            raise ValueError("max_rows 至少为 2（表头 + 1 行数据）")
+        self.path = path
+        self.max_rows = max_rows
+        self.workbook = Workbook(write_only=True)
+        self.sheet_titles: List[str] = []
+
+    def __enter__(self) -> "XlsxStreamWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+
+    def _create_sheet(self, title: str, header: Sequence[Any], part: int):
+        suffix = f"_{part}" if part > 1 else ""
+        sheet_title = title[:_SHEET_TITLE_MAX - len(suffix)] + suffix
+        sheet = self.workbook.create_sheet(title=sheet_title)
+        self.sheet_titles.append(sheet_title)
+        sheet.append(list(header))
+        return sheet
+
+    def write_sheet(self, title: str, header: Sequence[Any], rows: Iterable[Sequence[Any]]) -> int:
+        """
+        写入一个逻辑工作表，返回数据行数
+        数据超过单表上限时依次写入 title_2、title_3 ...（每个分表都带表头）
+        """
+        rows_per_sheet = self.max_rows - 1
+        part = 1
+        sheet = self._create_sheet(title, header, part)
+        in_sheet = 0
+        total = 0
+        for row in rows:
+            if in_sheet == rows_per_sheet:
+                part += 1
+                sheet = self._create_sheet(title, header, part)
+                in_sheet = 0
+            sheet.append(list(row))
+            in_sheet += 1
+            total += 1
+        return total
+
+    def close(self) -> None:
+        """写出文件；没有任何工作表时补一个空表，保证文件可以打开"""
+        if not self.sheet_titles:
+            self._create_sheet("Sheet1", [], 1)
+        self.workbook.save(self.path)
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Text, DateTime, Double, PrimaryKeyConstraint, Index
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+
+class EnergyHourly(Base):
+    """小时能耗表 - Worker 按小时累计的各电流通道电量，查询时无需回扫原始数据"""
+
+    __tablename__ = "energy_hourly"
+
+    hour = Column(DateTime(timezone=True), nullable=False, comment="小时（向下取整）")
+    line_id = Column(Text, nullable=False, comment="生产线ID")
+    channel = Column(Text, nullable=False, comment="电流通道，如 current_body_zone1 / motor_current")
+    energy_kwh = Column(Double, nullable=False, default=0, comment="电量（kWh）")
+    sample_seconds = Column(Double, nullable=False, default=0, comment="参与积分的采样时长（秒）")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="更新时间")
+
+    __table_args__ = (
+        PrimaryKeyConstraint("hour", "line_id", "channel", name="energy_hourly_pkey"),
+        Index("idx_energy_line_hour", "line_id", "hour"),
+    )
+
+    def __repr__(self):
+        return f"<EnergyHourly(hour='{self.hour}', line_id='{self.line_id}', channel='{self.channel}', energy_kwh={self.energy_kwh})>"
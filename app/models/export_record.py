@@ -16,6 +16,10 @@ class ExportRecord(Base):
     format = Column(String(10), nullable=False, default="xlsx", comment="文件格式")
     size = Column(BIGINT, nullable=True, comment="文件大小")
     status = Column(String(20), nullable=False, default="pending", index=True, comment="任务状态")
+    params = Column(Text, nullable=True, comment="导出参数（JSON），后台任务据此生成文件")
+    file_path = Column(Text, nullable=True, comment="导出文件路径")
+    error_message = Column(Text, nullable=True, comment="失败原因")
+    cache_key = Column(Text, nullable=True, index=True, comment="导出缓存键（规范化查询条件的哈希），为空表示不可缓存")
     created_by = Column(String(100), nullable=True, comment="创建用户")
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="更新时间")
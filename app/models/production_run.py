@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Text, DateTime, Double, BIGINT, PrimaryKeyConstraint, Index
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+
+class ProductionRun(Base):
+    """生产批次索引表 - 记录每个批次在各生产线上的起止时间和摘要，按批次查询时据此裁剪时间范围"""
+
+    __tablename__ = "production_runs"
+
+    line_id = Column(Text, nullable=False, comment="生产线ID")
+    batch_product_number = Column(Text, nullable=False, comment="批次号")
+    start_ts = Column(DateTime(timezone=True), nullable=False, comment="批次第一条记录时间")
+    end_ts = Column(DateTime(timezone=True), nullable=False, comment="批次最后一条记录时间")
+    row_count = Column(BIGINT, nullable=False, default=0, comment="记录数")
+    diameter_count = Column(BIGINT, nullable=False, default=0, comment="有直径值的记录数")
+    diameter_mean = Column(Double, nullable=True, comment="直径均值")
+    diameter_min = Column(Double, nullable=True, comment="直径最小值")
+    diameter_max = Column(Double, nullable=True, comment="直径最大值")
+    max_length = Column(Double, nullable=True, comment="最大当前长度")
+    target_length = Column(Double, nullable=True, comment="目标长度（最新值）")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="更新时间")
+
+    __table_args__ = (
+        PrimaryKeyConstraint("line_id", "batch_product_number", name="production_runs_pkey"),
+        Index("idx_production_runs_batch", "batch_product_number"),
+        Index("idx_production_runs_line_start", "line_id", "start_ts"),
+    )
+
+    def __repr__(self):
+        return f"<ProductionRun(line_id='{self.line_id}', batch='{self.batch_product_number}', start_ts='{self.start_ts}', end_ts='{self.end_ts}')>"
@@ -77,4 +77,11 @@ create_hypertable_ddl = DDL("""
     SELECT create_hypertable('sensor_data', 'timestamp', chunk_time_interval => INTERVAL '1 day');
 """)
 
-listen(SensorData.__table__, 'after_create', create_hypertable_ddl)
\ No newline at end of file
+listen(SensorData.__table__, 'after_create', create_hypertable_ddl)
+
+
+# 数值型传感器参数列（按表定义顺序），供投影查询、列式输出等复用
+PARAMETER_COLUMNS = tuple(
+    column.name for column in SensorData.__table__.columns
+    if isinstance(column.type, Double)
+)
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Text, DateTime, Double, BIGINT, PrimaryKeyConstraint, Index
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+
+class SensorStats(Base):
+    """参数滚动统计快照表 - 每个 Worker 按时间窗口写入各 (生产线, 参数) 的增量统计量，查询时合并"""
+
+    __tablename__ = "sensor_stats"
+
+    window_start = Column(DateTime(timezone=True), nullable=False, comment="统计窗口开始时间")
+    line_id = Column(Text, nullable=False, comment="生产线ID")
+    parameter = Column(Text, nullable=False, comment="参数名称")
+    worker_id = Column(Text, nullable=False, comment="写入快照的 Worker 标识")
+    count = Column(BIGINT, nullable=False, default=0, comment="样本数")
+    mean = Column(Double, nullable=False, default=0, comment="均值")
+    m2 = Column(Double, nullable=False, default=0, comment="离差平方和（Welford M2）")
+    min = Column(Double, nullable=True, comment="最小值")
+    max = Column(Double, nullable=True, comment="最大值")
+    ewma = Column(Double, nullable=True, comment="指数加权移动平均")
+    last_ts = Column(DateTime(timezone=True), nullable=True, comment="最后一个样本时间")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="更新时间")
+
+    __table_args__ = (
+        PrimaryKeyConstraint("window_start", "line_id", "parameter", "worker_id", name="sensor_stats_pkey"),
+        Index("idx_sensor_stats_line_window", "line_id", "window_start"),
+    )
+
+    def __repr__(self):
+        return f"<SensorStats(window_start='{self.window_start}', line_id='{self.line_id}', parameter='{self.parameter}', count={self.count})>"
@@ -2,9 +2,10 @@ import paho.mqtt.client as mqtt
 from app.core.config import settings
 from app.core.logging import get_logger
 import json
-from typing import Optional
+from typing import List, Optional
 from multiprocessing import Queue
 import time
+from app.mqtt.routing import message_line_id, worker_index
 
 logger = get_logger(__name__)
 
@@ -12,12 +13,12 @@ class MQTTClient:
     def __init__(self):
         self.client: Optional[mqtt.Client] = None
         self.connected = False
-        self.task_queue: Optional[Queue] = None
+        self.task_queues: List[Queue] = []
         self.running = False
 
-    def set_task_queue(self, task_queue):
-        """设置任务队列"""
-        self.task_queue = task_queue
+    def set_task_queues(self, task_queues: List[Queue]):
+        """设置各 Worker 的任务队列（按生产线分区，同一生产线始终进入同一个队列）"""
+        self.task_queues = list(task_queues)
         
     def run(self):
         """在后台持续运行和重连"""
@@ -119,10 +120,11 @@ class MQTTClient:
             print(f"📥 收到 MQTT 消息: {payload}")
             logger.info(f"Received message from {topic}")
             
-            # 将消息放入队列供Worker进程处理
-            if self.task_queue:
+            # 将消息放入该生产线所属Worker的队列
+            if self.task_queues:
+                task_queue = self.task_queues[worker_index(message_line_id(payload), len(self.task_queues))]
                 try:
-                    self.task_queue.put(payload)
+                    task_queue.put_nowait(payload)
                     logger.debug("Message added to task queue")
                 except Exception as e:
                     print("⚠️ 队列满了，消息被丢弃！")
@@ -10,6 +10,8 @@ from app.mqtt.worker import worker_process
 from app.mqtt.client import mqtt_client
 from app.mqtt.sensor_configs import generate_multiple_sensor_data_records
 from app.websocket.manager import websocket_manager
+from app.core.latest_values import init_latest_value_cache, close_latest_value_cache
+from app.analytics.energy import init_energy_totals_cache, close_energy_totals_cache
 
 logger = get_logger("mqtt.manager")
 
@@ -18,8 +20,9 @@ class MQTTManager:
     
     def __init__(self):
         self.workers: List[Process] = []
-        self.task_queue = Queue(maxsize=settings.MQTT_QUEUE_SIZE)
-        self.websocket_queue = websocket_manager.broadcast_queue
+        # 每个Worker一个队列，消息按生产线分区，保证同一生产线的状态只在一个Worker中维护
+        self.task_queues: List[Queue] = []
+        self.websocket_publisher = websocket_manager.bus.publisher
         self.stop_event = Event()
         self.running = False
     
@@ -29,8 +32,14 @@ class MQTTManager:
         logger.info(f"Starting {settings.MQTT_WORKER_PROCESSES} worker processes")
         
         self.workers = []
-        for i in range(settings.MQTT_WORKER_PROCESSES):
-            worker = Process(target=worker_process, args=(self.task_queue, self.websocket_queue, self.stop_event))
+        self.task_queues = [Queue(maxsize=settings.MQTT_QUEUE_SIZE) for _ in range(settings.MQTT_WORKER_PROCESSES)]
+        latest_values = init_latest_value_cache()
+        energy_totals = init_energy_totals_cache()
+        for i, task_queue in enumerate(self.task_queues):
+            worker = Process(target=worker_process, args=(
+                task_queue, self.websocket_publisher, self.stop_event, latest_values,
+                i, len(self.task_queues), energy_totals,
+            ))
             worker.start()
             self.workers.append(worker)
             logger.info(f"Started worker process {i} with pid {worker.pid}")
@@ -43,12 +52,11 @@ class MQTTManager:
         logger.info("Stopping worker processes")
         
         # 发送退出信号给所有Worker
-        if self.task_queue is not None:
-            for _ in self.workers:
-                try:
-                    self.task_queue.put(None, timeout=1)  # 发送退出信号
-                except Exception as e:
-                    logger.warning(f"Failed to send stop signal: {e}")
+        for task_queue in self.task_queues:
+            try:
+                task_queue.put(None, timeout=1)  # 发送退出信号
+            except Exception as e:
+                logger.warning(f"Failed to send stop signal: {e}")
         
         # 等待所有Worker进程结束
         for worker in self.workers:
@@ -82,23 +90,23 @@ class MQTTManager:
     def _cleanup_queues(self):
         """Clean up multiprocessing queues to prevent semaphore leaks"""
         try:
-            if self.task_queue is not None:
+            for task_queue in self.task_queues:
                 # Clear any remaining items in the queue
                 try:
-                    while not self.task_queue.empty():
-                        self.task_queue.get_nowait()
+                    while not task_queue.empty():
+                        task_queue.get_nowait()
                 except:
                     pass
                 
                 # Close and join the queue
-                self.task_queue.close()
-                self.task_queue.join_thread()
-                logger.info("Task queue cleaned up")
-                self.task_queue = None
+                task_queue.close()
+                task_queue.join_thread()
+            if self.task_queues:
+                logger.info("Task queues cleaned up")
+            self.task_queues = []
             
-            # Don't clean up websocket_queue here - it's managed by WebSocketManager
-            # Just set reference to None
-            self.websocket_queue = None
+            # 广播总线由 WebSocketManager 管理，这里只释放引用
+            self.websocket_publisher = None
                 
         except Exception as e:
             logger.error(f"Error cleaning up queues: {e}")
@@ -117,7 +125,7 @@ class MQTTManager:
             self.start_worker_pool()
             
             # 设置MQTT客户端的任务队列
-            mqtt_client.set_task_queue(self.task_queue)
+            mqtt_client.set_task_queues(self.task_queues)
             
             # 连接MQTT客户端
             mqtt_thread = threading.Thread(target=mqtt_client.run, daemon=True)
@@ -155,7 +163,11 @@ class MQTTManager:
             
             # Clean up WebSocket manager queue
             from app.websocket.manager import websocket_manager
-            websocket_manager.cleanup_queue()
+            websocket_manager.cleanup_bus()
+
+            # 释放最新值共享内存
+            close_latest_value_cache()
+            close_energy_totals_cache()
             
             self.running = False
             print("✅ MQTT多进程处理系统已停止")
@@ -0,0 +1,28 @@
+"""
+MQTT 消息到 Worker 的分区
+
+Worker 内的能耗积分、滚动统计、SPC、生产批次等都是按生产线维护的进程内状态，
+同一生产线的记录必须始终交给同一个 Worker，状态才是完整的时间序列。
+这里按生产线ID的稳定哈希（不受 PYTHONHASHSEED 影响）选择 Worker。
+"""
+import json
+import zlib
+from typing import Any, Optional
+
+
+def worker_index(line_id: Any, worker_count: int) -> int:
+    """生产线对应的 Worker 序号；没有生产线ID的消息固定交给第一个 Worker"""
+    if worker_count <= 1 or line_id is None:
+        return 0
+    return zlib.crc32(str(line_id).encode("utf-8")) % worker_count
+
+
+def message_line_id(payload: str) -> Optional[str]:
+    """从 MQTT 消息体中取出生产线ID，无法解析时返回 None"""
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        return None
+    if isinstance(data, dict) and data.get("line_id") is not None:
+        return str(data["line_id"])
+    return None
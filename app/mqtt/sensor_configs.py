@@ -238,6 +238,11 @@ def generate_sensor_data_for_db(line_id: str, component_id: str) -> Dict[str, An
     }
 
 
+# 模拟数据使用的生产线和组件
+SIMULATED_LINE_IDS = ["line_001", "line_002", "line_003"]
+SIMULATED_COMPONENT_IDS = ["extruder", "cooler", "winder", "cutter"]
+
+
 def generate_multiple_sensor_data_records(line_ids: Optional[List[str]] = None, component_ids: Optional[List[str]] = None, count: int = 2) -> List[Dict[str, Any]]:
     """
     生成多条SensorData记录
@@ -251,10 +256,10 @@ def generate_multiple_sensor_data_records(line_ids: Optional[List[str]] = None,
         包含多条SensorData记录的列表
     """
     if line_ids is None:
-        line_ids = ["line_001", "line_002", "line_003"]
+        line_ids = SIMULATED_LINE_IDS
     
     if component_ids is None:
-        component_ids = ["extruder", "cooler", "winder", "cutter"]
+        component_ids = SIMULATED_COMPONENT_IDS
     
     records = []
     for _ in range(count):
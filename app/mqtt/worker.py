@@ -7,6 +7,7 @@ import multiprocessing
 from multiprocessing import Queue, Event
 from queue import Empty
 import time
+import socket
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from dateutil import parser
@@ -17,11 +18,20 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from app.core.config import settings
 from app.models.sensor_data import SensorData
 from app.core.logging import get_logger
-from app.websocket.manager import WebSocketManager
+from app.websocket.bus import BusPublisher
 from app.services.alarm_rule_service import AlarmRuleService
 from app.services.alarm_record_service import AlarmRecordService
 from app.services.sensor_data_service import SensorDataService
-from app.mqtt.sensor_configs import generate_multiple_sensor_data_records
+from app.services.energy_service import EnergyService
+from app.services.sensor_stats_service import SensorStatsService
+from app.services.production_run_service import ProductionRunService
+from app.analytics.energy import EnergyAccumulator
+from app.core.latest_values import LatestValueCache
+from app.analytics.stats import LineStatsTracker
+from app.analytics.spc import SpcMonitor
+from app.analytics.runs import ProductionRunTracker
+from app.mqtt.sensor_configs import generate_multiple_sensor_data_records, SIMULATED_LINE_IDS
+from app.mqtt.routing import worker_index
 import random
 
 logger = get_logger(__name__)
@@ -36,43 +46,83 @@ def create_worker_db_session():
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     return SessionLocal()
 
-def worker_process(task_queue: Queue, websocket_queue: Queue, stop_event: Event):
-    """Worker进程主函数"""
+def worker_process(task_queue: Queue, websocket_publisher: BusPublisher, stop_event: Event, latest_values: LatestValueCache = None,
+                   partition: int = 0, partitions: int = 1, energy_totals: LatestValueCache = None):
+    """
+    Worker进程主函数
+    partition/partitions: 本 Worker 的分区序号和分区总数，只处理 worker_index 分配给自己的生产线
+    """
     worker_id = os.getpid()
-    logger.info(f"🚀 Worker进程 {worker_id} 启动")
+    logger.info(f"🚀 Worker进程 {worker_id} 启动（分区 {partition}/{partitions}）")
+    # 模拟数据同样只生成本分区的生产线，保证按生产线维护的状态只在一个 Worker 中
+    simulated_line_ids = [line_id for line_id in SIMULATED_LINE_IDS if worker_index(line_id, partitions) == partition]
     
     # 创建独立的数据库会话
     db = create_worker_db_session()
     alarm_rule_service = AlarmRuleService(db)
     alarm_record_service = AlarmRecordService(db)
-    sensor_data_service = SensorDataService(db, alarm_rule_service, alarm_record_service)
+    spc_monitor = SpcMonitor.from_settings() if settings.SPC_ENABLED else None
+    sensor_data_service = SensorDataService(db, alarm_rule_service, alarm_record_service, spc_monitor=spc_monitor)
+    energy_service = EnergyService(db)
+    energy_accumulator = EnergyAccumulator.from_settings()
+    stats_service = SensorStatsService(db)
+    stats_tracker = LineStatsTracker.from_settings()
+    # 统计快照按 Worker 分行写入，带启动时间避免 PID 复用时覆盖旧进程的数据
+    stats_worker_id = f"{socket.gethostname()}:{worker_id}:{int(time.time())}"
+    run_service = ProductionRunService(db)
+    run_tracker = ProductionRunTracker.from_settings()
 
     try:
         while not stop_event.is_set():
             try:
-                # try:
-                #     msg = task_queue.get(timeout=5)
-                # except Empty:
-                #     continue
-                # except KeyboardInterrupt:
-                #     logger.info(f"🔚 Worker进程 {worker_id} 收到键盘中断信号")
-                #     break
+                if settings.MQTT_SIMULATE_SENSOR_DATA:
+                    time.sleep(60)
+                    if not simulated_line_ids:
+                        continue
+                    msg = None
+                else:
+                    try:
+                        msg = task_queue.get(timeout=5)
+                    except Empty:
+                        continue
 
-                
-                # 检查退出信号
-                # if msg is None:
-                #     logger.warning(f"🔚 Worker进程 {worker_id} 收到退出信号")
-                #     break
+                    # 检查退出信号
+                    if msg is None:
+                        logger.warning(f"🔚 Worker进程 {worker_id} 收到退出信号")
+                        break
                 
                 try:
-                    # msg_data = json.loads(msg)
-                    time.sleep(60)
-                    msg_data = generate_multiple_sensor_data_records(count=2)[0]
+                    if msg is None:
+                        msg_data = generate_multiple_sensor_data_records(line_ids=simulated_line_ids, count=1)[0]
+                    else:
+                        msg_data = json.loads(msg)
                     
                     mutated_sensor_data = sensor_data_service.process_sensor_data(msg_data)
 
-                    if websocket_queue is not None:
-                        websocket_queue.put(mutated_sensor_data)
+                    # 更新共享内存中的最新值
+                    if latest_values is not None:
+                        latest_values.put(msg_data, alarms=[
+                            k for k, v in mutated_sensor_data.items() if isinstance(v, dict) and v.get("alarm")
+                        ])
+
+                    # 能耗积分，定期写入小时能耗表
+                    energy_accumulator.add_sample(msg_data)
+                    if energy_totals is not None:
+                        energy_accumulator.publish(energy_totals, msg_data.get("line_id"))
+                    if energy_accumulator.should_flush():
+                        energy_service.flush(energy_accumulator)
+
+                    # 参数滚动统计，定期写入快照
+                    stats_tracker.update(msg_data)
+                    if stats_tracker.should_snapshot():
+                        stats_service.snapshot(stats_tracker, stats_worker_id)
+
+                    # 生产批次索引，批次号变化时立即写入
+                    if run_tracker.update(msg_data) or run_tracker.should_flush():
+                        run_service.flush(run_tracker)
+
+                    if websocket_publisher is not None:
+                        websocket_publisher.publish("production_data", mutated_sensor_data)
                 except ValueError as e:
                     logger.error(f"⚠️ Worker {worker_id} 消息解析失败: {e}")
             except KeyboardInterrupt:
@@ -84,6 +134,18 @@ def worker_process(task_queue: Queue, websocket_queue: Queue, stop_event: Event)
     except KeyboardInterrupt:
         logger.info(f"🔚 Worker进程 {worker_id} 被键盘中断")
     finally:
+        try:
+            energy_service.flush(energy_accumulator)
+        except Exception as e:
+            logger.error(f"❌ Worker {worker_id} 写入剩余能耗数据失败: {e}")
+        try:
+            stats_service.snapshot(stats_tracker, stats_worker_id)
+        except Exception as e:
+            logger.error(f"❌ Worker {worker_id} 写入剩余统计快照失败: {e}")
+        try:
+            run_service.flush(run_tracker)
+        except Exception as e:
+            logger.error(f"❌ Worker {worker_id} 写入剩余生产批次数据失败: {e}")
         try:
             db.close()
         except:
@@ -0,0 +1,44 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+
+
+class EnergyQuery(BaseModel):
+    """能耗查询模型"""
+    line_ids: Optional[List[str]] = Field(None, description="生产线ID列表，为空表示全部")
+    start_time: datetime = Field(..., description="开始时间（按小时统计）")
+    end_time: datetime = Field(..., description="结束时间（按小时统计）")
+    hourly: bool = Field(False, description="是否返回逐小时明细")
+
+
+class EnergyHourlyItem(BaseModel):
+    """逐小时能耗"""
+    hour: datetime
+    energy_kwh: float
+
+
+class LineEnergy(BaseModel):
+    """单条生产线能耗"""
+    line_id: str
+    total_kwh: float = Field(..., description="总电量（kWh）")
+    zones: Dict[str, float] = Field(..., description="各电流通道电量（kWh）")
+    hourly: Optional[List[EnergyHourlyItem]] = Field(None, description="逐小时电量")
+
+
+class EnergyResponse(BaseModel):
+    """能耗查询响应"""
+    items: List[LineEnergy]
+    total_kwh: float
+
+
+class LineRunningEnergy(BaseModel):
+    """单条生产线的运行累计电量（负责该生产线的 Worker 启动以来）"""
+    line_id: str
+    total_kwh: float = Field(..., description="总电量（kWh）")
+    zones: Dict[str, float] = Field(..., description="各电流通道电量（kWh）")
+    updated_at: Optional[str] = Field(None, description="最近一次积分的采样时间")
+
+
+class RunningEnergyResponse(BaseModel):
+    """运行累计电量响应"""
+    items: List[LineRunningEnergy]
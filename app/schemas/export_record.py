@@ -3,7 +3,7 @@ from typing import Literal, Optional
 from datetime import datetime
 
 # 导出任务状态类型
-ExportRecordStatus = Literal['pending', 'processing', 'completed', 'failed']
+ExportRecordStatus = Literal['pending', 'processing', 'completed', 'failed', 'expired']
 
 
 class ExportRecordBase(BaseModel):
@@ -16,11 +16,13 @@ class ExportRecordBase(BaseModel):
     created_by: Optional[str] = Field(None, description="创建用户")
 
 class ExportRecordCreate(ExportRecordBase):
-    pass
+    params: Optional[str] = Field(None, description="导出参数（JSON），后台任务据此生成文件")
+    cache_key: Optional[str] = Field(None, description="导出缓存键")
 
 class ExportRecordInDB(ExportRecordBase):
     id: int = Field(..., description="导出记录ID")
     status: ExportRecordStatus = Field(..., description="任务状态")
+    error_message: Optional[str] = Field(None, description="失败原因")
     created_at: datetime = Field(..., description="创建时间")
     updated_at: datetime = Field(..., description="更新时间")
     
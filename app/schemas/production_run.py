@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class ProductionRunQuery(BaseModel):
+    """生产批次查询模型"""
+    batch_product_number: Optional[str] = Field(None, description="批次号", example="P-1234")
+    line_ids: Optional[List[str]] = Field(None, description="生产线ID列表，为空表示全部")
+    start_time: Optional[datetime] = Field(None, description="与该时间之后有重叠的批次")
+    end_time: Optional[datetime] = Field(None, description="与该时间之前有重叠的批次")
+    limit: int = Field(100, ge=1, le=1000, description="最多返回条数")
+
+
+class ProductionRunItem(BaseModel):
+    """生产批次"""
+    line_id: str
+    batch_product_number: str
+    start_ts: datetime
+    end_ts: datetime
+    row_count: int
+    diameter_mean: Optional[float] = None
+    diameter_min: Optional[float] = None
+    diameter_max: Optional[float] = None
+    max_length: Optional[float] = None
+    target_length: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ProductionRunResponse(BaseModel):
+    """生产批次查询响应"""
+    items: List[ProductionRunItem]
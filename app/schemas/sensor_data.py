@@ -1,6 +1,6 @@
-from typing import Optional, List
+from typing import Optional, List, Literal, Dict
 from pydantic import BaseModel, Field, ConfigDict
-from datetime import datetime
+from datetime import datetime, date
 
 
 class SensorDataBase(BaseModel):
@@ -63,17 +63,46 @@ class SensorDataFilter(BaseModel):
     component_id: Optional[str] = None
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
-    parameter_name: Optional[str] = None
+    parameter_name: Optional[str] = Field(None, description="需要返回的参数列（逗号分隔），为空返回全部列")
+    batch_product_number: Optional[str] = Field(None, description="批次号，按生产批次索引裁剪时间范围")
     page: Optional[int] = 1
     size: Optional[int] = 100
 
 
+class SensorDataColumnsFilter(BaseModel):
+    line_id: str = Field(..., description="生产线ID", example="LINE_001")
+    component_id: Optional[str] = None
+    start_time: datetime = Field(..., description="开始时间")
+    end_time: datetime = Field(..., description="结束时间")
+    parameter_names: List[str] = Field(..., min_length=1, description="需要返回的参数列", example=["temp_body_zone1", "diameter"])
+
+
+class SensorDataColumnsResponse(BaseModel):
+    line_id: str
+    count: int
+    timestamps: List[int] = Field(..., description="时间戳数组（Unix 毫秒）")
+    columns: Dict[str, List[Optional[float]]] = Field(..., description="参数名 -> 数值数组，与 timestamps 一一对应")
+
+
+# 流式查询输出格式
+SensorDataStreamFormat = Literal['ndjson', 'arrow']
+
+# 列式查询输出格式
+SensorDataColumnsFormat = Literal['json', 'arrow']
+
+
+# 导出文件格式
+SensorDataExportFormat = Literal['xlsx', 'csv', 'csv.gz', 'csv.zst', 'parquet', 'arrow']
+
+
 class SensorDataExportFilter(BaseModel):
     line_ids: str = Field(..., description="生产线ID", example="LINE_001,LINE_002")
     component_id: Optional[str] = None
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
     parameter_names: Optional[str] = None
+    batch_product_number: Optional[str] = Field(None, description="批次号，按生产批次索引裁剪时间范围")
+    format: SensorDataExportFormat = Field('xlsx', description="导出格式: xlsx | csv | csv.gz | csv.zst | parquet | arrow")
 
 
 class SensorDataListResponse(BaseModel):
@@ -87,4 +116,51 @@ class UtilizationResponse(BaseModel):
     line_id: str
     total_run_time_seconds: int
     total_idle_time_seconds: int
-    total_offline_time_seconds: int
\ No newline at end of file
+    total_offline_time_seconds: int
+
+
+# 利用率计算数据源：raw 原始数据窗口函数；aggregate 1 分钟连续聚合；auto 按时间范围自动选择
+UtilizationSource = Literal['auto', 'raw', 'aggregate']
+
+
+class UtilizationQuery(BaseModel):
+    line_ids: Optional[List[str]] = Field(None, description="生产线ID列表，为空表示范围内有数据的全部生产线")
+    start_time: datetime = Field(..., description="开始时间")
+    end_time: datetime = Field(..., description="结束时间")
+    source: UtilizationSource = Field('auto', description="数据源")
+
+
+class UtilizationDailyItem(BaseModel):
+    line_id: str
+    day: date
+    total_run_time_seconds: int
+    total_idle_time_seconds: int
+    total_offline_time_seconds: int
+
+
+class UtilizationDailyResponse(BaseModel):
+    items: List[UtilizationDailyItem]
+    source: UtilizationSource
+
+
+
+class KpiQuery(BaseModel):
+    line_ids: List[str] = Field(..., min_length=1, description="生产线ID列表", example=["LINE_001", "LINE_002"])
+    start_time: datetime = Field(..., description="开始时间")
+    end_time: datetime = Field(..., description="结束时间")
+
+
+class LineKpi(BaseModel):
+    line_id: str
+    total_run_time_seconds: int
+    total_idle_time_seconds: int
+    total_offline_time_seconds: int
+    output_length: float = Field(..., description="产出长度（current_length 增量累加，换卷时按新卷长度计）")
+    avg_temperatures: Dict[str, Optional[float]] = Field(..., description="各温区平均温度")
+
+
+class KpiResponse(BaseModel):
+    items: List[LineKpi]
+    start_time: datetime = Field(..., description="实际统计开始时间（按缓存粒度对齐）")
+    end_time: datetime = Field(..., description="实际统计结束时间（按缓存粒度对齐）")
+    cached: bool = False
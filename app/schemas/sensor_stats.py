@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class SensorStatsQuery(BaseModel):
+    """参数统计查询模型"""
+    line_ids: Optional[List[str]] = Field(None, description="生产线ID列表，为空表示全部")
+    parameter_names: Optional[List[str]] = Field(None, description="参数列表，为空表示全部")
+    window_start: Optional[datetime] = Field(None, description="统计窗口开始时间，为空表示每条生产线最新窗口")
+
+
+class SensorStatsItem(BaseModel):
+    """单个 (生产线, 参数) 的窗口统计"""
+    line_id: str
+    parameter: str
+    window_start: datetime
+    count: int
+    mean: float
+    std: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    ewma: Optional[float] = None
+    last_ts: Optional[datetime] = None
+
+
+class SensorStatsResponse(BaseModel):
+    """参数统计查询响应"""
+    items: List[SensorStatsItem]
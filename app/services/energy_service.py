@@ -0,0 +1,103 @@
+from typing import List, Dict
+from collections import defaultdict
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from app.analytics.energy import EnergyAccumulator, hour_bucket
+from app.models.energy import EnergyHourly
+from app.schemas.energy import EnergyQuery, EnergyResponse, LineEnergy, EnergyHourlyItem
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class EnergyService:
+    """能耗服务 - 写入 Worker 累计的小时能耗增量，并提供按生产线/通道的能耗查询"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def flush(self, accumulator: EnergyAccumulator) -> int:
+        """把累加器中的小时增量 upsert 到 energy_hourly（与已有值相加），返回写入行数"""
+        rows = accumulator.drain()
+        if not rows:
+            return 0
+
+        try:
+            stmt = insert(EnergyHourly).values([
+                {
+                    "hour": hour,
+                    "line_id": line_id,
+                    "channel": channel,
+                    "energy_kwh": kwh,
+                    "sample_seconds": seconds,
+                }
+                for hour, line_id, channel, kwh, seconds in rows
+            ])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[EnergyHourly.hour, EnergyHourly.line_id, EnergyHourly.channel],
+                set_={
+                    "energy_kwh": EnergyHourly.energy_kwh + stmt.excluded.energy_kwh,
+                    "sample_seconds": EnergyHourly.sample_seconds + stmt.excluded.sample_seconds,
+                    "updated_at": func.now(),
+                },
+            )
+            self.db.execute(stmt)
+            self.db.commit()
+            logger.info(f"写入小时能耗增量 {len(rows)} 条")
+            return len(rows)
+
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            accumulator.restore(rows)
+            logger.error(f"写入小时能耗失败: {e}")
+            raise
+
+    def get_energy(self, query: EnergyQuery) -> EnergyResponse:
+        """按生产线和电流通道汇总能耗"""
+        try:
+            filters = [
+                EnergyHourly.hour >= hour_bucket(query.start_time),
+                EnergyHourly.hour < query.end_time,
+            ]
+            if query.line_ids:
+                filters.append(EnergyHourly.line_id.in_(query.line_ids))
+
+            zones: Dict[str, Dict[str, float]] = defaultdict(dict)
+            rows = (
+                self.db.query(EnergyHourly.line_id, EnergyHourly.channel, func.sum(EnergyHourly.energy_kwh))
+                .filter(*filters)
+                .group_by(EnergyHourly.line_id, EnergyHourly.channel)
+                .all()
+            )
+            for line_id, channel, kwh in rows:
+                zones[line_id][channel] = float(kwh or 0)
+
+            hourly: Dict[str, List[EnergyHourlyItem]] = defaultdict(list)
+            if query.hourly:
+                rows = (
+                    self.db.query(EnergyHourly.line_id, EnergyHourly.hour, func.sum(EnergyHourly.energy_kwh))
+                    .filter(*filters)
+                    .group_by(EnergyHourly.line_id, EnergyHourly.hour)
+                    .order_by(EnergyHourly.line_id, EnergyHourly.hour)
+                    .all()
+                )
+                for line_id, hour, kwh in rows:
+                    hourly[line_id].append(EnergyHourlyItem(hour=hour, energy_kwh=float(kwh or 0)))
+
+            line_ids = list(query.line_ids) if query.line_ids else sorted(zones)
+            items = [
+                LineEnergy(
+                    line_id=line_id,
+                    total_kwh=sum(zones.get(line_id, {}).values()),
+                    zones=zones.get(line_id, {}),
+                    hourly=hourly.get(line_id, []) if query.hourly else None,
+                )
+                for line_id in line_ids
+            ]
+            return EnergyResponse(items=items, total_kwh=sum(item.total_kwh for item in items))
+
+        except SQLAlchemyError as e:
+            logger.error(f"Database error when querying energy: {e}")
+            raise
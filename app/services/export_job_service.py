@@ -0,0 +1,220 @@
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.logging import get_logger
+from app.exporters import get_export_cache
+from app.schemas.sensor_data import SensorDataExportFilter
+from app.services.export_record_service import ExportRecordService
+from app.services.sensor_data_service import SensorDataService
+
+logger = get_logger(__name__)
+
+# EXPORT_DIR 中的导出文件及其未写完的临时文件（导出缓存在单独的子目录中，不在此匹配）
+_EXPORT_FILE_PATTERN = re.compile(r"^sensor_data_export_(\d+)\.\w+(\.part)?$")
+
+
+def export_file_path(export_id: int, file_format: str) -> str:
+    """导出文件的保存路径"""
+    return os.path.join(settings.EXPORT_DIR, f"sensor_data_export_{export_id}.{file_format}")
+
+
+def export_line_part(params: str, line_id: str, part_path: str) -> int:
+    """在分片进程中导出一条生产线（独立数据库连接），返回记录数"""
+    db = SessionLocal()
+    try:
+        filters = SensorDataExportFilter.model_validate_json(params)
+        return SensorDataService(db).export_line_part(filters, line_id, part_path)
+    finally:
+        db.close()
+
+
+def _export_lines_parallel(db, filters: SensorDataExportFilter, params: str, line_ids: List[str], path: str) -> int:
+    """
+    多条生产线并行导出：每条生产线由一个进程查询并序列化为分片，全部完成后按生产线顺序合并，
+    耗时取决于数据最多的生产线
+    """
+    part_dir = tempfile.mkdtemp(prefix="export_parts_", dir=os.path.dirname(path))
+    try:
+        part_paths = [os.path.join(part_dir, f"{i}.part") for i in range(len(line_ids))]
+        with ProcessPoolExecutor(
+            max_workers=min(len(line_ids), settings.EXPORT_LINE_WORKERS),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            futures = [
+                executor.submit(export_line_part, params, line_id, part_path)
+                for line_id, part_path in zip(line_ids, part_paths)
+            ]
+            counts = [future.result() for future in futures]
+
+        parts = list(zip(line_ids, part_paths, counts))
+        return SensorDataService(db).merge_export_parts(filters, parts, path)
+    finally:
+        shutil.rmtree(part_dir, ignore_errors=True)
+
+
+def run_export_job(export_id: int) -> None:
+    """在导出进程中执行一个导出任务：生成文件、更新导出记录状态和大小"""
+    db = SessionLocal()
+    record_service = ExportRecordService(db)
+    temp_path = None
+    try:
+        record = record_service.get_export_record_by_id(export_id)
+        if record is None:
+            logger.warning(f"导出任务不存在: {export_id}")
+            return
+        if record.status == 'completed' and record.file_path and os.path.exists(record.file_path):
+            return
+
+        record_service.update_export_record_status_and_size(export_id, 'processing')
+
+        filters = SensorDataExportFilter.model_validate_json(record.params)
+        path = export_file_path(export_id, record.format)
+        temp_path = f"{path}.part"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        line_ids = SensorDataService.export_line_ids(filters)
+        if len(line_ids) > 1 and settings.EXPORT_LINE_WORKERS > 1:
+            total_records = _export_lines_parallel(db, filters, record.params, line_ids, temp_path)
+        else:
+            total_records = SensorDataService(db).export_sensor_data_to_file(filters, temp_path)
+        # 写完后再改名，下载接口不会读到半个文件；可缓存的查询直接放入导出缓存
+        if record.cache_key:
+            path = get_export_cache().put(record.cache_key, record.format, temp_path)
+        else:
+            os.replace(temp_path, path)
+        temp_path = None
+
+        record_service.update_export_record_status_and_size(
+            export_id, 'completed', os.path.getsize(path), file_path=path
+        )
+        logger.info(f"导出任务 {export_id} 完成，记录数: {total_records}")
+
+    except Exception as e:
+        logger.error(f"导出任务 {export_id} 失败: {e}", exc_info=True)
+        try:
+            record_service.update_export_record_status_and_size(export_id, 'failed', error_message=str(e))
+        except Exception as update_error:
+            logger.error(f"更新导出任务 {export_id} 状态失败: {update_error}")
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            try:
+                os.unlink(temp_path)
+            except OSError as cleanup_error:
+                logger.error(f"清理临时文件失败: {cleanup_error}")
+        db.close()
+
+
+def remove_expired_export_files(directory: str, cutoff: float) -> Dict[int, str]:
+    """
+    删除目录中修改时间早于 cutoff（Unix 秒）的导出文件，返回 {导出记录ID: 文件路径}；
+    残留的 .part 临时文件一并删除，但不对应已完成的记录
+    """
+    removed: Dict[int, str] = {}
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return removed
+
+    for entry in entries:
+        match = _EXPORT_FILE_PATTERN.match(entry.name)
+        if not match or not entry.is_file():
+            continue
+        try:
+            if entry.stat().st_mtime >= cutoff:
+                continue
+            os.unlink(entry.path)
+        except OSError as e:
+            logger.error(f"删除过期导出文件失败 {entry.path}: {e}")
+            continue
+        if not match.group(2):
+            removed[int(match.group(1))] = entry.path
+    return removed
+
+
+def sweep_expired_exports() -> int:
+    """清理超过保留时长的导出文件，并把对应记录标记为 expired（下载接口返回 410），返回标记条数"""
+    removed = remove_expired_export_files(settings.EXPORT_DIR, time.time() - settings.EXPORT_RETENTION_SECONDS)
+    if not removed:
+        return 0
+    db = SessionLocal()
+    try:
+        expired = ExportRecordService(db).mark_export_records_expired(removed)
+    finally:
+        db.close()
+    logger.info(f"清理过期导出文件 {len(removed)} 个，标记过期记录 {expired} 条")
+    return expired
+
+
+class ExportJobManager:
+    """导出任务管理器 - 用进程池在后台生成导出文件，请求只负责创建任务"""
+
+    def __init__(self):
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop_sweeper = threading.Event()
+
+    def start(self) -> None:
+        """启动导出进程池，并重新提交上次未完成的任务"""
+        if self.executor is not None:
+            return
+        os.makedirs(settings.EXPORT_DIR, exist_ok=True)
+        # spawn：子进程不继承父进程的数据库连接
+        self.executor = ProcessPoolExecutor(
+            max_workers=settings.EXPORT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        logger.info(f"导出进程池已启动，进程数: {settings.EXPORT_WORKERS}")
+
+        db = SessionLocal()
+        try:
+            for export_id in ExportRecordService(db).get_unfinished_export_ids():
+                self.submit(export_id)
+        except Exception as e:
+            logger.error(f"重新提交未完成的导出任务失败: {e}")
+        finally:
+            db.close()
+
+        # 定期清理过期导出文件（启动时先执行一次）
+        self._stop_sweeper.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="export-retention", daemon=True)
+        self._sweeper.start()
+
+    def _sweep_loop(self) -> None:
+        while True:
+            try:
+                sweep_expired_exports()
+            except Exception as e:
+                logger.error(f"清理过期导出文件失败: {e}")
+            if self._stop_sweeper.wait(settings.EXPORT_RETENTION_SWEEP_INTERVAL_SECONDS):
+                return
+
+    def submit(self, export_id: int) -> Future:
+        """提交导出任务"""
+        if self.executor is None:
+            raise RuntimeError("导出进程池未启动")
+        logger.info(f"提交导出任务: {export_id}")
+        return self.executor.submit(run_export_job, export_id)
+
+    def stop(self) -> None:
+        """停止导出进程池（正在执行的任务完成后退出，排队任务在下次启动时重新提交）"""
+        if self.executor is None:
+            return
+        self._stop_sweeper.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.executor = None
+        logger.info("导出进程池已停止")
+
+
+# 全局导出任务管理器
+export_job_manager = ExportJobManager()
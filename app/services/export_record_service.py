@@ -1,7 +1,7 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 from sqlalchemy.exc import SQLAlchemyError
-from typing import List, Optional
+from typing import Dict, List, Optional
 from app.models.export_record import ExportRecord
 from app.schemas.export_record import ExportRecordCreate, ExportRecordFilter, ExportRecordListResponse
 from datetime import datetime
@@ -27,6 +27,8 @@ class ExportRecordService:
                 format=export_data.format,
                 size=export_data.size,
                 created_by=export_data.created_by,
+                params=export_data.params,
+                cache_key=export_data.cache_key,
                 status='pending'
             )
             
@@ -80,7 +82,7 @@ class ExportRecordService:
             logger.error(f"Database error when getting export record by ID {export_id}: {str(e)}")
             raise
     
-    def update_export_record_status_and_size(self, export_id: int, status: str, size: int=None) -> Optional[ExportRecord]:
+    def update_export_record_status_and_size(self, export_id: int, status: str, size: int=None, file_path: str=None, error_message: str=None) -> Optional[ExportRecord]:
         """更新导出记录状态"""
         try:
             db_export = self.get_export_record_by_id(export_id)
@@ -91,6 +93,10 @@ class ExportRecordService:
             db_export.status = status
             if size is not None:
                 db_export.size = size
+            if file_path is not None:
+                db_export.file_path = file_path
+            if error_message is not None:
+                db_export.error_message = error_message
             self.db.commit()
             self.db.refresh(db_export)
             logger.info(f"Updated export record {export_id} status to {status}")
@@ -99,3 +105,38 @@ class ExportRecordService:
             self.db.rollback()
             logger.error(f"Database error when updating export record {export_id}: {str(e)}")
             raise
+
+    def mark_export_records_expired(self, file_paths: Dict[int, str]) -> int:
+        """把文件已被清理的已完成导出记录标记为 expired（只更新仍指向该文件的记录），返回更新条数"""
+        if not file_paths:
+            return 0
+        try:
+            updated = (
+                self.db.query(ExportRecord)
+                .filter(
+                    ExportRecord.id.in_(list(file_paths)),
+                    ExportRecord.file_path.in_(list(file_paths.values())),
+                    ExportRecord.status == 'completed',
+                )
+                .update({ExportRecord.status: 'expired'}, synchronize_session=False)
+            )
+            self.db.commit()
+            return updated
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            logger.error(f"Database error when expiring export records: {str(e)}")
+            raise
+
+    def get_unfinished_export_ids(self) -> List[int]:
+        """获取未完成（排队中或处理中）的导出任务ID，服务重启后重新提交"""
+        try:
+            rows = (
+                self.db.query(ExportRecord.id)
+                .filter(ExportRecord.status.in_(['pending', 'processing']), ExportRecord.params.isnot(None))
+                .order_by(ExportRecord.id)
+                .all()
+            )
+            return [row.id for row in rows]
+        except SQLAlchemyError as e:
+            logger.error(f"Database error when getting unfinished export records: {str(e)}")
+            raise
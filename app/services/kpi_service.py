@@ -0,0 +1,165 @@
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text, bindparam
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.models.sensor_data import PARAMETER_COLUMNS
+from app.schemas.sensor_data import KpiQuery, KpiResponse, LineKpi
+from app.utils.cache import TTLCache
+
+logger = get_logger(__name__)
+
+TEMPERATURE_COLUMNS = [name for name in PARAMETER_COLUMNS if name.startswith("temp_")]
+
+# 多条生产线的 KPI 在一条分组查询中完成：
+# - 运行/空闲时间：按生产线在有转速的采样之间用 lead(timestamp) 积分，间隔超过上限的部分计为离线
+# - 产出长度：按组件累加 current_length 的增量（减小视为换卷，计入新卷长度），生产线取各组件最大值
+# - 平均温度：按组件求和与计数，再在生产线层面合并
+_KPI_SQL = """
+WITH samples AS (
+    SELECT line_id,
+           component_id,
+           motor_screw_speed,
+           current_length,
+           {temp_columns},
+           CASE WHEN motor_screw_speed IS NOT NULL THEN GREATEST(LEAST(
+               EXTRACT(EPOCH FROM (COALESCE(LEAD(timestamp) OVER w_speed, CAST(:end_time AS timestamptz)) - timestamp)),
+               :gap_cap
+           ), 0) END AS dt,
+           current_length - LAG(current_length) OVER w_length AS length_delta
+    FROM sensor_data
+    WHERE timestamp >= :start_time AND timestamp < :end_time
+      AND line_id IN :line_ids
+    WINDOW w_speed AS (PARTITION BY line_id, motor_screw_speed IS NOT NULL ORDER BY timestamp),
+           w_length AS (PARTITION BY line_id, component_id, current_length IS NOT NULL ORDER BY timestamp)
+), per_component AS (
+    SELECT line_id,
+           component_id,
+           SUM(dt) FILTER (WHERE motor_screw_speed > :threshold) AS run_seconds,
+           SUM(dt) FILTER (WHERE motor_screw_speed <= :threshold) AS idle_seconds,
+           SUM(CASE WHEN length_delta >= 0 THEN length_delta
+                    WHEN length_delta < 0 THEN current_length
+                    ELSE 0 END) AS output_length,
+           {temp_sums}
+    FROM samples
+    GROUP BY line_id, component_id
+)
+SELECT line_id,
+       COALESCE(SUM(run_seconds), 0) AS run_seconds,
+       COALESCE(SUM(idle_seconds), 0) AS idle_seconds,
+       COALESCE(MAX(output_length), 0) AS output_length,
+       {temp_avgs}
+FROM per_component
+GROUP BY line_id
+"""
+
+
+def _build_kpi_sql() -> str:
+    return _KPI_SQL.format(
+        temp_columns=", ".join(TEMPERATURE_COLUMNS),
+        temp_sums=",\n           ".join(
+            f"SUM({name}) AS {name}_sum, COUNT({name}) AS {name}_count" for name in TEMPERATURE_COLUMNS
+        ),
+        temp_avgs=",\n       ".join(
+            f"SUM({name}_sum) / NULLIF(SUM({name}_count), 0) AS {name}" for name in TEMPERATURE_COLUMNS
+        ),
+    )
+
+
+def _floor_to_bucket(value: datetime, bucket_seconds: int) -> datetime:
+    """按缓存粒度向下对齐时间（无时区的时间按 UTC 处理）"""
+    aware = value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    epoch = int(aware.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % bucket_seconds, tz=timezone.utc)
+
+
+def _ceil_to_bucket(value: datetime, bucket_seconds: int) -> datetime:
+    """按缓存粒度向上对齐时间（已对齐的时间不变）"""
+    floored = _floor_to_bucket(value, bucket_seconds)
+    aware = value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return floored if floored == aware else floored + timedelta(seconds=bucket_seconds)
+
+
+def _cache_ttl(end_time: datetime, now: datetime) -> Optional[int]:
+    """
+    缓存时长：结束时间早于迟到数据窗口的范围不会再变化，缓存更久；
+    其余范围（包括刚结束、仍可能补入迟到数据的）使用默认短 TTL（返回 None）
+    """
+    if end_time <= now - timedelta(seconds=settings.KPI_CACHE_LATE_DATA_SECONDS):
+        return settings.KPI_CACHE_CLOSED_TTL_SECONDS
+    return None
+
+
+# 进程内 KPI 缓存，键为 (生产线集合, 向下对齐的开始时间, 向上对齐的结束时间)
+_kpi_cache = TTLCache(settings.KPI_CACHE_TTL_SECONDS, settings.KPI_CACHE_MAX_ENTRIES)
+
+
+class KpiService:
+    """生产线 KPI 服务 - 多条生产线的运行/空闲/离线时间、产出长度和平均温度批量计算"""
+
+    _sql = _build_kpi_sql()
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _cache_key(self, query: KpiQuery) -> Tuple[Tuple[str, ...], datetime, datetime]:
+        bucket = settings.KPI_CACHE_BUCKET_SECONDS
+        return (
+            tuple(sorted(set(query.line_ids))),
+            _floor_to_bucket(query.start_time, bucket),
+            # 结束时间向上对齐，短于一个粒度或不跨越边界的范围不会变成空范围
+            _ceil_to_bucket(query.end_time, bucket),
+        )
+
+    def _compute(self, line_ids: Tuple[str, ...], start_time: datetime, end_time: datetime) -> List[LineKpi]:
+        stmt = text(self._sql).bindparams(bindparam("line_ids", expanding=True))
+        result = self.db.execute(stmt, {
+            "line_ids": list(line_ids),
+            "start_time": start_time,
+            "end_time": end_time,
+            "gap_cap": settings.UTILIZATION_GAP_CAP_SECONDS,
+            "threshold": settings.UTILIZATION_RUN_SPEED_THRESHOLD,
+        })
+        rows: Dict[str, Any] = {row.line_id: row for row in result}
+
+        total_seconds = (end_time - start_time).total_seconds()
+        items: List[LineKpi] = []
+        for line_id in line_ids:
+            row = rows.get(line_id)
+            running = float(row.run_seconds) if row else 0.0
+            idle = float(row.idle_seconds) if row else 0.0
+            items.append(LineKpi(
+                line_id=line_id,
+                total_run_time_seconds=int(running),
+                total_idle_time_seconds=int(idle),
+                total_offline_time_seconds=int(max(0.0, total_seconds - running - idle)),
+                output_length=float(row.output_length) if row else 0.0,
+                avg_temperatures={
+                    name: (float(getattr(row, name)) if row and getattr(row, name) is not None else None)
+                    for name in TEMPERATURE_COLUMNS
+                },
+            ))
+        return items
+
+    def get_kpis(self, query: KpiQuery) -> KpiResponse:
+        """批量获取生产线 KPI，结果按 (生产线集合, 时间范围桶) 缓存"""
+        try:
+            key = self._cache_key(query)
+            line_ids, start_time, end_time = key
+
+            items = _kpi_cache.get(key)
+            if items is not None:
+                return KpiResponse(items=items, start_time=start_time, end_time=end_time, cached=True)
+
+            items = self._compute(line_ids, start_time, end_time)
+
+            _kpi_cache.set(key, items, _cache_ttl(end_time, datetime.now(timezone.utc)))
+
+            logger.info(f"KPI 计算完成: 生产线={len(line_ids)}, 范围={start_time} ~ {end_time}")
+            return KpiResponse(items=items, start_time=start_time, end_time=end_time, cached=False)
+
+        except SQLAlchemyError as e:
+            logger.error(f"Database error when computing KPIs: {e}")
+            raise
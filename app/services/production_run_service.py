@@ -0,0 +1,108 @@
+import math
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from app.analytics.runs import ProductionRunTracker
+from app.models.production_run import ProductionRun
+from app.schemas.production_run import ProductionRunQuery, ProductionRunResponse, ProductionRunItem
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class ProductionRunService:
+    """生产批次服务 - 合并写入 Worker 的批次增量，并为按批次查询提供时间范围"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def flush(self, tracker: ProductionRunTracker) -> int:
+        """把批次增量合并到 production_runs（同一批次可由多个 Worker 写入）"""
+        rows = tracker.drain()
+        if not rows:
+            return 0
+
+        try:
+            stmt = insert(ProductionRun).values([
+                {
+                    "line_id": line_id,
+                    "batch_product_number": batch,
+                    "start_ts": delta.start_ts,
+                    "end_ts": delta.end_ts,
+                    "row_count": delta.row_count,
+                    "diameter_count": delta.diameter_count,
+                    "diameter_mean": delta.diameter_sum / delta.diameter_count if delta.diameter_count else None,
+                    "diameter_min": delta.diameter_min if math.isfinite(delta.diameter_min) else None,
+                    "diameter_max": delta.diameter_max if math.isfinite(delta.diameter_max) else None,
+                    "max_length": delta.max_length,
+                    "target_length": delta.target_length,
+                }
+                for line_id, batch, delta in rows
+            ])
+            excluded = stmt.excluded
+            diameter_count = ProductionRun.diameter_count + excluded.diameter_count
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[ProductionRun.line_id, ProductionRun.batch_product_number],
+                set_={
+                    "start_ts": func.least(ProductionRun.start_ts, excluded.start_ts),
+                    "end_ts": func.greatest(ProductionRun.end_ts, excluded.end_ts),
+                    "row_count": ProductionRun.row_count + excluded.row_count,
+                    "diameter_count": diameter_count,
+                    "diameter_mean": (
+                        func.coalesce(ProductionRun.diameter_mean, 0) * ProductionRun.diameter_count
+                        + func.coalesce(excluded.diameter_mean, 0) * excluded.diameter_count
+                    ) / func.nullif(diameter_count, 0),
+                    # LEAST / GREATEST 忽略 NULL
+                    "diameter_min": func.least(ProductionRun.diameter_min, excluded.diameter_min),
+                    "diameter_max": func.greatest(ProductionRun.diameter_max, excluded.diameter_max),
+                    "max_length": func.greatest(ProductionRun.max_length, excluded.max_length),
+                    "target_length": func.coalesce(excluded.target_length, ProductionRun.target_length),
+                    "updated_at": func.now(),
+                },
+            )
+            self.db.execute(stmt)
+            self.db.commit()
+            return len(rows)
+
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            tracker.restore(rows)
+            logger.error(f"写入生产批次失败: {e}")
+            raise
+
+    def list_runs(self, query: ProductionRunQuery) -> ProductionRunResponse:
+        """按批次号、生产线和时间范围查询批次"""
+        try:
+            db_query = self.db.query(ProductionRun)
+            if query.batch_product_number:
+                db_query = db_query.filter(ProductionRun.batch_product_number == query.batch_product_number)
+            if query.line_ids:
+                db_query = db_query.filter(ProductionRun.line_id.in_(query.line_ids))
+            if query.start_time:
+                db_query = db_query.filter(ProductionRun.end_ts >= query.start_time)
+            if query.end_time:
+                db_query = db_query.filter(ProductionRun.start_ts <= query.end_time)
+
+            runs = db_query.order_by(ProductionRun.start_ts.desc()).limit(query.limit).all()
+            return ProductionRunResponse(items=[ProductionRunItem.model_validate(run) for run in runs])
+
+        except SQLAlchemyError as e:
+            logger.error(f"Database error when querying production runs: {e}")
+            raise
+
+    def get_time_ranges(self, batch_product_number: str, line_ids: Optional[List[str]] = None) -> Dict[str, Tuple[datetime, datetime]]:
+        """批次在各生产线上的 (开始, 结束) 时间，用于把原始数据查询限定到对应的 chunk"""
+        try:
+            db_query = self.db.query(ProductionRun.line_id, ProductionRun.start_ts, ProductionRun.end_ts).filter(
+                ProductionRun.batch_product_number == batch_product_number
+            )
+            if line_ids:
+                db_query = db_query.filter(ProductionRun.line_id.in_(line_ids))
+            return {line_id: (start_ts, end_ts) for line_id, start_ts, end_ts in db_query.all()}
+
+        except SQLAlchemyError as e:
+            logger.error(f"Database error when querying production run range: {e}")
+            raise
@@ -1,19 +1,25 @@
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
-from sqlalchemy import func, case
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from app.models.sensor_data import SensorData
+from app.models.sensor_data import SensorData, PARAMETER_COLUMNS
+from app.core.config import settings
 from app.core.database import SessionLocal
 from app.core.logging import get_logger
 from app.services.alarm_rule_service import AlarmRuleService
 from app.services.alarm_record_service import AlarmRecordService
 from app.services.export_record_service import ExportRecordService
-from app.schemas.export_record import ExportRecordCreate
+from app.services.utilization_service import UtilizationService
+from app.services.production_run_service import ProductionRunService
 from app.schemas.alarm_record import AlarmRecordCreate
-from app.schemas.sensor_data import SensorDataFilter, SensorDataExportFilter, SensorDataListResponse, SensorData as SensorDataSchema, UtilizationResponse
-import pandas as pd
-import io
+from app.schemas.sensor_data import SensorDataFilter, SensorDataExportFilter, SensorDataListResponse, SensorData as SensorDataSchema, UtilizationResponse, SensorDataColumnsFilter, UtilizationQuery
+from app.utils.stream_encoders import encode_ndjson, ArrowStreamEncoder
+from app.analytics.spc import SpcMonitor, RATE_SUFFIX
+from app.exporters import XlsxStreamWriter, ChunkSink, create_exporter, merge_parts
+import numpy as np
+import itertools
+import pickle
 
 logger = get_logger(__name__)
 
@@ -21,11 +27,12 @@ logger = get_logger(__name__)
 class SensorDataService:
     """传感器数据服务"""
     
-    def __init__(self, db, alarm_rule_service: AlarmRuleService=None, alarm_record_service: AlarmRecordService=None, export_record_service: ExportRecordService=None):
+    def __init__(self, db, alarm_rule_service: AlarmRuleService=None, alarm_record_service: AlarmRecordService=None, export_record_service: ExportRecordService=None, spc_monitor: SpcMonitor=None):
         self.db = db
         self.alarm_rule_service = alarm_rule_service
         self.alarm_record_service = alarm_record_service
         self.export_record_service = export_record_service
+        self.spc_monitor = spc_monitor
 
     def save_sensor_data(self, sensor_data: Dict[str, Any]) -> int:
         """批量保存传感器读数到数据库"""
@@ -89,6 +96,9 @@ class SensorDataService:
 
                 mutated_sensor_data[k] = newv
 
+            if self.spc_monitor is not None:
+                alarmed_records.extend(self._check_spc(sensor_data, mutated_sensor_data, alarmed_records))
+
             for alarm_record in alarmed_records:
                 self.alarm_record_service.create_alarm_record(alarm_record)
 
@@ -97,16 +107,82 @@ class SensorDataService:
         except Exception as e:
             logger.error(f"Error processing sensor data: {e}")
             raise
+
+    def _check_spc(self, sensor_data: Dict[str, Any], mutated_sensor_data: Dict[str, Any],
+                   alarmed_records: List[AlarmRecordCreate]) -> List[AlarmRecordCreate]:
+        """
+        SPC 判异，同一参数的多条规则合并为一条报警记录
+        报警记录按 (timestamp, line_id, parameter_name) 唯一，规则报警已占用的参数把 SPC 信息并入该条记录；
+        变化率信号（如 current_length_rate）没有对应的列，记录在原始参数上并在信息中注明变化率
+        """
+        messages: Dict[str, List[str]] = {}
+        for violation in self.spc_monitor.update(sensor_data):
+            parameter = violation.parameter
+            message = violation.message
+            if parameter.endswith(RATE_SUFFIX):
+                parameter = parameter[:-len(RATE_SUFFIX)]
+                message = f"变化率 {violation.value:.4g}/s：{message}"
+            messages.setdefault(parameter, []).append(message)
+
+            field = mutated_sensor_data.get(parameter)
+            if isinstance(field, dict):
+                field["alarm"] = True
+                field["alarmCode"] = field["alarmCode"] or violation.code
+                field["alarmMessage"] = field["alarmMessage"] or f"[SPC] {message}"
+
+        rule_records = {}
+        for record in alarmed_records:
+            rule_records.setdefault(record.parameter_name, record)
+
+        spc_records = []
+        for parameter, parameter_messages in messages.items():
+            alarm_message = "[SPC] " + "；".join(parameter_messages)
+            if parameter in rule_records:
+                record = rule_records[parameter]
+                record.alarm_message = f"{record.alarm_message}；{alarm_message}"
+                continue
+            spc_records.append(AlarmRecordCreate(
+                timestamp=sensor_data.get('timestamp'),
+                line_id=sensor_data.get('line_id'),
+                parameter_name=parameter,
+                parameter_value=sensor_data.get(parameter),
+                alarm_message=alarm_message,
+            ))
+        return spc_records
     
+    def _batch_conditions(self, batch_product_number: str, line_ids: List[str]) -> Dict[str, List]:
+        """
+        按批次查询的过滤条件（每条生产线一组）
+        有批次索引时用其中的起止时间限定 timestamp，TimescaleDB 只扫描对应的 chunk；
+        结束时间放宽两个写库间隔，覆盖尚未写入索引表的最新记录。
+        没有索引行（功能上线前的批次、尚未写库或 Worker 异常退出时丢失的批次）时只按批次号过滤
+        """
+        ranges = ProductionRunService(self.db).get_time_ranges(batch_product_number, line_ids)
+        slack = timedelta(seconds=settings.PRODUCTION_RUN_FLUSH_INTERVAL_SECONDS * 2)
+        conditions = {}
+        for line_id in line_ids:
+            batch_filter = [SensorData.batch_product_number == batch_product_number]
+            if line_id in ranges:
+                start_ts, end_ts = ranges[line_id]
+                batch_filter = [SensorData.timestamp >= start_ts, SensorData.timestamp <= end_ts + slack] + batch_filter
+            conditions[line_id] = batch_filter
+        return conditions
+
     def list_sensor_data(self, filters: SensorDataFilter) -> SensorDataListResponse:
-        """获取传感器数据列表（支持下采样，避免一次性返回太多点）"""
+        """获取传感器数据列表（parameter_name 支持逗号分隔，只查询所需列）"""
         try:
             logger.info(f"------------filters: {filters}")
+            columns = self._list_columns(filters.parameter_name)
+            batch_conditions = (
+                self._batch_conditions(filters.batch_product_number, [filters.line_id])[filters.line_id]
+                if filters.batch_product_number else []
+            )
+
             # max_points = 1000  # 控制返回的最大点数（图表友好）
             # 如果传入了时间范围，就优先做下采样
             if filters.start_time and filters.end_time:
                 # 直接查询原始数据，不做下采样
-                query = self.db.query(SensorData)
+                query = self.db.query(*columns)
                 
                 # 添加时间范围过滤
                 query = query.filter(SensorData.timestamp >= filters.start_time)
@@ -117,6 +193,7 @@ class SensorDataService:
                     query = query.filter(SensorData.line_id == filters.line_id)
                 if filters.component_id:
                     query = query.filter(SensorData.component_id == filters.component_id)
+                query = query.filter(*batch_conditions)
                 
                 # 按时间排序
                 query = query.order_by(SensorData.timestamp)
@@ -124,31 +201,31 @@ class SensorDataService:
                 # 限制返回数量，避免一次性返回太多数据
                 # query = query.limit(max_points)
                 
+                # 时间范围查询不分页，直接用结果条数作为总数，避免对同一范围再扫描一次
                 items = query.all()
-                total = query.count()
+                total = len(items)
 
                 return SensorDataListResponse(
-                    items=[SensorDataSchema.model_validate(item) for item in items],
+                    items=[SensorDataSchema.model_validate(item._asdict()) for item in items],
                     total=total,
                     page=1,
                     size=len(items)
                 )
             else:
                 # 没有时间范围时，走原来的分页逻辑
-                query = self.db.query(SensorData)
+                query = self.db.query(*columns)
                 if filters.line_id:
                     query = query.filter(SensorData.line_id == filters.line_id)
                 if filters.component_id:
                     query = query.filter(SensorData.component_id == filters.component_id)
-                if filters.parameter_name:
-                    query = query.filter(SensorData.parameter_name == filters.parameter_name)
+                query = query.filter(*batch_conditions)
 
                 total = query.count()
                 skip = (filters.page - 1) * filters.size
                 items = query.offset(skip).limit(filters.size).all()
 
                 return SensorDataListResponse(
-                    items=[SensorDataSchema.model_validate(item) for item in items],
+                    items=[SensorDataSchema.model_validate(item._asdict()) for item in items],
                     total=total,
                     page=filters.page,
                     size=filters.size
@@ -161,146 +238,315 @@ class SensorDataService:
             logger.error(f"Error listing sensor data: {e}")
             raise
 
-    def export_sensor_data_streaming(self, filters: SensorDataExportFilter):
+    @staticmethod
+    def resolve_parameter_names(parameter_names) -> List[str]:
         """
-        流式导出传感器数据，适用于大数据量场景
-        生成器函数，逐块返回Excel数据
+        解析并校验参数列名（支持列表或逗号分隔字符串），保持请求顺序并去重
+        未知参数名抛出 ValueError
+        """
+        if isinstance(parameter_names, str):
+            parameter_names = parameter_names.split(',')
+
+        resolved: List[str] = []
+        for name in parameter_names or []:
+            name = name.strip()
+            if not name or name in resolved:
+                continue
+            if name not in PARAMETER_COLUMNS:
+                raise ValueError(f"未知参数: {name}")
+            resolved.append(name)
+        return resolved
+
+    def _list_columns(self, parameter_names) -> List:
+        """
+        列表/流式查询的投影列：维度列 + 请求的参数列
+        未指定参数时返回完整记录（含批次号和创建/更新时间）
+        """
+        names = self.resolve_parameter_names(parameter_names)
+        key_columns = [SensorData.timestamp, SensorData.line_id, SensorData.component_id]
+        if not names:
+            return key_columns + [SensorData.batch_product_number] + \
+                [getattr(SensorData, name) for name in PARAMETER_COLUMNS] + \
+                [SensorData.created_at, SensorData.updated_at]
+        return key_columns + [getattr(SensorData, name) for name in names]
+
+    def get_sensor_data_columns(self, filters: SensorDataColumnsFilter):
+        """
+        列式查询：只查询时间戳和指定参数列，返回 (时间戳毫秒数组, {参数名: float64 数组})
         """
         try:
-            # 创建导出记录
-            export_record = self.export_record_service.create_export_record(ExportRecordCreate(
-                line_names=filters.line_ids,
-                fields=filters.parameter_names or '',
-                start_time=filters.start_time,
-                end_time=filters.end_time,
-            ))
-            
-            line_ids_list = filters.line_ids.split(',') if isinstance(filters.line_ids, str) else filters.line_ids
-            parameter_names = (filters.parameter_names or '').split(',') if filters.parameter_names else []
-            
-            logger.info(f"开始流式导出，生产线数量: {len(line_ids_list)}")
-            
-            # 使用临时文件而不是内存
-            import tempfile
-            import os
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as temp_file:
-                temp_path = temp_file.name
-            
-            total_records = 0
+            parameter_names = self.resolve_parameter_names(filters.parameter_names)
+            if not parameter_names:
+                raise ValueError("至少需要指定一个参数")
 
-            # 生成Excel文件到临时文件
-            with pd.ExcelWriter(temp_path, engine='openpyxl') as writer:
-                
-                # 首先创建一个默认的汇总表，确保至少有一个可见工作表
-                summary_data = []
-                
-                for i, line_id in enumerate(line_ids_list):
-                    logger.info(f"处理第 {i+1}/{len(line_ids_list)} 个生产线: {line_id}")
-                    
-                    # 查询数据
-                    query = self.db.query(SensorData).filter(SensorData.line_id == line_id)
-                    
-                    if filters.component_id:
-                        query = query.filter(SensorData.component_id == filters.component_id)
-                    
-                    if filters.start_time:
-                        query = query.filter(SensorData.timestamp >= filters.start_time)
-                    
-                    if filters.end_time:
-                        query = query.filter(SensorData.timestamp <= filters.end_time)
-                    
-                    query = query.order_by(SensorData.timestamp)
-                    items = query.all()
-                    
-                    sheet_name = f"生产线_{line_id}"[:31]
-                    
-                    if items:
-                        # 转换为DataFrame
-                        data_list = []
-                        for item in items:
-                            row = {'时间戳': item.timestamp.isoformat()}
-                            
-                            for param_name in parameter_names:
-                                if hasattr(item, param_name):
-                                    value = getattr(item, param_name)
-                                    row[param_name] = value
-                                else:
-                                    row[param_name] = None
-                            
-                            data_list.append(row)
-                        
-                        df = pd.DataFrame(data_list)
-                        df.to_excel(writer, sheet_name=sheet_name, index=False)
-                        total_records += len(items)
-                        
-                        # 添加到汇总表
-                        summary_data.append({
-                            '生产线': line_id,
-                            '记录数': len(items),
-                            '状态': '有数据'
-                        })
-                    else:
-                        # 创建包含提示信息的表，确保有可见内容
-                        empty_df = pd.DataFrame({
-                            '时间戳': ['无数据'],
-                            '提示': [f'生产线 {line_id} 在指定时间范围内无数据']
-                        })
-                        empty_df.to_excel(writer, sheet_name=sheet_name, index=False)
-                        
-                        # 添加到汇总表
-                        summary_data.append({
-                            '生产线': line_id,
-                            '记录数': 0,
-                            '状态': '无数据'
-                        })
-                
-                # 创建汇总表，确保至少有一个可见工作表
-                summary_df = pd.DataFrame(summary_data)
-                summary_df.to_excel(writer, sheet_name='导出汇总', index=False)
-                
-                # 如果没有任何数据，创建一个额外的提示表
-                if total_records == 0:
-                    default_df = pd.DataFrame({
-                        '提示': ['在指定条件下未找到任何数据'],
-                        '查询条件': [f'生产线: {filters.line_ids}'],
-                        '时间范围': [f'{filters.start_time} 到 {filters.end_time}']
-                    })
-                    default_df.to_excel(writer, sheet_name='查询结果', index=False)
-            
-            # 流式读取文件并返回
-            chunk_size = 8192  # 8KB chunks
-            logger.info(f"开始流式传输文件，总记录数: {total_records}")
-            
-            with open(temp_path, 'rb') as f:
-                while True:
-                    chunk = f.read(chunk_size)
-                    if not chunk:
-                        break
-                    yield chunk
-            
-            logger.info(f"流式导出完成，总记录数: {total_records}")
-            
+            columns = [SensorData.timestamp] + [getattr(SensorData, name) for name in parameter_names]
+            query = self.db.query(*columns).filter(
+                SensorData.line_id == filters.line_id,
+                SensorData.timestamp >= filters.start_time,
+                SensorData.timestamp <= filters.end_time,
+            )
+            if filters.component_id:
+                query = query.filter(SensorData.component_id == filters.component_id)
+
+            rows = query.order_by(SensorData.timestamp).all()
+            count = len(rows)
+
+            if count:
+                transposed = list(zip(*rows))
+                timestamps_ms = (
+                    np.fromiter((ts.timestamp() for ts in transposed[0]), dtype=np.float64, count=count) * 1000
+                ).astype(np.int64)
+                values = {
+                    name: np.array(transposed[i + 1], dtype=np.float64)
+                    for i, name in enumerate(parameter_names)
+                }
+            else:
+                timestamps_ms = np.empty(0, dtype=np.int64)
+                values = {name: np.empty(0, dtype=np.float64) for name in parameter_names}
+
+            logger.info(f"列式查询完成: line_id={filters.line_id}, 参数={parameter_names}, 行数={count}")
+            return timestamps_ms, values
+
+        except SQLAlchemyError as e:
+            logger.error(f"Database error when querying sensor data columns: {e}")
+            raise
+
+    def stream_sensor_data(self, filters: SensorDataFilter, fmt: str = "ndjson"):
+        """
+        流式查询传感器数据，适用于大时间范围
+        使用服务端游标（yield_per）分批读取行元组，直接编码为 NDJSON 或 Arrow IPC，
+        不构造 ORM 对象，内存占用与时间范围无关
+        """
+        columns = self._list_columns(filters.parameter_name)
+        names = [column.key for column in columns]
+
+        stmt = select(*columns).where(SensorData.line_id == filters.line_id)
+        if filters.component_id:
+            stmt = stmt.where(SensorData.component_id == filters.component_id)
+        if filters.start_time:
+            stmt = stmt.where(SensorData.timestamp >= filters.start_time)
+        if filters.end_time:
+            stmt = stmt.where(SensorData.timestamp <= filters.end_time)
+        if filters.batch_product_number:
+            stmt = stmt.where(*self._batch_conditions(filters.batch_product_number, [filters.line_id])[filters.line_id])
+        stmt = stmt.order_by(SensorData.timestamp)
+
+        batch_size = settings.SENSOR_DATA_STREAM_BATCH_SIZE
+        encoder = ArrowStreamEncoder(names) if fmt == "arrow" else None
+        total = 0
+        try:
+            result = self.db.execute(stmt, execution_options={"yield_per": batch_size})
+            for rows in result.partitions():
+                total += len(rows)
+                if encoder is not None:
+                    yield encoder.encode(rows)
+                else:
+                    yield encode_ndjson(names, rows)
+
+            if encoder is not None:
+                yield encoder.close()
+
+            logger.info(f"流式查询完成: line_id={filters.line_id}, 格式={fmt}, 总行数={total}")
+        except SQLAlchemyError as e:
+            logger.error(f"Database error when streaming sensor data: {e}")
+            raise
         except Exception as e:
-            logger.error(f"Error in streaming export: {e}")
-            if 'export_record' in locals() and export_record:
-                self.export_record_service.update_export_record_status_and_size(export_record.id, 'failed')
+            logger.error(f"Error streaming sensor data: {e}")
             raise
-        finally:
-            # 确保清理工作总是执行
-            if 'export_record' in locals() and export_record:
-                try:
-                    logger.info(f"Updating export record {export_record.id} status to completed and size to {os.path.getsize(temp_path) if os.path.exists(temp_path) else 0}")
-                    self.export_record_service.update_export_record_status_and_size(export_record.id, 'completed', os.path.getsize(temp_path) if os.path.exists(temp_path) else 0)
-                except Exception as cleanup_error:
-                    logger.error(f"Error updating export record: {cleanup_error}")
-            
-            if 'temp_path' in locals() and os.path.exists(temp_path):
-                try:
-                    os.unlink(temp_path)
-                    logger.info(f"Cleaned up temporary file: {temp_path}")
-                except Exception as cleanup_error:
-                    logger.error(f"Error cleaning up temporary file: {cleanup_error}")
+
+    @staticmethod
+    def export_line_ids(filters: SensorDataExportFilter) -> List[str]:
+        return filters.line_ids.split(',') if isinstance(filters.line_ids, str) else filters.line_ids
+
+    @staticmethod
+    def _export_parameter_names(filters: SensorDataExportFilter):
+        """返回 (数据库中存在的参数列, 未知参数名)，未知参数名输出为空列"""
+        parameter_names = (filters.parameter_names or '').split(',') if filters.parameter_names else []
+        projected_names = [name for name in parameter_names if name in PARAMETER_COLUMNS]
+        unknown_names = [name for name in parameter_names if name not in PARAMETER_COLUMNS]
+        return projected_names, unknown_names
+
+    def _export_rows(self, filters: SensorDataExportFilter, line_id: str, projected_names: List[str], batch_conditions: Dict[str, List]):
+        """用服务端游标查询一条生产线的导出数据，返回 Result（按 yield_per 分批读取）"""
+        # 查询数据：只取时间戳和需要导出的参数列
+        stmt = select(SensorData.timestamp, *[getattr(SensorData, name) for name in projected_names])
+        stmt = stmt.where(SensorData.line_id == line_id)
+
+        if filters.component_id:
+            stmt = stmt.where(SensorData.component_id == filters.component_id)
+
+        if filters.start_time:
+            stmt = stmt.where(SensorData.timestamp >= filters.start_time)
+
+        if filters.end_time:
+            stmt = stmt.where(SensorData.timestamp <= filters.end_time)
+
+        stmt = stmt.where(*batch_conditions.get(line_id, []))
+        stmt = stmt.order_by(SensorData.timestamp)
+
+        return self.db.execute(stmt, execution_options={"yield_per": settings.SENSOR_DATA_STREAM_BATCH_SIZE})
+
+    def export_sensor_data_to_file(self, filters: SensorDataExportFilter, path: str) -> int:
+        """导出传感器数据到文件（由后台导出任务调用），按 filters.format 选择格式，返回导出的记录数"""
+        if filters.format == 'xlsx':
+            return self._export_xlsx(filters, path)
+
+        total_records = 0
+        with open(path, 'wb') as f:
+            for chunk in self._export_tabular(filters, f):
+                total_records += chunk
+        return total_records
+
+    def export_sensor_data_stream(self, filters: SensorDataExportFilter):
+        """
+        边查询边输出导出文件（CSV / Parquet / Arrow），生成器逐块返回字节，
+        不落盘、不缓存整份数据
+        """
+        sink = ChunkSink()
+        for _ in self._export_tabular(filters, sink):
+            data = sink.drain()
+            if data:
+                yield data
+
+    def _export_tabular(self, filters: SensorDataExportFilter, sink):
+        """
+        按批次把各生产线数据写入表格格式的 sink（带 line_id 列），
+        每写完一批 yield 本批行数，调用方可在此时取走已写入的字节
+        """
+        line_ids_list = self.export_line_ids(filters)
+        projected_names, unknown_names = self._export_parameter_names(filters)
+        padding = (None,) * len(unknown_names)
+        batch_conditions = (
+            self._batch_conditions(filters.batch_product_number, line_ids_list)
+            if filters.batch_product_number else {}
+        )
+
+        exporter = create_exporter(filters.format, sink, ['line_id', 'timestamp'] + projected_names + unknown_names)
+        yield 0
+
+        total_records = 0
+        for line_id in line_ids_list:
+            result = self._export_rows(filters, line_id, projected_names, batch_conditions)
+            for rows in result.partitions():
+                exporter.write_rows([(line_id, *row, *padding) for row in rows])
+                total_records += len(rows)
+                yield len(rows)
+
+        exporter.close()
+        logger.info(f"导出完成，格式: {filters.format}，总记录数: {total_records}")
+        yield 0
+
+    def export_line_part(self, filters: SensorDataExportFilter, line_id: str, path: str) -> int:
+        """
+        并行导出：导出一条生产线的分片文件，返回记录数
+        表格格式直接写成目标格式的分片（CSV 不带表头）；xlsx 的工作表只能由一个写入器生成，
+        分片为按批 pickle 的行数据，合并时写入工作表
+        """
+        projected_names, unknown_names = self._export_parameter_names(filters)
+        padding = (None,) * len(unknown_names)
+        batch_conditions = (
+            self._batch_conditions(filters.batch_product_number, [line_id])
+            if filters.batch_product_number else {}
+        )
+        result = self._export_rows(filters, line_id, projected_names, batch_conditions)
+
+        total_records = 0
+        with open(path, 'wb') as f:
+            if filters.format == 'xlsx':
+                for rows in result.partitions():
+                    pickle.dump([(row[0].isoformat(), *row[1:], *padding) for row in rows], f, pickle.HIGHEST_PROTOCOL)
+                    total_records += len(rows)
+            else:
+                names = ['line_id', 'timestamp'] + projected_names + unknown_names
+                exporter = create_exporter(filters.format, f, names, header=False)
+                for rows in result.partitions():
+                    exporter.write_rows([(line_id, *row, *padding) for row in rows])
+                    total_records += len(rows)
+                exporter.close()
+
+        logger.info(f"导出分片完成: line_id={line_id}, 格式={filters.format}, 记录数={total_records}")
+        return total_records
+
+    def merge_export_parts(self, filters: SensorDataExportFilter, parts: List[tuple], path: str) -> int:
+        """合并 export_line_part 生成的分片 [(line_id, 分片路径, 记录数)]，按生产线顺序写入最终文件"""
+        projected_names, unknown_names = self._export_parameter_names(filters)
+        total_records = sum(count for _, _, count in parts)
+
+        if filters.format != 'xlsx':
+            with open(path, 'wb') as f:
+                merge_parts(filters.format, ['line_id', 'timestamp'] + projected_names + unknown_names,
+                            [part_path for _, part_path, _ in parts], f)
+            return total_records
+
+        def read_spill(part_path: str):
+            with open(part_path, 'rb') as f:
+                while True:
+                    try:
+                        yield from pickle.load(f)
+                    except EOFError:
+                        return
+
+        header = ['时间戳'] + projected_names + unknown_names
+        with XlsxStreamWriter(path) as writer:
+            for line_id, part_path, count in parts:
+                self._write_line_sheet(writer, line_id, header, read_spill(part_path) if count else iter(()))
+            self._write_summary_sheets(writer, filters, [(line_id, count) for line_id, _, count in parts])
+        return total_records
+
+    def _write_line_sheet(self, writer: XlsxStreamWriter, line_id: str, header: List[str], rows) -> int:
+        """写入一条生产线的工作表，无数据时写入提示信息，返回记录数"""
+        first_row = next(rows, None)
+        sheet_name = f"生产线_{line_id}"
+        if first_row is None:
+            # 创建包含提示信息的表，确保有可见内容
+            writer.write_sheet(sheet_name, ['时间戳', '提示'], [
+                ['无数据', f'生产线 {line_id} 在指定时间范围内无数据']
+            ])
+            return 0
+        return writer.write_sheet(sheet_name, header, itertools.chain([first_row], rows))
+
+    @staticmethod
+    def _write_summary_sheets(writer: XlsxStreamWriter, filters: SensorDataExportFilter, counts: List[tuple]) -> None:
+        """写入导出汇总表；没有任何数据时额外写入提示表"""
+        writer.write_sheet('导出汇总', ['生产线', '记录数', '状态'], [
+            [line_id, count, '有数据' if count else '无数据'] for line_id, count in counts
+        ])
+        if sum(count for _, count in counts) == 0:
+            writer.write_sheet('查询结果', ['提示', '查询条件', '时间范围'], [
+                ['在指定条件下未找到任何数据', f'生产线: {filters.line_ids}', f'{filters.start_time} 到 {filters.end_time}']
+            ])
+
+    def _export_xlsx(self, filters: SensorDataExportFilter, path: str) -> int:
+        """
+        导出 Excel 文件：每条生产线一个工作表，另附导出汇总表；用服务端游标分批读取并流式写入，
+        内存占用与数据量无关，超过 Excel 行数上限的生产线自动拆分为多个工作表
+        """
+        line_ids_list = self.export_line_ids(filters)
+        projected_names, unknown_names = self._export_parameter_names(filters)
+        header = ['时间戳'] + projected_names + unknown_names
+        # 未知参数名输出为空列
+        padding = (None,) * len(unknown_names)
+        batch_conditions = (
+            self._batch_conditions(filters.batch_product_number, line_ids_list)
+            if filters.batch_product_number else {}
+        )
+
+        logger.info(f"开始导出，生产线数量: {len(line_ids_list)}")
+
+        counts = []
+        with XlsxStreamWriter(path) as writer:
+            for i, line_id in enumerate(line_ids_list):
+                logger.info(f"处理第 {i+1}/{len(line_ids_list)} 个生产线: {line_id}")
+
+                result = self._export_rows(filters, line_id, projected_names, batch_conditions)
+                rows = ((row[0].isoformat(), *row[1:], *padding) for row in result)
+                counts.append((line_id, self._write_line_sheet(writer, line_id, header, rows)))
+
+            self._write_summary_sheets(writer, filters, counts)
+
+        total_records = sum(count for _, count in counts)
+        logger.info(f"导出完成，总记录数: {total_records}")
+        return total_records
 
     def get_utilization(self, filters: SensorDataFilter) -> UtilizationResponse:
         """获取设备利用率数据"""
@@ -318,19 +564,14 @@ class SensorDataService:
             # 计算总时间（秒）
             total_time_seconds = (filters.end_time - filters.start_time).total_seconds()
             
-            # 查询运行和空闲时间
-            result = self.db.query(
-                func.sum(case((SensorData.motor_screw_speed > 0.1, 1), else_=0)).label("running"),
-                func.sum(case((SensorData.motor_screw_speed <= 0.1, 1), else_=0)).label("idle")
-            ).filter(
-                SensorData.timestamp >= filters.start_time,
-                SensorData.timestamp <= filters.end_time,
-                SensorData.line_id == filters.line_id
-            ).one()
-
-            # 处理查询结果
-            running_seconds = result.running or 0
-            idle_seconds = result.idle or 0
+            # 按实际采样间隔积分运行和空闲时间
+            daily = UtilizationService(self.db).get_daily_utilization(UtilizationQuery(
+                line_ids=[filters.line_id],
+                start_time=filters.start_time,
+                end_time=filters.end_time,
+            ))
+            running_seconds = sum(item.total_run_time_seconds for item in daily.items)
+            idle_seconds = sum(item.total_idle_time_seconds for item in daily.items)
             offline_seconds = max(0, total_time_seconds - running_seconds - idle_seconds)
 
             logger.info(f"------------result: running={running_seconds}, idle={idle_seconds}, offline={offline_seconds}")
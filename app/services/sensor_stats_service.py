@@ -0,0 +1,120 @@
+import math
+from typing import Dict, List, Tuple
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.exc import SQLAlchemyError
+from app.analytics.stats import LineStatsTracker, RunningStats, merge_stats
+from app.models.sensor_stats import SensorStats
+from app.schemas.sensor_stats import SensorStatsQuery, SensorStatsResponse, SensorStatsItem
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def _finite_or_none(value: float):
+    return value if value is not None and math.isfinite(value) else None
+
+
+class SensorStatsService:
+    """参数滚动统计服务 - 写入 Worker 统计快照，查询时合并多个 Worker 的统计量"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def snapshot(self, tracker: LineStatsTracker, worker_id: str) -> int:
+        """把跟踪器中有变化的统计量写入 sensor_stats（每个 Worker 只覆盖自己的行）"""
+        rows = tracker.drain()
+        if not rows:
+            return 0
+
+        try:
+            stmt = insert(SensorStats).values([
+                {
+                    "window_start": start,
+                    "line_id": line_id,
+                    "parameter": parameter,
+                    "worker_id": worker_id,
+                    "count": stats.count,
+                    "mean": stats.mean,
+                    "m2": stats.m2,
+                    "min": _finite_or_none(stats.min),
+                    "max": _finite_or_none(stats.max),
+                    "ewma": stats.ewma,
+                    "last_ts": stats.last_ts,
+                }
+                for start, line_id, parameter, stats in rows
+            ])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[SensorStats.window_start, SensorStats.line_id, SensorStats.parameter, SensorStats.worker_id],
+                set_={
+                    name: stmt.excluded[name]
+                    for name in ("count", "mean", "m2", "min", "max", "ewma", "last_ts")
+                } | {"updated_at": func.now()},
+            )
+            self.db.execute(stmt)
+            self.db.commit()
+            return len(rows)
+
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            tracker.restore(rows)
+            logger.error(f"写入参数统计快照失败: {e}")
+            raise
+
+    def get_stats(self, query: SensorStatsQuery) -> SensorStatsResponse:
+        """查询窗口统计；未指定窗口时取每条生产线的最新窗口"""
+        try:
+            db_query = self.db.query(SensorStats)
+            if query.line_ids:
+                db_query = db_query.filter(SensorStats.line_id.in_(query.line_ids))
+            if query.parameter_names:
+                db_query = db_query.filter(SensorStats.parameter.in_(query.parameter_names))
+
+            if query.window_start:
+                db_query = db_query.filter(SensorStats.window_start == query.window_start)
+            else:
+                latest = aliased(SensorStats)
+                latest_window = (
+                    self.db.query(func.max(latest.window_start))
+                    .filter(latest.line_id == SensorStats.line_id)
+                    .scalar_subquery()
+                )
+                db_query = db_query.filter(SensorStats.window_start == latest_window)
+
+            # 合并同一 (生产线, 参数, 窗口) 下各 Worker 的统计量
+            merged: Dict[Tuple[str, str, datetime], RunningStats] = {}
+            for row in db_query.all():
+                stats = RunningStats()
+                stats.count = row.count
+                stats.mean = row.mean
+                stats.m2 = row.m2
+                stats.min = row.min if row.min is not None else math.inf
+                stats.max = row.max if row.max is not None else -math.inf
+                stats.ewma = row.ewma
+                stats.last_ts = row.last_ts
+
+                key = (row.line_id, row.parameter, row.window_start)
+                merged[key] = merge_stats(merged[key], stats) if key in merged else stats
+
+            items: List[SensorStatsItem] = [
+                SensorStatsItem(
+                    line_id=line_id,
+                    parameter=parameter,
+                    window_start=start,
+                    count=stats.count,
+                    mean=stats.mean,
+                    std=stats.std,
+                    min=_finite_or_none(stats.min),
+                    max=_finite_or_none(stats.max),
+                    ewma=stats.ewma,
+                    last_ts=stats.last_ts,
+                )
+                for (line_id, parameter, start), stats in sorted(merged.items(), key=lambda kv: kv[0][:2])
+            ]
+            return SensorStatsResponse(items=items)
+
+        except SQLAlchemyError as e:
+            logger.error(f"Database error when querying sensor stats: {e}")
+            raise
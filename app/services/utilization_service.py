@@ -0,0 +1,160 @@
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, date, timedelta, timezone
+from zoneinfo import ZoneInfo
+from sqlalchemy import text, bindparam
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.db.timescale import SENSOR_DATA_1M_VIEW, continuous_aggregate_exists
+from app.schemas.sensor_data import UtilizationQuery, UtilizationDailyItem, UtilizationDailyResponse
+
+logger = get_logger(__name__)
+
+
+# 原始数据：用 lead(timestamp) 求每个采样点到下一个采样点的实际间隔，超过上限的部分计为离线
+_RAW_SQL = """
+WITH samples AS (
+    SELECT line_id,
+           timestamp,
+           motor_screw_speed > :threshold AS running,
+           GREATEST(LEAST(
+               EXTRACT(EPOCH FROM (COALESCE(LEAD(timestamp) OVER w, CAST(:end_time AS timestamptz)) - timestamp)),
+               :gap_cap
+           ), 0) AS dt
+    FROM sensor_data
+    WHERE timestamp >= :start_time AND timestamp <= :end_time
+      AND motor_screw_speed IS NOT NULL
+      {line_filter}
+    WINDOW w AS (PARTITION BY line_id ORDER BY timestamp)
+)
+SELECT line_id,
+       (timestamp AT TIME ZONE :tz)::date AS day,
+       COALESCE(SUM(dt) FILTER (WHERE running), 0) AS run_seconds,
+       COALESCE(SUM(dt) FILTER (WHERE NOT running), 0) AS idle_seconds
+FROM samples
+GROUP BY line_id, day
+ORDER BY line_id, day
+"""
+
+# 连续聚合：桶内首末采样之间视为在线，再加上到下一个桶首个采样的间隔（同样受上限约束），
+# 按运行采样占比拆分运行/空闲时间，误差不超过一个桶宽
+_AGGREGATE_SQL = """
+WITH buckets AS (
+    SELECT line_id,
+           bucket,
+           samples::float8 AS samples,
+           run_samples::float8 AS run_samples,
+           EXTRACT(EPOCH FROM (last_ts - first_ts))
+           + GREATEST(LEAST(
+               EXTRACT(EPOCH FROM (COALESCE(LEAD(first_ts) OVER w, CAST(:end_time AS timestamptz)) - last_ts)),
+               :gap_cap
+           ), 0) AS covered
+    FROM {view}
+    WHERE bucket >= time_bucket(INTERVAL '1 minute', CAST(:start_time AS timestamptz))
+      AND bucket <= :end_time
+      {line_filter}
+    WINDOW w AS (PARTITION BY line_id ORDER BY bucket)
+)
+SELECT line_id,
+       (bucket AT TIME ZONE :tz)::date AS day,
+       COALESCE(SUM(covered * run_samples / samples), 0) AS run_seconds,
+       COALESCE(SUM(covered * (samples - run_samples) / samples), 0) AS idle_seconds
+FROM buckets
+GROUP BY line_id, day
+ORDER BY line_id, day
+"""
+
+
+def _as_aware(value: datetime) -> datetime:
+    """无时区的时间按 UTC 处理（与数据库会话默认时区一致）"""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class UtilizationService:
+    """设备利用率服务 - 基于实际采样间隔的集合式计算，一次查询返回多条生产线的按天统计"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.tz = ZoneInfo(settings.UTILIZATION_TIMEZONE)
+
+    def _choose_source(self, query: UtilizationQuery) -> str:
+        """auto 模式下，长时间范围且连续聚合存在时使用聚合数据"""
+        if query.source != 'auto':
+            return query.source
+
+        span = (query.end_time - query.start_time).total_seconds()
+        if span > settings.UTILIZATION_RAW_MAX_SECONDS and continuous_aggregate_exists(self.db, SENSOR_DATA_1M_VIEW):
+            return 'aggregate'
+        return 'raw'
+
+    def _query_run_idle(self, query: UtilizationQuery, source: str) -> Dict[Tuple[str, date], Tuple[float, float]]:
+        """执行单条分组查询，返回 {(line_id, day): (run_seconds, idle_seconds)}"""
+        line_filter = "AND line_id IN :line_ids" if query.line_ids else ""
+        if source == 'aggregate':
+            sql = _AGGREGATE_SQL.format(view=SENSOR_DATA_1M_VIEW, line_filter=line_filter)
+        else:
+            sql = _RAW_SQL.format(line_filter=line_filter)
+
+        params: Dict[str, Any] = {
+            "start_time": query.start_time,
+            "end_time": query.end_time,
+            "gap_cap": settings.UTILIZATION_GAP_CAP_SECONDS,
+            "tz": settings.UTILIZATION_TIMEZONE,
+        }
+        stmt = text(sql)
+        if source == 'raw':
+            params["threshold"] = settings.UTILIZATION_RUN_SPEED_THRESHOLD
+        if query.line_ids:
+            stmt = stmt.bindparams(bindparam("line_ids", expanding=True))
+            params["line_ids"] = list(query.line_ids)
+
+        result = self.db.execute(stmt, params)
+        return {
+            (row.line_id, row.day): (float(row.run_seconds or 0), float(row.idle_seconds or 0))
+            for row in result
+        }
+
+    def _day_windows(self, start_time: datetime, end_time: datetime) -> List[Tuple[date, float]]:
+        """把查询范围按工厂时区切分为自然日，返回 [(day, 该日落在范围内的秒数)]"""
+        start = _as_aware(start_time).astimezone(self.tz)
+        end = _as_aware(end_time).astimezone(self.tz)
+
+        windows = []
+        day = start.date()
+        while day <= end.date():
+            day_start = datetime.combine(day, datetime.min.time(), tzinfo=self.tz)
+            day_end = day_start + timedelta(days=1)
+            seconds = (min(day_end, end) - max(day_start, start)).total_seconds()
+            windows.append((day, max(0.0, seconds)))
+            day += timedelta(days=1)
+        return windows
+
+    def get_daily_utilization(self, query: UtilizationQuery) -> UtilizationDailyResponse:
+        """获取多条生产线按天的运行/空闲/离线时间（单次查询）"""
+        try:
+            source = self._choose_source(query)
+            run_idle = self._query_run_idle(query, source)
+
+            line_ids = list(query.line_ids) if query.line_ids else sorted({line_id for line_id, _ in run_idle})
+            windows = self._day_windows(query.start_time, query.end_time)
+
+            items: List[UtilizationDailyItem] = []
+            for line_id in line_ids:
+                for day, window_seconds in windows:
+                    running, idle = run_idle.get((line_id, day), (0.0, 0.0))
+                    offline = max(0.0, window_seconds - running - idle)
+                    items.append(UtilizationDailyItem(
+                        line_id=line_id,
+                        day=day,
+                        total_run_time_seconds=int(running),
+                        total_idle_time_seconds=int(idle),
+                        total_offline_time_seconds=int(offline),
+                    ))
+
+            logger.info(f"利用率统计完成: 数据源={source}, 生产线={len(line_ids)}, 天数={len(windows)}")
+            return UtilizationDailyResponse(items=items, source=source)
+
+        except SQLAlchemyError as e:
+            logger.error(f"Database error when computing utilization: {e}")
+            raise
@@ -0,0 +1,54 @@
+"""
+HTTP Range 请求支持：解析单个字节范围并按范围读取文件，用于断点续传下载
+"""
+from typing import Iterator, Optional, Tuple
+
+
+class RangeNotSatisfiable(ValueError):
+    """请求的字节范围超出文件大小"""
+
+
+def parse_range_header(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析 Range 请求头，返回闭区间 (start, end)；无 Range 头或格式不支持时返回 None（返回整个文件）
+
+    支持 bytes=500-999、bytes=500-、bytes=-500；多段范围只取整个文件
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+
+    start_text, sep, end_text = header[len("bytes="):].strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            # 后缀范围：最后 N 个字节
+            suffix = int(end_text)
+            if suffix == 0:
+                raise RangeNotSatisfiable(header)
+            start = max(size - suffix, 0)
+            end = size - 1
+    except ValueError as e:
+        if isinstance(e, RangeNotSatisfiable):
+            raise
+        return None
+
+    if start >= size or start > end:
+        raise RangeNotSatisfiable(header)
+    return start, min(end, size - 1)
+
+
+def iter_file_range(path: str, start: int, end: int, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """按块读取文件的 [start, end] 字节"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,134 @@
+"""
+流式编码工具：把数据库返回的行元组直接编码为 NDJSON / Arrow IPC 字节块，
+不经过 ORM 对象和 pydantic 模型，适用于大时间范围的流式响应。
+"""
+import io
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Sequence
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# 非数值列，其余列按 float64 处理
+TIMESTAMP_COLUMNS = {"timestamp", "created_at", "updated_at"}
+TEXT_COLUMNS = {"line_id", "component_id", "batch_product_number"}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_ndjson(names: Sequence[str], rows: Iterable[Sequence[Any]]) -> bytes:
+    """将一批行元组编码为 NDJSON（每行一个 JSON 对象）"""
+    lines = [
+        json.dumps(dict(zip(names, row)), default=_json_default, ensure_ascii=False)
+        for row in rows
+    ]
+    if not lines:
+        return b""
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def is_arrow_available() -> bool:
+    """检查 pyarrow 是否可用"""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def arrow_schema(names: Sequence[str]):
+    """根据列名构建 Arrow schema"""
+    import pyarrow as pa
+
+    fields = []
+    for name in names:
+        if name in TIMESTAMP_COLUMNS:
+            fields.append(pa.field(name, pa.timestamp("us", tz="UTC")))
+        elif name in TEXT_COLUMNS:
+            fields.append(pa.field(name, pa.string()))
+        else:
+            fields.append(pa.field(name, pa.float64()))
+    return pa.schema(fields)
+
+
+class ArrowStreamEncoder:
+    """
+    Arrow IPC 流式编码器
+
+    每次 encode() 写入一个 RecordBatch 并返回本批次产生的字节，
+    close() 返回流结束标记。内存占用只与单批次大小有关。
+    """
+
+    def __init__(self, names: Sequence[str]):
+        import pyarrow as pa
+
+        self._pa = pa
+        self.names = list(names)
+        self.schema = arrow_schema(self.names)
+        self._sink = io.BytesIO()
+        self._writer = pa.ipc.new_stream(self._sink, self.schema)
+
+    def _drain(self) -> bytes:
+        data = self._sink.getvalue()
+        self._sink.seek(0)
+        self._sink.truncate()
+        return data
+
+    def encode(self, rows: List[Sequence[Any]]) -> bytes:
+        """编码一批行元组"""
+        if rows:
+            columns = list(zip(*rows))
+            arrays = [
+                self._pa.array(column, type=field.type)
+                for column, field in zip(columns, self.schema)
+            ]
+            self._writer.write_batch(
+                self._pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+            )
+        return self._drain()
+
+    def close(self) -> bytes:
+        """结束流，返回剩余字节"""
+        self._writer.close()
+        return self._drain()
+
+
+def encode_columns_json(line_id: str, timestamps_ms, columns: Dict[str, Any]) -> bytes:
+    """
+    将列式 NumPy 数组编码为 JSON：
+    {"line_id": ..., "count": n, "timestamps": [...], "columns": {name: [...]}}
+    NaN 输出为 null
+    """
+    payload = {
+        "line_id": line_id,
+        "count": int(len(timestamps_ms)),
+        "timestamps": timestamps_ms.tolist(),
+        "columns": {
+            name: [None if v != v else v for v in values.tolist()]
+            for name, values in columns.items()
+        },
+    }
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_columns_arrow(timestamps_ms, columns: Dict[str, Any]) -> bytes:
+    """将列式 NumPy 数组编码为单批次 Arrow IPC 流，NaN 作为 null"""
+    import numpy as np
+    import pyarrow as pa
+
+    arrays = [pa.array(timestamps_ms, type=pa.timestamp("ms", tz="UTC"))]
+    names = ["timestamp"]
+    for name, values in columns.items():
+        arrays.append(pa.array(values, type=pa.float64(), mask=np.isnan(values)))
+        names.append(name)
+
+    batch = pa.RecordBatch.from_arrays(arrays, names=names)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue()
@@ -0,0 +1,103 @@
+"""
+Worker 进程到事件循环的广播通道
+
+使用 AF_UNIX 数据报 socketpair：Worker 进程在发送端写入已编码好的消息帧（每条一个数据报，
+多进程并发写入不会交错），主进程把接收端注册到事件循环（loop.add_reader），可读时批量取出并广播。
+没有轮询线程，也没有空闲等待，消息到达后立即投递。
+"""
+import asyncio
+import pickle
+import socket
+from typing import Any, Callable, Optional
+
+from app.core.logging import get_logger
+from app.websocket.coalescer import message_routing
+from app.websocket.frames import encode_message
+
+logger = get_logger(__name__)
+
+# 每次可读回调最多处理的消息数，避免积压时长时间占用事件循环
+DRAIN_BATCH_SIZE = 256
+
+# 单条消息的最大字节数
+MAX_MESSAGE_BYTES = 1 << 20
+
+# 处理函数：handler(消息类型, 路由信息（见 coalescer.message_routing）, 已编码的消息帧)
+BridgeHandler = Callable[[str, dict, str], None]
+
+
+class BroadcastPublisher:
+    """发送端，传给 Worker 进程使用（可随 Process 参数传递）"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.dropped = 0
+
+    def publish(self, message_type: str, data: Any) -> bool:
+        """
+        在 Worker 进程中编码并发送消息；接收端积压（缓冲区满）时丢弃该消息而不阻塞 Worker，
+        客户端重连时可以从最新值缓存取得最新数据。返回是否发送成功
+        """
+        routing = message_routing(message_type, data)
+        payload = pickle.dumps((message_type, routing, encode_message(message_type, data)), pickle.HIGHEST_PROTOCOL)
+        try:
+            self.sock.send(payload, socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"WebSocket 广播通道已满，丢弃消息（累计 {self.dropped} 条）")
+            return False
+        except OSError as e:
+            logger.error(f"WebSocket 广播消息发送失败: {e}")
+            return False
+        return True
+
+
+class BroadcastBridge:
+    """广播通道：创建 socketpair，提供发送端并在事件循环中监听接收端"""
+
+    def __init__(self, buffer_bytes: int = 4 * 1024 * 1024):
+        self._reader, self._writer = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        for sock, option in ((self._reader, socket.SO_RCVBUF), (self._writer, socket.SO_SNDBUF)):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, option, buffer_bytes)
+            except OSError as e:
+                logger.warning(f"设置广播通道缓冲区大小失败: {e}")
+        self._reader.setblocking(False)
+        self.publisher = BroadcastPublisher(self._writer)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._buffer = bytearray(MAX_MESSAGE_BYTES)
+        self.received = 0
+
+    def attach(self, loop: asyncio.AbstractEventLoop, handler: BridgeHandler) -> None:
+        """把接收端注册到事件循环，每条消息调用一次 handler(message_type, routing, frame)"""
+        self.detach()
+        self._loop = loop
+        loop.add_reader(self._reader.fileno(), self._drain, handler)
+
+    def detach(self) -> None:
+        if self._loop is not None:
+            self._loop.remove_reader(self._reader.fileno())
+            self._loop = None
+
+    def _drain(self, handler: BridgeHandler) -> None:
+        view = memoryview(self._buffer)
+        for _ in range(DRAIN_BATCH_SIZE):
+            try:
+                size = self._reader.recv_into(view)
+            except BlockingIOError:
+                return
+            except OSError as e:
+                logger.error(f"读取 WebSocket 广播通道失败: {e}")
+                return
+            self.received += 1
+            try:
+                message_type, routing, frame = pickle.loads(view[:size])
+                handler(message_type, routing, frame)
+            except Exception as e:
+                logger.error(f"WebSocket 广播失败: {e}")
+
+    def close(self) -> None:
+        self.detach()
+        self._reader.close()
+        self._writer.close()
@@ -0,0 +1,336 @@
+"""
+WebSocket 广播总线
+
+采集 Worker 通过总线发布已编码的消息帧，每个 API 进程订阅总线并推送给自己的 WebSocket 客户端，
+多个 uvicorn 进程或多台服务器上的客户端都能收到任意 Worker 的数据。后端：
+- local:    进程内 socketpair（默认，单个 API 进程）
+- postgres: PostgreSQL LISTEN/NOTIFY（复用现有数据库，无需额外服务）
+- mqtt:     复用 MQTT broker
+
+除 local 外，发布端在 Worker 进程中首次发布时才建立连接（发布端随 Process 参数传递，不能带着连接）。
+"""
+import asyncio
+import base64
+import json
+import os
+import socket
+import zlib
+from typing import Any, Optional, Tuple, Union
+
+from app.core.logging import get_logger
+from app.websocket.bridge import BroadcastBridge, BroadcastPublisher, BridgeHandler
+from app.websocket.coalescer import message_routing
+from app.websocket.frames import encode_message
+
+logger = get_logger(__name__)
+
+# PostgreSQL NOTIFY 负载上限（默认配置下小于 8000 字节）
+PG_NOTIFY_MAX_BYTES = 7999
+# 超过上限时压缩负载的前缀
+_COMPRESSED_PREFIX = "z:"
+
+
+def encode_envelope(message_type: str, data: Any) -> str:
+    """编码总线消息：第一行为 [消息类型, 路由信息]，其后为已编码的消息帧"""
+    header = json.dumps([message_type, message_routing(message_type, data)], ensure_ascii=False, separators=(",", ":"))
+    return f"{header}\n{encode_message(message_type, data)}"
+
+
+def decode_envelope(payload: Union[str, bytes]) -> Tuple[str, dict, str]:
+    """解析总线消息，返回 (消息类型, 路由信息, 消息帧)"""
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8")
+    if payload.startswith(_COMPRESSED_PREFIX):
+        payload = zlib.decompress(base64.b64decode(payload[len(_COMPRESSED_PREFIX):])).decode("utf-8")
+    header, _, frame = payload.partition("\n")
+    message_type, routing = json.loads(header)
+    return message_type, routing, frame
+
+
+def _postgres_dsn(url: str) -> str:
+    """SQLAlchemy 连接串转为 psycopg2 可用的 DSN"""
+    return url.replace("postgresql+psycopg2://", "postgresql://", 1)
+
+
+class LocalBus:
+    """进程内总线：Worker 与同一 API 进程之间的 socketpair"""
+
+    def __init__(self, buffer_bytes: int):
+        self.bridge = BroadcastBridge(buffer_bytes)
+        self.publisher = self.bridge.publisher
+
+    def start(self, loop: asyncio.AbstractEventLoop, handler: BridgeHandler) -> None:
+        self.bridge.attach(loop, handler)
+
+    def stop(self) -> None:
+        self.bridge.detach()
+
+    def close(self) -> None:
+        self.bridge.close()
+
+
+class PostgresPublisher:
+    """通过 pg_notify 发布消息（Worker 进程中使用）"""
+
+    def __init__(self, dsn: str, channel: str, connect_timeout: int = 5):
+        self.dsn = dsn
+        self.channel = channel
+        self.connect_timeout = connect_timeout
+        self._conn = None
+        self.dropped = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        return state
+
+    def _connection(self):
+        if self._conn is None or self._conn.closed:
+            import psycopg2
+
+            self._conn = psycopg2.connect(self.dsn, connect_timeout=self.connect_timeout)
+            self._conn.autocommit = True
+        return self._conn
+
+    def publish(self, message_type: str, data: Any) -> bool:
+        payload = encode_envelope(message_type, data)
+        if len(payload.encode("utf-8")) > PG_NOTIFY_MAX_BYTES:
+            payload = _COMPRESSED_PREFIX + base64.b64encode(zlib.compress(payload.encode("utf-8"))).decode("ascii")
+            if len(payload) > PG_NOTIFY_MAX_BYTES:
+                self.dropped += 1
+                logger.warning(f"WebSocket 广播消息超过 NOTIFY 上限，已丢弃（{len(payload)} 字节）")
+                return False
+        try:
+            with self._connection().cursor() as cursor:
+                cursor.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+        except Exception as e:
+            logger.error(f"WebSocket 广播消息发布失败（postgres）: {e}")
+            self.close()
+            return False
+        return True
+
+    def close(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+
+class PostgresBus:
+    """
+    PostgreSQL LISTEN/NOTIFY 总线；监听连接注册到事件循环，通知到达时立即处理
+    建立连接和 LISTEN 是阻塞调用，放到线程池中执行，数据库不可达时不会卡住事件循环
+    """
+
+    RECONNECT_DELAY_SECONDS = 5
+
+    def __init__(self, dsn: str, channel: str, connect_timeout: int = 5):
+        self.dsn = dsn
+        self.channel = channel
+        self.connect_timeout = connect_timeout
+        self.publisher = PostgresPublisher(dsn, channel, connect_timeout)
+        self._conn = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._handler: Optional[BridgeHandler] = None
+        self._reconnect: Optional[asyncio.TimerHandle] = None
+        self._connecting: Optional[asyncio.Future] = None
+
+    def start(self, loop: asyncio.AbstractEventLoop, handler: BridgeHandler) -> None:
+        self._loop = loop
+        self._handler = handler
+        self._listen()
+
+    def _listen(self) -> None:
+        self._reconnect = None
+        self._connecting = asyncio.ensure_future(self._connect(self._loop), loop=self._loop)
+
+    def _open_listen_connection(self):
+        """建立监听连接并执行 LISTEN（在线程池中执行）"""
+        import psycopg2
+        from psycopg2 import sql
+
+        conn = psycopg2.connect(self.dsn, connect_timeout=self.connect_timeout)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    async def _connect(self, loop: asyncio.AbstractEventLoop) -> None:
+        try:
+            conn = await loop.run_in_executor(None, self._open_listen_connection)
+        except Exception as e:
+            self._connecting = None
+            logger.error(f"WebSocket 广播总线连接失败（postgres）: {e}")
+            self._schedule_reconnect()
+            return
+
+        self._connecting = None
+        if self._loop is not loop:
+            # 连接期间总线已停止
+            conn.close()
+            return
+        self._conn = conn
+        loop.add_reader(conn.fileno(), self._drain)
+        logger.info(f"WebSocket 广播总线已连接（postgres: {self.channel}）")
+
+    def _schedule_reconnect(self) -> None:
+        self._close_connection()
+        if self._loop is not None and self._reconnect is None:
+            self._reconnect = self._loop.call_later(self.RECONNECT_DELAY_SECONDS, self._listen)
+
+    def _drain(self) -> None:
+        try:
+            self._conn.poll()
+        except Exception as e:
+            logger.error(f"WebSocket 广播总线读取失败（postgres）: {e}")
+            self._schedule_reconnect()
+            return
+        while self._conn.notifies:
+            notify = self._conn.notifies.pop(0)
+            try:
+                self._handler(*decode_envelope(notify.payload))
+            except Exception as e:
+                logger.error(f"WebSocket 广播失败: {e}")
+
+    def _close_connection(self) -> None:
+        if self._conn is None:
+            return
+        try:
+            if self._loop is not None and not self._conn.closed:
+                self._loop.remove_reader(self._conn.fileno())
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+
+    def stop(self) -> None:
+        if self._reconnect is not None:
+            self._reconnect.cancel()
+            self._reconnect = None
+        if self._connecting is not None:
+            self._connecting.cancel()
+            self._connecting = None
+        self._close_connection()
+        self._loop = None
+
+    def close(self) -> None:
+        self.stop()
+        self.publisher.close()
+
+
+def _mqtt_client(client_id: str):
+    import paho.mqtt.client as mqtt
+    from app.core.config import settings
+
+    client = mqtt.Client(client_id=client_id, clean_session=True, protocol=mqtt.MQTTv311)
+    if settings.MQTT_USERNAME and settings.MQTT_PASSWORD:
+        client.username_pw_set(settings.MQTT_USERNAME, settings.MQTT_PASSWORD)
+    return client
+
+
+def _mqtt_client_id(role: str) -> str:
+    from app.core.config import settings
+
+    return f"{settings.MQTT_CLIENT_ID}-ws-{role}-{socket.gethostname()}-{os.getpid()}"
+
+
+class MqttPublisher:
+    """通过 MQTT broker 发布消息（Worker 进程中使用），主题为 <前缀>/<消息类型>/<生产线>"""
+
+    def __init__(self, host: str, port: int, topic_prefix: str):
+        self.host = host
+        self.port = port
+        self.topic_prefix = topic_prefix
+        self._client = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_client"] = None
+        return state
+
+    def publish(self, message_type: str, data: Any) -> bool:
+        try:
+            if self._client is None:
+                self._client = _mqtt_client(_mqtt_client_id("pub"))
+                self._client.connect(self.host, self.port, 60)
+                # 网络线程负责发送和自动重连
+                self._client.loop_start()
+            line_id = data.get("line_id") if isinstance(data, dict) else None
+            topic = f"{self.topic_prefix}/{message_type}/{line_id if line_id is not None else '_'}"
+            result = self._client.publish(topic, encode_envelope(message_type, data).encode("utf-8"), qos=0)
+            return result.rc == 0
+        except Exception as e:
+            logger.error(f"WebSocket 广播消息发布失败（mqtt）: {e}")
+            return False
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.loop_stop()
+            self._client.disconnect()
+            self._client = None
+
+
+class MqttBus:
+    """MQTT 总线：paho 网络线程收到消息后转交事件循环处理"""
+
+    def __init__(self, host: str, port: int, topic_prefix: str):
+        self.host = host
+        self.port = port
+        self.topic_prefix = topic_prefix
+        self.publisher = MqttPublisher(host, port, topic_prefix)
+        self._client = None
+
+    def start(self, loop: asyncio.AbstractEventLoop, handler: BridgeHandler) -> None:
+        def dispatch(payload: bytes) -> None:
+            try:
+                handler(*decode_envelope(payload))
+            except Exception as e:
+                logger.error(f"WebSocket 广播失败: {e}")
+
+        def on_connect(client, userdata, flags, rc):
+            client.subscribe(f"{self.topic_prefix}/#", qos=0)
+            logger.info(f"WebSocket 广播总线已连接（mqtt: {self.topic_prefix}/#）")
+
+        def on_message(client, userdata, msg):
+            loop.call_soon_threadsafe(dispatch, msg.payload)
+
+        self._client = _mqtt_client(_mqtt_client_id("sub"))
+        self._client.on_connect = on_connect
+        self._client.on_message = on_message
+        self._client.connect_async(self.host, self.port, 60)
+        self._client.loop_start()
+
+    def stop(self) -> None:
+        if self._client is not None:
+            self._client.loop_stop()
+            self._client.disconnect()
+            self._client = None
+
+    def close(self) -> None:
+        self.stop()
+        self.publisher.close()
+
+
+BroadcastBus = Union[LocalBus, PostgresBus, MqttBus]
+BusPublisher = Union[BroadcastPublisher, PostgresPublisher, MqttPublisher]
+
+
+def create_bus(backend: Optional[str] = None) -> BroadcastBus:
+    """按配置创建广播总线"""
+    from app.core.config import settings
+
+    backend = backend or settings.WEBSOCKET_BUS_BACKEND
+    if backend == "local":
+        return LocalBus(settings.WEBSOCKET_BRIDGE_BUFFER_BYTES)
+    if backend == "postgres":
+        return PostgresBus(_postgres_dsn(settings.DATABASE_URL), settings.WEBSOCKET_BUS_CHANNEL,
+                           settings.WEBSOCKET_BUS_CONNECT_TIMEOUT_SECONDS)
+    if backend == "mqtt":
+        return MqttBus(settings.MQTT_BROKER_HOST, settings.MQTT_BROKER_PORT, settings.WEBSOCKET_BUS_MQTT_TOPIC)
+    raise ValueError(f"不支持的 WebSocket 广播总线: {backend}")
@@ -0,0 +1,75 @@
+"""
+WebSocket 频道订阅索引
+
+频道格式为 "<消息类型>:<生产线>"，两部分都可以用 * 通配：
+- "production_data:3"  只接收 3 号生产线的 production_data
+- "production_data:*"  接收所有生产线的 production_data（等价于 "production_data"）
+- "*:3"                接收 3 号生产线的所有消息
+- "*"                  接收所有消息（未订阅的连接默认如此）
+
+索引按频道保存连接集合，路由一条消息只需查最多 5 个键，开销只与感兴趣的客户端数量有关。
+"""
+from typing import Dict, Hashable, Iterable, List, Optional, Set
+
+WILDCARD = "*"
+
+
+def normalize_channel(channel: str) -> str:
+    """规范化频道名："type" -> "type:*"，"*:*" -> "*" """
+    message_type, _, line_id = channel.strip().partition(":")
+    message_type = message_type.strip() or WILDCARD
+    line_id = line_id.strip() or WILDCARD
+    if message_type == WILDCARD and line_id == WILDCARD:
+        return WILDCARD
+    return f"{message_type}:{line_id}"
+
+
+def message_channels(message_type: str, line_id: Optional[str] = None) -> List[str]:
+    """一条消息会命中的所有频道键"""
+    channels = [WILDCARD, f"{message_type}:{WILDCARD}"]
+    if line_id is not None:
+        channels.append(f"{message_type}:{line_id}")
+        channels.append(f"{WILDCARD}:{line_id}")
+    return channels
+
+
+class ChannelIndex:
+    """频道 -> 连接集合的索引，同时记录每个连接订阅的频道"""
+
+    def __init__(self):
+        self.index: Dict[str, Set[Hashable]] = {}
+        self.subscriptions: Dict[Hashable, Set[str]] = {}
+
+    def subscribe(self, connection: Hashable, channels: Iterable[str]) -> List[str]:
+        """替换连接的订阅；空列表表示接收所有消息。返回规范化后的频道列表"""
+        self.unsubscribe(connection)
+        normalized = sorted({normalize_channel(ch) for ch in channels if ch and ch.strip()}) or [WILDCARD]
+        self.subscriptions[connection] = set(normalized)
+        for channel in normalized:
+            self.index.setdefault(channel, set()).add(connection)
+        return normalized
+
+    def unsubscribe(self, connection: Hashable) -> None:
+        """移除连接的所有订阅"""
+        for channel in self.subscriptions.pop(connection, ()):
+            members = self.index.get(channel)
+            if members is None:
+                continue
+            members.discard(connection)
+            if not members:
+                del self.index[channel]
+
+    def match(self, message_type: str, line_id: Optional[str] = None) -> Set[Hashable]:
+        """返回应接收该消息的连接"""
+        result: Set[Hashable] = set()
+        for channel in message_channels(message_type, line_id):
+            members = self.index.get(channel)
+            if members:
+                result |= members
+        return result
+
+    def get_subscriptions(self, connection: Hashable) -> List[str]:
+        return sorted(self.subscriptions.get(connection, ()))
+
+    def __len__(self) -> int:
+        return len(self.subscriptions)
@@ -0,0 +1,52 @@
+"""
+WebSocket 广播合并
+
+看板每秒只重绘几次，高采样率或补发积压数据时没必要把每一帧都推给浏览器。
+按客户端类别配置合并窗口：窗口内同一 (生产线, 部件) 只发送最新一帧（发送节流在 ClientConnection 中实现）；
+报警状态发生变化的帧不参与合并，总是立即发送。
+"""
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+def alarm_parameters(data: Any) -> Tuple[str, ...]:
+    """production_data 中处于报警状态的参数"""
+    if not isinstance(data, dict):
+        return ()
+    return tuple(sorted(k for k, v in data.items() if isinstance(v, dict) and v.get("alarm")))
+
+
+def message_routing(message_type: str, data: Any) -> dict:
+    """路由/合并所需的消息摘要：生产线、部件和报警参数"""
+    if not isinstance(data, dict):
+        return {}
+    routing = {"line_id": data.get("line_id"), "component_id": data.get("component_id")}
+    if message_type == "production_data":
+        routing["alarms"] = alarm_parameters(data)
+    return routing
+
+
+class AlarmStateTracker:
+    """记录每个 (生产线, 部件) 上一帧的报警参数，判断新的一帧是否是报警状态变化"""
+
+    def __init__(self):
+        self._states: Dict[Hashable, Tuple[str, ...]] = {}
+
+    def changed(self, key: Hashable, alarms: Optional[Tuple[str, ...]]) -> bool:
+        alarms = tuple(alarms or ())
+        previous = self._states.get(key)
+        self._states[key] = alarms
+        if previous is None:
+            # 第一帧：有报警才算变化
+            return bool(alarms)
+        return previous != alarms
+
+
+def coalesce_window(client_class: Optional[str]) -> float:
+    """客户端类别对应的合并窗口（秒），未知类别使用默认类别"""
+    from app.core.config import settings
+
+    windows = settings.WEBSOCKET_COALESCE_WINDOWS
+    window = windows.get(client_class or settings.WEBSOCKET_DEFAULT_CLIENT_CLASS)
+    if window is None:
+        window = windows.get(settings.WEBSOCKET_DEFAULT_CLIENT_CLASS, 0.0)
+    return max(float(window), 0.0)
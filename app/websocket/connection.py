@@ -0,0 +1,205 @@
+"""
+单个 WebSocket 客户端的发送队列
+
+每个连接有一个有界队列和独立的写协程，广播只做入队，不等待网络发送；
+慢客户端只会积压自己的队列，不影响其他客户端。
+"""
+import asyncio
+import itertools
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Union
+
+from fastapi import WebSocket
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# 客户端落后太多时使用的关闭码（1013: Try Again Later）
+SLOW_CLIENT_CLOSE_CODE = 1013
+
+# 队列中的消息：已编码的文本帧 / 二进制帧，或在发送时才编码的函数（如按客户端状态计算的增量帧）
+Message = Union[str, bytes, Callable[[], Union[str, bytes]]]
+
+
+class ClientConnection:
+    """
+    带发送队列的 WebSocket 连接
+
+    - 队列满时丢弃最早的消息（drop-oldest）
+    - 带 coalesce_key 的消息（如同一生产线的 production_data）在队列中只保留最新一条，
+      位置保持不变
+    - window > 0 时同一 coalesce_key 每个窗口最多发送一帧，窗口内到达的帧只保留最新一条，窗口结束时发送
+    - urgent 消息（报警状态变化）不参与合并和节流
+    - 发送超时或连续丢弃超过上限时断开该客户端
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        client_id: Optional[str] = None,
+        max_queue: int = 100,
+        send_timeout: float = 5.0,
+        max_dropped: int = 500,
+        window: float = 0.0,
+        binary: bool = False,
+        on_close: Optional[Callable[["ClientConnection"], None]] = None,
+    ):
+        self.websocket = websocket
+        self.client_id = client_id or "anonymous"
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.max_dropped = max_dropped
+        self.window = window
+        # 协商了二进制子协议：消息帧为 bytes，用 send_bytes 发送
+        self.binary = binary
+        self.on_close = on_close
+
+        self._pending: "OrderedDict[Hashable, Message]" = OrderedDict()
+        self._sequence = itertools.count()
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+
+        # 合并窗口：每个 key 上次放入发送队列的时间、窗口内暂存的最新帧和窗口结束回调
+        self._released_at: Dict[Hashable, float] = {}
+        self._held: Dict[Hashable, Message] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+
+        # 统计
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        # 自上次成功发送以来丢弃的消息数
+        self._dropped_since_send = 0
+
+    def start(self) -> None:
+        """启动写协程"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._writer(), name=f"ws-writer-{self.client_id}")
+
+    @property
+    def queue_size(self) -> int:
+        return len(self._pending)
+
+    def enqueue(self, message: Message, coalesce_key: Optional[Hashable] = None, urgent: bool = False) -> bool:
+        """非阻塞入队，返回是否入队或暂存（连接已关闭时返回 False）"""
+        if self.closed:
+            return False
+
+        if coalesce_key is not None and self.window > 0:
+            now = asyncio.get_running_loop().time()
+            if urgent:
+                # 报警状态变化：立即发送，窗口内暂存的旧帧作废
+                self._held.pop(coalesce_key, None)
+                timer = self._timers.pop(coalesce_key, None)
+                if timer is not None:
+                    timer.cancel()
+                self._released_at[coalesce_key] = now
+                return self._enqueue(message, None)
+
+            released_at = self._released_at.get(coalesce_key)
+            if released_at is not None and now - released_at < self.window:
+                if coalesce_key in self._held:
+                    self.coalesced += 1
+                self._held[coalesce_key] = message
+                if coalesce_key not in self._timers:
+                    self._timers[coalesce_key] = asyncio.get_running_loop().call_at(
+                        released_at + self.window, self._release_held, coalesce_key
+                    )
+                return True
+            self._released_at[coalesce_key] = now
+
+        return self._enqueue(message, None if urgent else coalesce_key)
+
+    def _release_held(self, coalesce_key: Hashable) -> None:
+        """窗口结束：把暂存的最新帧放入发送队列"""
+        self._timers.pop(coalesce_key, None)
+        message = self._held.pop(coalesce_key, None)
+        if message is None or self.closed:
+            return
+        self._released_at[coalesce_key] = asyncio.get_running_loop().time()
+        self._enqueue(message, coalesce_key)
+
+    def _enqueue(self, message: Message, coalesce_key: Optional[Hashable]) -> bool:
+        if coalesce_key is not None and coalesce_key in self._pending:
+            self._pending[coalesce_key] = message
+            self.coalesced += 1
+            return True
+
+        if len(self._pending) >= self.max_queue:
+            self._pending.popitem(last=False)
+            self.dropped += 1
+            self._dropped_since_send += 1
+            if self._dropped_since_send > self.max_dropped:
+                logger.warning(f"WebSocket 客户端 {self.client_id} 持续积压，断开连接")
+                self.close(SLOW_CLIENT_CLOSE_CODE)
+                return False
+
+        key = coalesce_key if coalesce_key is not None else ("_seq", next(self._sequence))
+        self._pending[key] = message
+        self._ready.set()
+        return True
+
+    async def _writer(self) -> None:
+        try:
+            while not self.closed:
+                await self._ready.wait()
+                while self._pending and not self.closed:
+                    _, message = self._pending.popitem(last=False)
+                    if callable(message):
+                        message = message()
+                    if isinstance(message, bytes):
+                        send = self.websocket.send_bytes(message)
+                    else:
+                        send = self.websocket.send_text(message)
+                    await asyncio.wait_for(send, timeout=self.send_timeout)
+                    self.sent += 1
+                    self._dropped_since_send = 0
+                self._ready.clear()
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            logger.warning(f"WebSocket 客户端 {self.client_id} 发送超时，断开连接")
+            self.close(SLOW_CLIENT_CLOSE_CODE)
+        except Exception as e:
+            logger.error(f"Failed to send message to client {self.client_id}: {e}")
+            self.close()
+
+    def close(self, code: int = 1000) -> None:
+        """关闭连接：停止写协程，清空队列，并通知管理器移除"""
+        if self.closed:
+            return
+        self.closed = True
+        self._pending.clear()
+        self._held.clear()
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self._ready.set()
+
+        current = asyncio.current_task()
+        if self._task is not None and self._task is not current:
+            self._task.cancel()
+        if self.on_close is not None:
+            self.on_close(self)
+        if code != 1000:
+            asyncio.ensure_future(self._close_socket(code))
+
+    async def _close_socket(self, code: int) -> None:
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            # 连接可能已经断开
+            pass
+
+    def get_status(self) -> dict:
+        return {
+            "client_id": self.client_id,
+            "queue_size": self.queue_size,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "window": self.window,
+            "binary": self.binary,
+        }
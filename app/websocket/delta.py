@@ -0,0 +1,133 @@
+"""
+production_data 增量协议（protocol=2）
+
+v1 每帧把每个参数包装成 {value, alarm, alarmCode, alarmMessage} 全量发送；
+v2 对每个 (生产线, 部件) 先发送一个关键帧，之后只发送与该客户端上一帧相比变化的字段，报警信息用稀疏列表表示：
+
+    {"type": "production_data", "timestamp": "...", "v": 2, "data": {
+        "key": false,                     # true 表示关键帧，客户端应丢弃该生产线/部件的旧状态
+        "seq": 1042, "base": 1041,        # 本帧序号、所基于的上一帧序号（关键帧没有 base）
+        "line_id": "1", "component_id": "master",
+        "values": {"diameter": 12.31},    # 变化的值（关键帧为全部值）
+        "alarms": [["diameter", "", "直径超上限"]],   # 新出现或内容变化的报警 [参数, 报警码, 报警信息]
+        "cleared": ["motor_current"],     # 解除报警的参数
+        "removed": []                     # 不再出现的字段
+    }}
+
+差量在发送时按客户端实际收到的上一帧计算（队列中被合并掉的帧不影响正确性），
+同一 (上一帧, 本帧) 的编码结果在所有客户端之间共享。
+"""
+import itertools
+from datetime import datetime
+from typing import Any, Dict, Hashable, List, NamedTuple, Optional, Tuple, Union
+
+from app.websocket.frames import dumps, pack
+
+DELTA_PROTOCOL_VERSION = 2
+
+# 每个参数值的包装字段
+_WRAPPED_FIELDS = ("value", "alarm")
+
+_sequence = itertools.count(1)
+
+
+class Snapshot(NamedTuple):
+    """一帧 production_data 的扁平表示"""
+    seq: int
+    values: Dict[str, Any]
+    alarms: Dict[str, Tuple[str, str]]
+
+
+def make_snapshot(data: Dict[str, Any]) -> Snapshot:
+    """把 v1 production_data 拆成值和报警两部分"""
+    values: Dict[str, Any] = {}
+    alarms: Dict[str, Tuple[str, str]] = {}
+    for name, field in data.items():
+        if isinstance(field, dict) and all(k in field for k in _WRAPPED_FIELDS):
+            values[name] = field["value"]
+            if field["alarm"]:
+                alarms[name] = (field.get("alarmCode") or "", field.get("alarmMessage") or "")
+        else:
+            values[name] = field
+    return Snapshot(next(_sequence), values, alarms)
+
+
+def _payload(base: Optional[Snapshot], target: Snapshot) -> Dict[str, Any]:
+    if base is None:
+        return {
+            "key": True,
+            "seq": target.seq,
+            "line_id": target.values.get("line_id"),
+            "component_id": target.values.get("component_id"),
+            "values": target.values,
+            "alarms": [[name, code, message] for name, (code, message) in target.alarms.items()],
+            "cleared": [],
+            "removed": [],
+        }
+
+    missing = object()
+    return {
+        "key": False,
+        "seq": target.seq,
+        "base": base.seq,
+        "line_id": target.values.get("line_id"),
+        "component_id": target.values.get("component_id"),
+        "values": {k: v for k, v in target.values.items() if base.values.get(k, missing) != v},
+        "alarms": [
+            [name, code, message]
+            for name, (code, message) in target.alarms.items()
+            if base.alarms.get(name) != (code, message)
+        ],
+        "cleared": [name for name in base.alarms if name not in target.alarms],
+        "removed": [name for name in base.values if name not in target.values],
+    }
+
+
+class DeltaEncoder:
+    """编码 v2 帧；每个 key 缓存最新一帧相对各个 base 的编码结果（JSON / MessagePack 分开），供所有客户端共享"""
+
+    def __init__(self):
+        self._cache: Dict[Hashable, Tuple[int, Dict[Tuple[Optional[int], bool], Union[str, bytes]]]] = {}
+        self.encoded = 0
+
+    def encode(self, key: Hashable, base: Optional[Snapshot], target: Snapshot, binary: bool = False) -> Union[str, bytes]:
+        cached_seq, frames = self._cache.get(key, (None, None))
+        if cached_seq != target.seq:
+            frames = {}
+            self._cache[key] = (target.seq, frames)
+
+        cache_key = (base.seq if base is not None else None, binary)
+        frame = frames.get(cache_key)
+        if frame is None:
+            self.encoded += 1
+            message = {
+                "type": "production_data",
+                "timestamp": datetime.now().isoformat(),
+                "v": DELTA_PROTOCOL_VERSION,
+                "data": _payload(base, target),
+            }
+            frame = pack(message) if binary else dumps(message)
+            frames[cache_key] = frame
+        return frame
+
+    def forget(self, key: Hashable) -> None:
+        self._cache.pop(key, None)
+
+
+class DeltaClientState:
+    """单个 v2 客户端已收到的各 (生产线, 部件) 的最后一帧"""
+
+    def __init__(self):
+        self.last: Dict[Hashable, Snapshot] = {}
+
+    def next_frame(self, encoder: DeltaEncoder, key: Hashable, target: Snapshot, binary: bool = False) -> Union[str, bytes]:
+        """在真正发送时调用：相对该客户端上一帧编码，并记录本帧"""
+        frame = encoder.encode(key, self.last.get(key), target, binary)
+        self.last[key] = target
+        return frame
+
+    def reset(self) -> List[Hashable]:
+        """清空状态，之后每个 key 都会重新发送关键帧"""
+        keys = list(self.last)
+        self.last.clear()
+        return keys
@@ -0,0 +1,119 @@
+"""
+WebSocket 消息帧编码
+
+广播时每条消息只编码一次，得到的文本帧由所有订阅的客户端共享；
+安装了 orjson 时使用 orjson（比 pydantic model_dump_json 快一个数量级），否则回退到标准库 json。
+
+客户端可以通过 WebSocket 子协议协商二进制编码：
+- scada.json:    JSON 文本帧（默认，不带子协议时相同）
+- scada.msgpack: MessagePack 二进制帧，结构与 JSON 相同；production_history 的数值列为
+                 小端 float64 字节串（缺失值为 NaN），时间戳列为小端 int64 字节串，
+                 浏览器可直接构造 Float64Array / BigInt64Array
+"""
+import json
+import math
+import struct
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, List, Optional, Sequence
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 为可选依赖
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack 为可选依赖
+    msgpack = None
+
+JSON_SUBPROTOCOL = "scada.json"
+MSGPACK_SUBPROTOCOL = "scada.msgpack"
+
+
+def _default(value: Any) -> Any:
+    """orjson / json 无法直接处理的类型"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    # numpy 标量等带 item() 的类型
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload: Any) -> str:
+    """把消息编码为 JSON 文本"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default).decode("utf-8")
+    return json.dumps(payload, default=_default, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads(text: str) -> Any:
+    """解析 JSON 文本"""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def encode_message(message_type: str, data: Any, timestamp: Optional[datetime] = None) -> str:
+    """编码标准 WebSocket 消息（字段与 WebSocketMessage 一致）"""
+    return dumps({
+        "type": message_type,
+        "timestamp": timestamp or datetime.now(),
+        "data": data,
+    })
+
+
+def is_msgpack_available() -> bool:
+    """检查 msgpack 是否可用"""
+    return msgpack is not None
+
+
+def select_subprotocol(offered: Sequence[str]) -> Optional[str]:
+    """按客户端提供的顺序选择第一个支持的子协议；都不支持时返回 None（使用 JSON，不回传子协议）"""
+    for subprotocol in offered:
+        if subprotocol == MSGPACK_SUBPROTOCOL and is_msgpack_available():
+            return subprotocol
+        if subprotocol == JSON_SUBPROTOCOL:
+            return subprotocol
+    return None
+
+
+def _float64_bytes(values: List[Optional[float]]) -> bytes:
+    return struct.pack(f"<{len(values)}d", *(math.nan if v is None else v for v in values))
+
+
+def _compact_history(data: dict) -> dict:
+    """production_history 的列转为定长数组字节串"""
+    compact = dict(data)
+    timestamps = data.get("timestamps_ms") or []
+    compact["timestamps_ms"] = struct.pack(f"<{len(timestamps)}q", *timestamps)
+    compact["values"] = {name: _float64_bytes(column) for name, column in (data.get("values") or {}).items()}
+    return compact
+
+
+def pack(payload: dict) -> bytes:
+    """把已按 JSON 结构组织的消息编码为 MessagePack"""
+    if payload.get("type") == "production_history" and isinstance(payload.get("data"), dict):
+        payload = {**payload, "data": _compact_history(payload["data"])}
+    return msgpack.packb(payload, default=_default, use_bin_type=True)
+
+
+def encode_binary_message(message_type: str, data: Any, timestamp: Optional[datetime] = None) -> bytes:
+    """编码 MessagePack 消息（字段与 JSON 消息一致）"""
+    return pack({
+        "type": message_type,
+        "timestamp": (timestamp or datetime.now()).isoformat(),
+        "data": data,
+    })
+
+
+def to_binary(frame: str) -> bytes:
+    """把已编码的 JSON 消息帧转换为 MessagePack（广播时每条消息最多转换一次）"""
+    return pack(loads(frame))
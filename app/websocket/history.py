@@ -0,0 +1,139 @@
+"""
+WebSocket 历史回放：每个 (生产线, 部件) 在内存中保留最近一段时间的 production_data
+
+按列存放在预分配的 numpy 环形数组中（时间戳 float64、参数值 float64 × N、报警 bool × N），
+不为每帧保存字典。新客户端连接或订阅时可以请求"最近 N 秒"，直接得到列式历史数据，
+图表无需查询数据库即可立即渲染。
+"""
+import math
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def _epoch_seconds(value: Any) -> float:
+    """帧中的时间戳转为 Unix 秒（不带时区的按本地时间，与 Worker 生成方式一致），无法解析时使用当前时间"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            value = None
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return datetime.now(timezone.utc).timestamp()
+
+
+def _number(value: Any) -> float:
+    if isinstance(value, dict):
+        value = value.get("value")
+    if isinstance(value, bool) or value is None:
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class LineHistory:
+    """单个 (生产线, 部件) 的环形缓冲区"""
+
+    def __init__(self, parameters: Sequence[str], capacity: int):
+        self.parameters = tuple(parameters)
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.values = np.full((capacity, len(self.parameters)), np.nan, dtype=np.float64)
+        self.alarms = np.zeros((capacity, len(self.parameters)), dtype=np.bool_)
+        self.batch_product_number: Optional[str] = None
+        self._next = 0
+        self.size = 0
+
+    def append(self, data: Dict[str, Any]) -> None:
+        i = self._next
+        self.timestamps[i] = _epoch_seconds(data.get("timestamp"))
+        row = self.values[i]
+        alarm_row = self.alarms[i]
+        for j, name in enumerate(self.parameters):
+            field = data.get(name)
+            row[j] = _number(field)
+            alarm_row[j] = bool(field.get("alarm")) if isinstance(field, dict) else False
+        self.batch_product_number = data.get("batch_product_number") or self.batch_product_number
+        self._next = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def _ordered(self) -> np.ndarray:
+        """按时间顺序排列的行号"""
+        start = (self._next - self.size) % self.capacity
+        return (np.arange(self.size) + start) % self.capacity
+
+    def since(self, start_time: float) -> Dict[str, Any]:
+        """start_time（Unix 秒）之后的列式数据；全为空的参数不返回，报警只列出发生报警的行号"""
+        rows = self._ordered()
+        rows = rows[self.timestamps[rows] >= start_time]
+        values = self.values[rows]
+        alarms = self.alarms[rows]
+
+        columns: Dict[str, List[Optional[float]]] = {}
+        alarm_rows: Dict[str, List[int]] = {}
+        for j, name in enumerate(self.parameters):
+            column = values[:, j]
+            mask = np.isnan(column)
+            if mask.all():
+                continue
+            columns[name] = [None if missing else value for value, missing in zip(column.tolist(), mask.tolist())]
+            flagged = np.flatnonzero(alarms[:, j])
+            if flagged.size:
+                alarm_rows[name] = flagged.tolist()
+        return {
+            "timestamps_ms": np.round(self.timestamps[rows] * 1000).astype(np.int64).tolist(),
+            "batch_product_number": self.batch_product_number,
+            "values": columns,
+            "alarms": alarm_rows,
+        }
+
+
+class HistoryBuffer:
+    """所有生产线的回放缓冲区"""
+
+    def __init__(self, parameters: Sequence[str], capacity: int, max_seconds: float):
+        self.parameters = tuple(parameters)
+        self.capacity = capacity
+        self.max_seconds = max_seconds
+        self.lines: Dict[Tuple[str, str], LineHistory] = {}
+
+    @classmethod
+    def from_settings(cls) -> "HistoryBuffer":
+        from app.core.config import settings
+        from app.models.sensor_data import PARAMETER_COLUMNS
+
+        return cls(PARAMETER_COLUMNS, settings.WEBSOCKET_REPLAY_MAX_SAMPLES, settings.WEBSOCKET_REPLAY_SECONDS)
+
+    def add(self, data: Dict[str, Any]) -> None:
+        line_id = data.get("line_id")
+        if line_id is None:
+            return
+        key = (str(line_id), str(data.get("component_id") or ""))
+        history = self.lines.get(key)
+        if history is None:
+            history = self.lines[key] = LineHistory(self.parameters, self.capacity)
+        history.append(data)
+
+    def replay(self, seconds: float, now: Optional[float] = None, accept: Optional[Callable[[str], bool]] = None) -> List[Dict[str, Any]]:
+        """
+        最近 seconds 秒（不超过保留时长）的历史，每个 (生产线, 部件) 一条；
+        accept(line_id) 返回 False 的生产线跳过（用于按订阅过滤）
+        """
+        seconds = min(float(seconds), self.max_seconds)
+        if seconds <= 0:
+            return []
+        start_time = (now if now is not None else datetime.now(timezone.utc).timestamp()) - seconds
+
+        result = []
+        for (line_id, component_id), history in self.lines.items():
+            if accept is not None and not accept(line_id):
+                continue
+            payload = history.since(start_time)
+            if not payload["timestamps_ms"]:
+                continue
+            result.append({"line_id": line_id, "component_id": component_id or None, **payload})
+        return result
@@ -1,12 +1,20 @@
 import json
 import asyncio
-from typing import List, Dict, Any
+from functools import partial
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 from fastapi import WebSocket
 from app.core.logging import get_logger
-from multiprocessing import Queue
 from app.core.config import settings
 from app.websocket.types import WebSocketMessage
+from app.websocket.connection import ClientConnection
+from app.websocket.channels import ChannelIndex
+from app.websocket.bus import BroadcastBus, create_bus
+from app.websocket.coalescer import AlarmStateTracker, coalesce_window, message_routing
+from app.websocket.frames import MSGPACK_SUBPROTOCOL, encode_binary_message, encode_message, loads, to_binary
+from app.websocket.history import HistoryBuffer
+from app.websocket.delta import DELTA_PROTOCOL_VERSION, DeltaClientState, DeltaEncoder, Snapshot, make_snapshot
+from app.core import latest_values
 
 logger = get_logger(__name__)
 
@@ -14,6 +22,7 @@ class WebSocketManager:
     # 定义支持的业务消息类型
     MESSAGE_TYPES = {
         "production_data": "生产线数据更新",
+        "production_history": "生产线历史数据回放",
         "system_status": "系统状态更新", 
         "msg": "业务消息",
         "heartbeat": "心跳消息"
@@ -22,16 +31,57 @@ class WebSocketManager:
     def __init__(self):
         # 存储活跃的WebSocket连接
         self.active_connections: List[WebSocket] = []
-        # 存储连接的订阅信息
-        self.connection_subscriptions: Dict[WebSocket, List[str]] = {}
-        # Initialize broadcast queue as instance variable
-        self.broadcast_queue: Queue = Queue(maxsize=settings.MQTT_QUEUE_SIZE)
-
-    async def connect(self, websocket: WebSocket, client_id: str = None):
-        """接受WebSocket连接"""
-        await websocket.accept()
+        # 频道订阅索引（频道 -> 连接集合）
+        self.channels = ChannelIndex()
+        # 各生产线/部件的报警状态，报警变化的帧不参与合并
+        self.alarm_states = AlarmStateTracker()
+        # 每个连接的发送队列和写协程
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        # 使用增量协议（protocol=2）的客户端及其已收到的状态
+        self.delta_clients: Dict[WebSocket, DeltaClientState] = {}
+        self.delta_encoder = DeltaEncoder()
+        # production_data 历史回放缓冲区
+        self.history: Optional[HistoryBuffer] = (
+            HistoryBuffer.from_settings() if settings.WEBSOCKET_REPLAY_SECONDS > 0 else None
+        )
+        # Worker 进程到各 API 进程的广播总线
+        self.bus: BroadcastBus = create_bus()
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        client_id: str = None,
+        client_class: Optional[str] = None,
+        protocol: int = 1,
+        replay_seconds: float = 0,
+        subprotocol: Optional[str] = None,
+    ):
+        """
+        接受WebSocket连接
+        client_class 决定 production_data 的合并窗口；protocol=2 时 production_data 使用增量协议；
+        replay_seconds > 0 时先回放最近一段时间的历史数据；subprotocol 为协商的子协议（见 app.websocket.frames）
+        """
+        if subprotocol:
+            await websocket.accept(subprotocol=subprotocol)
+        else:
+            await websocket.accept()
+        client = ClientConnection(
+            websocket,
+            client_id=client_id,
+            max_queue=settings.WEBSOCKET_CLIENT_QUEUE_SIZE,
+            send_timeout=settings.WEBSOCKET_SEND_TIMEOUT_SECONDS,
+            max_dropped=settings.WEBSOCKET_SLOW_CLIENT_DROP_LIMIT,
+            window=coalesce_window(client_class),
+            binary=subprotocol == MSGPACK_SUBPROTOCOL,
+            on_close=lambda c: self.disconnect(c.websocket),
+        )
+        client.start()
+        self.clients[websocket] = client
+        if protocol >= DELTA_PROTOCOL_VERSION:
+            self.delta_clients[websocket] = DeltaClientState()
         self.active_connections.append(websocket)
-        self.connection_subscriptions[websocket] = []
+        # 未订阅时接收所有消息
+        self.channels.subscribe(websocket, [])
         
         logger.info(f"WebSocket client connected. Total connections: {len(self.active_connections)}")
         
@@ -40,82 +90,153 @@ class WebSocketManager:
             "connection",
             data={
                 "message": "Connected to SCADA WebSocket",
-                "client_id": client_id or "anonymous"
+                "client_id": client_id or "anonymous",
+                "protocol": DELTA_PROTOCOL_VERSION if websocket in self.delta_clients else 1,
             }, 
             websocket=websocket)
+
+        if replay_seconds:
+            await self.send_replay(websocket, replay_seconds)
+
+        # 用最新值缓存为新客户端填充首屏数据
+        await self.send_latest_values(websocket)
+
+    async def send_replay(self, websocket: WebSocket, seconds: Any):
+        """向客户端回放其订阅的生产线最近 seconds 秒的历史数据（每个生产线/部件一条 production_history 消息）"""
+        if self.history is None:
+            return
+        try:
+            seconds = float(seconds)
+        except (TypeError, ValueError):
+            return
+
+        for payload in self.history.replay(
+            seconds, accept=lambda line_id: websocket in self.channels.match("production_data", line_id)
+        ):
+            await self.send_message("production_history", payload, websocket)
+
+    async def send_latest_values(self, websocket: WebSocket):
+        """向客户端推送所有生产线的最新数据"""
+        cache = latest_values.latest_value_cache
+        if cache is None:
+            return
+
+        for record, alarms in cache.get_all():
+            await self.send_message("production_data", latest_values.to_production_data(record, alarms), websocket)
     
     def disconnect(self, websocket: WebSocket):
         """断开WebSocket连接"""
+        client = self.clients.pop(websocket, None)
+        if client is not None:
+            client.close()
+        self.delta_clients.pop(websocket, None)
+
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
         
-        if websocket in self.connection_subscriptions:
-            del self.connection_subscriptions[websocket]
+        self.channels.unsubscribe(websocket)
         
         logger.info(f"WebSocket client disconnected. Total connections: {len(self.active_connections)}")
     
     async def send_message(self, message_type: str, data: Any, websocket: WebSocket = None):
         """发送标准WebSocket消息"""
-        ws_message = WebSocketMessage(
-            type=message_type,
-            timestamp=datetime.now(),
-            data=data
-        )
-        
         if websocket:
-            try:
-                await websocket.send_text(ws_message.model_dump_json())
-            except Exception as e:
-                logger.error(f"Failed to send message to client: {e}")
-                self.disconnect(websocket)
-        else:
-            await self.broadcast(ws_message)
+            client = self.clients.get(websocket)
+            if client is None:
+                return
+            coalesce_key = self._coalesce_key(message_type, data)
+            delta_state = self.delta_clients.get(websocket)
+            if delta_state is not None and coalesce_key is not None:
+                snapshot = make_snapshot(data)
+                client.enqueue(
+                    partial(delta_state.next_frame, self.delta_encoder, coalesce_key, snapshot, client.binary),
+                    coalesce_key,
+                )
+            elif client.binary:
+                client.enqueue(encode_binary_message(message_type, data), coalesce_key)
+            else:
+                client.enqueue(encode_message(message_type, data), coalesce_key)
+        elif self.clients:
+            self.broadcast_bus_message(message_type, message_routing(message_type, data), encode_message(message_type, data))
+
+    @staticmethod
+    def _line_id(data: Any) -> Optional[str]:
+        """消息所属的生产线，用于频道路由"""
+        if isinstance(data, dict) and data.get("line_id") is not None:
+            return str(data["line_id"])
+        return None
+
+    @staticmethod
+    def _coalesce_key(message_type: str, data: Any):
+        """同一生产线/部件的 production_data 在客户端队列中只保留最新一条"""
+        if message_type == "production_data" and isinstance(data, dict):
+            return ("production_data", data.get("line_id"), data.get("component_id"))
+        return None
     
     async def broadcast(self, ws_message: WebSocketMessage, channel: str = "all"):
-        """广播WebSocket消息给所有连接的客户端"""
-        if not self.active_connections:
+        """广播WebSocket消息；channel 不为 all 时按该频道（消息类型）路由，否则按消息类型路由"""
+        if not self.clients:
             return
+        frame = encode_message(ws_message.type, ws_message.data, ws_message.timestamp)
+        message_type = ws_message.type if channel == "all" else channel
+        coalesce_key = self._coalesce_key(ws_message.type, ws_message.data)
+        self.broadcast_frame(
+            frame,
+            message_type,
+            self._line_id(ws_message.data),
+            coalesce_key,
+            snapshot=make_snapshot(ws_message.data) if self.delta_clients and coalesce_key else None,
+        )
 
-        message_str = ws_message.model_dump_json()
-        disconnected_clients = []
+    def broadcast_frame(
+        self,
+        frame: str,
+        message_type: str,
+        line_id: Optional[str] = None,
+        coalesce_key=None,
+        urgent: bool = False,
+        snapshot: Optional[Snapshot] = None,
+    ) -> int:
+        """
+        把已编码的消息帧放入订阅了该消息类型/生产线的客户端发送队列，立即返回，不等待网络发送；
+        所有客户端共享同一个帧对象（二进制客户端共享同一个 MessagePack 帧，按需转换一次），返回入队的客户端数。
+        给出 snapshot 时，增量协议的客户端改为在发送时按各自状态编码增量帧
+        """
+        logger.debug(f"Broadcasting message: {message_type}, line: {line_id}")
 
-        logger.info(f"Broadcasting message: {ws_message.type}")
-        
-        for connection in self.active_connections:
-            try:
-                if channel == 'all':
-                    await connection.send_text(message_str)
-                    continue
-
-                # 检查客户端是否订阅了该频道
-                subscriptions = self.connection_subscriptions.get(connection, [])
-                if channel in subscriptions or not subscriptions:
-                    await connection.send_text(message_str)
-
-            except Exception as e:
-                logger.error(f"Failed to send broadcast message: {e}")
-                disconnected_clients.append(connection)
-        
-        # 清理断开的连接
-        for client in disconnected_clients:
-            self.disconnect(client)
-        
-        if disconnected_clients:
-            logger.info(f"Cleaned up {len(disconnected_clients)} disconnected clients")
+        count = 0
+        binary_frame = None
+        for websocket in self.channels.match(message_type, line_id):
+            client = self.clients.get(websocket)
+            if client is None:
+                continue
+            message = frame
+            delta_state = self.delta_clients.get(websocket) if snapshot is not None else None
+            if delta_state is not None:
+                message = partial(delta_state.next_frame, self.delta_encoder, coalesce_key, snapshot, client.binary)
+            elif client.binary:
+                if binary_frame is None:
+                    binary_frame = to_binary(frame)
+                message = binary_frame
+            if client.enqueue(message, coalesce_key, urgent):
+                count += 1
+        return count
     
-    async def subscribe_client(self, websocket: WebSocket, channels: List[str]):
-        """为客户端订阅特定频道"""
+    async def subscribe_client(self, websocket: WebSocket, channels: List[str], replay_seconds: float = 0):
+        """为客户端订阅频道（替换原有订阅），频道格式见 app.websocket.channels；可同时请求回放历史数据"""
         # 确保WebSocket在连接列表中
         if websocket in self.active_connections:
-            self.connection_subscriptions[websocket] = channels
+            channels = self.channels.subscribe(websocket, channels)
             logger.info(f"Client subscribed to channels: {channels}")
             
             # 发送订阅确认
             await self.send_message(
                 "subscription",
-                {"message": f"Subscribed to channels: {channels}"},
+                {"message": f"Subscribed to channels: {channels}", "channels": channels},
                 websocket
             )
+            if replay_seconds:
+                await self.send_replay(websocket, replay_seconds)
         else:
             logger.warning(f"WebSocket not found in active connections for subscription")
     
@@ -126,8 +247,15 @@ class WebSocketManager:
         if message_type == "subscribe":
             # 处理订阅请求
             channels = message.get("channels", [])
-            await self.subscribe_client(websocket, channels)
+            await self.subscribe_client(websocket, channels, message.get("replay_seconds") or 0)
             
+        elif message_type == "resync":
+            # 增量协议客户端状态异常时请求重新发送关键帧
+            delta_state = self.delta_clients.get(websocket)
+            if delta_state is not None:
+                delta_state.reset()
+                await self.send_latest_values(websocket)
+
         elif message_type == "ping":
             # 处理心跳
             await self.send_message("heartbeat", {
@@ -160,35 +288,41 @@ class WebSocketManager:
         """获取WebSocket管理器状态"""
         return {
             "active_connections": len(self.active_connections),
-            "total_subscriptions": sum(len(subs) for subs in self.connection_subscriptions.values()),
-            "connection_subscriptions": [f"{k}: {v}" for k, v in self.connection_subscriptions.items()] 
+            "total_subscriptions": sum(len(subs) for subs in self.channels.subscriptions.values()),
+            "connection_subscriptions": [f"{k}: {sorted(v)}" for k, v in self.channels.subscriptions.items()],
+            "clients": [client.get_status() for client in self.clients.values()],
         }
     
-    def initialize_queue(self):
-        """Initialize the broadcast queue"""
-        if self.broadcast_queue is None:
-            self.broadcast_queue = Queue(maxsize=settings.MQTT_QUEUE_SIZE)
-            logger.info("WebSocket broadcast queue initialized")
-    
-    def cleanup_queue(self):
-        """Clean up the broadcast queue to prevent semaphore leaks"""
+    def broadcast_bus_message(self, message_type: str, routing: dict, frame: str):
+        """广播已编码的消息（Worker 进程通过广播总线发来的消息也走这里），报警状态变化的帧标记为 urgent"""
+        coalesce_key = self._coalesce_key(message_type, routing)
+        urgent = coalesce_key is not None and self.alarm_states.changed(coalesce_key, routing.get("alarms"))
+        data = None
+        if coalesce_key is not None and (self.delta_clients or self.history is not None):
+            # 只有需要回放缓冲或存在增量协议客户端时才解析一次消息帧
+            data = loads(frame)["data"]
+            if self.history is not None:
+                self.history.add(data)
+        if not self.clients:
+            return
+        snapshot = make_snapshot(data) if self.delta_clients and data is not None else None
+        self.broadcast_frame(frame, message_type, self._line_id(routing), coalesce_key, urgent, snapshot)
+
+    def initialize_bus(self):
+        """创建广播总线"""
+        if self.bus is None:
+            self.bus = create_bus()
+            logger.info("WebSocket broadcast bus initialized")
+
+    def cleanup_bus(self):
+        """关闭广播总线"""
         try:
-            if self.broadcast_queue is not None:
-                # Clear any remaining items in the queue
-                try:
-                    while not self.broadcast_queue.empty():
-                        self.broadcast_queue.get_nowait()
-                except:
-                    pass
-                
-                # Close and join the queue
-                self.broadcast_queue.close()
-                self.broadcast_queue.join_thread()
-                logger.info("WebSocket broadcast queue cleaned up")
-                self.broadcast_queue = None
-                
+            if self.bus is not None:
+                self.bus.close()
+                self.bus = None
+                logger.info("WebSocket broadcast bus cleaned up")
         except Exception as e:
-            logger.error(f"Error cleaning up WebSocket queue: {e}")
+            logger.error(f"Error cleaning up WebSocket bus: {e}")
 
 # 全局WebSocket管理器实例
 websocket_manager = WebSocketManager()
\ No newline at end of file
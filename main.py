@@ -14,6 +14,7 @@ from app.api.v1.api import api_router
 from app.mqtt.manager import mqtt_manager
 from app.websocket.broadcaster import websocket_broadcast_loop
 from app.mqtt.background_tasks import task_manager
+from app.services.export_job_service import export_job_manager
 
 # Import all models to register them with Base and get init_database function
 from app.db.base import *
@@ -36,11 +37,19 @@ async def lifespan(app: FastAPI):
         raise RuntimeError("Database initialization failed")
     
     # 启动后台任务（包含MQTT多进程系统和传感器数据生成）
-    mqtt_manager.start_system()
+    if settings.INGEST_WORKERS_ENABLED:
+        mqtt_manager.start_system()
+    else:
+        logger.info("INGEST_WORKERS_ENABLED=false，本进程不启动采集系统，只订阅广播总线")
+        if settings.WEBSOCKET_BUS_BACKEND == "local":
+            logger.warning("WEBSOCKET_BUS_BACKEND=local 时其他进程的数据无法送达，本进程的 WebSocket 客户端将收不到数据")
     # logger.info("MQTT multiprocess system started")
     # await task_manager.start_background_tasks()
     # logger.info("Background tasks started")
     
+    # 启动导出进程池
+    export_job_manager.start()
+
     # 启动WebSocket广播监听器
     asyncio.create_task(websocket_broadcast_loop())
     logger.info("WebSocket broadcast listener started")
@@ -50,11 +59,12 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down SCADA API application")
     mqtt_manager.stop_system()
+    export_job_manager.stop()
     # await task_manager.stop_background_tasks()
     # logger.info("Background tasks stopped")
     # Clean up WebSocket manager resources
     from app.websocket.manager import websocket_manager
-    websocket_manager.cleanup_queue()
+    websocket_manager.cleanup_bus()
     
     logger.info("All resources cleaned up successfully")
 
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+WebSocket 广播基准测试
+
+模拟 N 个客户端（默认 500），对比：
+- legacy: 每个客户端调用一次 pydantic model_dump_json，并逐个 await send_text
+- frame:  每条消息只编码一次（orjson 可用时使用 orjson），共享同一帧，入队后由各客户端写协程并发发送
+
+用法:
+    python -m scripts.benchmark_websocket_broadcast --clients 500 --messages 20
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+
+from app.websocket import frames
+from app.websocket.manager import WebSocketManager
+from app.websocket.types import WebSocketMessage
+
+
+class SimulatedWebSocket:
+    """模拟连接：每次发送等待 send_delay 秒（模拟网络写入），统计收到的消息数"""
+
+    def __init__(self, send_delay: float = 0.0):
+        self.send_delay = send_delay
+        self.received = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        if self.send_delay:
+            await asyncio.sleep(self.send_delay)
+        else:
+            await asyncio.sleep(0)
+        self.received += 1
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+def make_payload(line_id: int) -> dict:
+    """与 worker 推送的 production_data 结构相近的消息"""
+    data = {
+        "line_id": str(line_id),
+        "component_id": "master",
+        "batch_product_number": "P-1234",
+        "timestamp": datetime.now().isoformat(),
+    }
+    for name in ("diameter", "motor_current", "motor_rpm", "fluoride_melt_pressure", "tractor_speed"):
+        data[name] = round(random.uniform(0, 100), 3)
+    for zone in range(1, 17):
+        data[f"temp_body_zone{zone}"] = round(random.uniform(200, 400), 2)
+    data["alarms"] = []
+    return data
+
+
+def bench_encode(clients: int, messages: int) -> tuple:
+    """只比较编码耗时：每客户端一次 model_dump_json vs 每条消息一次 encode_message"""
+    payloads = [make_payload(i % 10) for i in range(messages)]
+
+    start = time.perf_counter()
+    for data in payloads:
+        for _ in range(clients):
+            WebSocketMessage(type="production_data", timestamp=datetime.now(), data=data).model_dump_json()
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for data in payloads:
+        frames.encode_message("production_data", data)
+    frame = time.perf_counter() - start
+    return legacy, frame
+
+
+async def bench_legacy(clients: int, messages: int, send_delay: float) -> tuple:
+    """原实现：逐个客户端编码并 await 发送，广播调用方阻塞到全部发送完成"""
+    sockets = [SimulatedWebSocket(send_delay) for _ in range(clients)]
+    blocked = 0.0
+    start = time.perf_counter()
+    for i in range(messages):
+        data = make_payload(i % 10)
+        call_start = time.perf_counter()
+        for ws in sockets:
+            message = WebSocketMessage(type="production_data", timestamp=datetime.now(), data=data)
+            await ws.send_text(message.model_dump_json())
+        blocked += time.perf_counter() - call_start
+    return blocked, time.perf_counter() - start, sum(ws.received for ws in sockets)
+
+
+async def bench_frame(clients: int, messages: int, send_delay: float) -> tuple:
+    """新实现：编码一次、共享帧、入队后立即返回，各客户端写协程并发发送"""
+    manager = WebSocketManager()
+    sockets = [SimulatedWebSocket(send_delay) for _ in range(clients)]
+    for i, ws in enumerate(sockets):
+        await manager.connect(ws, client_id=f"bench-{i}")
+    # 等待欢迎消息发送完
+    while any(client.queue_size for client in manager.clients.values()):
+        await asyncio.sleep(0.01)
+    before = sum(ws.received for ws in sockets)
+
+    blocked = 0.0
+    start = time.perf_counter()
+    for i in range(messages):
+        data = make_payload(i % 10)
+        call_start = time.perf_counter()
+        await manager.send_message("production_data", data)
+        blocked += time.perf_counter() - call_start
+        # 让写协程有机会运行，模拟消息之间的间隔
+        await asyncio.sleep(0)
+    while any(client.queue_size for client in manager.clients.values()):
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - start
+
+    delivered = sum(ws.received for ws in sockets) - before
+    for ws in list(manager.clients):
+        manager.disconnect(ws)
+    return blocked, elapsed, delivered
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket 广播基准测试")
+    parser.add_argument("--clients", type=int, default=500, help="模拟客户端数量")
+    parser.add_argument("--messages", type=int, default=20, help="广播消息数量")
+    parser.add_argument("--send-delay", type=float, default=0.0005, help="模拟每次发送的网络耗时（秒）")
+    args = parser.parse_args()
+
+    print(f"客户端: {args.clients}, 消息: {args.messages}, 发送耗时: {args.send_delay * 1000:.2f}ms, "
+          f"orjson: {'是' if frames.orjson else '否'}")
+
+    legacy_encode, frame_encode = bench_encode(args.clients, args.messages)
+    print("编码耗时（每条广播）:")
+    print(f"  legacy: {legacy_encode / args.messages * 1000:.3f}ms")
+    print(f"  frame:  {frame_encode / args.messages * 1000:.3f}ms")
+
+    for name, bench in (("legacy", bench_legacy), ("frame", bench_frame)):
+        blocked, elapsed, delivered = asyncio.run(bench(args.clients, args.messages, args.send_delay))
+        print(f"{name}: 广播调用阻塞 {blocked / args.messages * 1000:.3f}ms/条, "
+              f"全部送达 {elapsed:.3f}s, 送达 {delivered} 条（积压时同一生产线的消息会合并）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+WebSocket 压测工具
+
+在子进程中启动只包含 /ws 路由的 FastAPI 应用（uvicorn），由一个模拟采集进程代替 MQTT broker + Worker：
+按 生产线 × 部件 × 频率 调用 generate_sensor_data_for_db 生成数据，经广播总线发布；
+再用多个客户端进程打开成千上万个 asyncio WebSocket 连接，统计：
+- 端到端投递延迟分位数（采集进程发布 -> 客户端收到）
+- 投递率 / 丢弃率（合并窗口、慢客户端丢弃都会计入）
+- API 进程的 CPU 和内存
+
+结果以 JSON 输出（固定随机种子、排序键），便于在不同版本之间比较：
+    python -m scripts.loadtest_websocket --clients 2000 --lines 10 --hz 5 --duration 30 --output result.json
+    python -m scripts.loadtest_websocket ... --compare baseline.json
+
+客户端进程与服务端共用 CPU，机器核数不足时客户端本身会成为瓶颈（延迟升高、丢弃率上升），
+比较不同版本时应在同一台机器上使用相同参数。
+
+需要 uvicorn 和 websockets（uvicorn[standard] 已包含），psutil 可选（没有时读取 /proc）。
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+# 延迟直方图：每个 2 倍区间分 8 个桶（约 9% 精度），单位微秒
+_BUCKETS_PER_OCTAVE = 8
+_LATENCY_FIELD = "loadtest_sent_ns"
+
+
+def _raise_fd_limit() -> None:
+    """成千上万个连接需要足够的文件描述符"""
+    try:
+        import resource
+
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# ---------------------------------------------------------------------------
+# 服务端：uvicorn + 模拟采集进程
+# ---------------------------------------------------------------------------
+
+def _ingest(publisher, line_ids: List[str], component_ids: List[str], hz: float, duration: float,
+            seed: int, start_event, stats) -> None:
+    """模拟采集：按固定节拍为每条生产线/部件生成一帧并发布"""
+    from app.core.latest_values import to_production_data
+    from app.mqtt.sensor_configs import generate_sensor_data_for_db
+
+    random.seed(seed)
+    start_event.wait()
+    interval = 1.0 / hz
+    ticks = int(duration * hz)
+    started = time.perf_counter()
+    max_lag = 0.0
+    published = failed = 0
+    for tick in range(ticks):
+        scheduled = started + tick * interval
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            max_lag = max(max_lag, -delay)
+        for line_id in line_ids:
+            for component_id in component_ids:
+                record = generate_sensor_data_for_db(line_id, component_id)
+                data = to_production_data(record, ())
+                data[_LATENCY_FIELD] = time.time_ns()
+                if publisher.publish("production_data", data):
+                    published += 1
+                else:
+                    failed += 1
+    stats.update(published=published, publish_failed=failed, ingest_lag_ms_max=round(max_lag * 1000, 3))
+
+
+def _serve(port: int, args: Dict[str, Any], start_event, stats) -> None:
+    """服务端进程：只挂载 WebSocket 路由，广播循环与采集进程在 lifespan 中启动"""
+    _raise_fd_limit()
+    logging.disable(logging.INFO)
+
+    import uvicorn
+    from fastapi import FastAPI
+
+    from app.api.v1.endpoints import websocket as websocket_endpoint
+    from app.websocket.broadcaster import websocket_broadcast_loop
+    from app.websocket.manager import websocket_manager
+
+    line_ids = [str(i + 1) for i in range(args["lines"])]
+    component_ids = [f"component_{i + 1}" for i in range(args["components"])]
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        task = asyncio.create_task(websocket_broadcast_loop())
+        ingest = multiprocessing.get_context("fork").Process(
+            target=_ingest,
+            args=(websocket_manager.bus.publisher, line_ids, component_ids, args["hz"], args["duration"],
+                  args["seed"], start_event, stats),
+            daemon=True,
+        )
+        ingest.start()
+        yield
+        ingest.terminate()
+        task.cancel()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(websocket_endpoint.router)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+
+
+# ---------------------------------------------------------------------------
+# 客户端
+# ---------------------------------------------------------------------------
+
+def _bucket(latency_us: float) -> int:
+    return int(math.log2(max(latency_us, 1.0)) * _BUCKETS_PER_OCTAVE)
+
+
+def _bucket_upper_ms(bucket: int) -> float:
+    return 2 ** ((bucket + 1) / _BUCKETS_PER_OCTAVE) / 1000
+
+
+def _latency_sent_ns(payload: Dict[str, Any]) -> Optional[int]:
+    """读取采集进程写入的发布时间（增量协议中位于 values 内）"""
+    if payload.get("type") != "production_data":
+        return None
+    data = payload.get("data") or {}
+    sent_ns = data.get(_LATENCY_FIELD)
+    if sent_ns is None:
+        sent_ns = (data.get("values") or {}).get(_LATENCY_FIELD)
+    return sent_ns
+
+
+def _client_process(url: str, clients: int, subprotocol: Optional[str], connect_concurrency: int,
+                    ready_queue, start_event, stop_at, result_queue) -> None:
+    """
+    单个客户端进程：打开 clients 个连接并汇报就绪数量，收集延迟直方图；
+    结束时间在开始信号发出后由父进程写入 stop_at
+    """
+    _raise_fd_limit()
+    import websockets
+
+    if subprotocol == "scada.msgpack":
+        import msgpack
+
+        decode = msgpack.unpackb
+    else:
+        decode = json.loads
+
+    histogram: Dict[int, int] = {}
+    counters: Dict[str, Any] = {"connected": 0, "frames": 0, "errors": 0}
+    deadline = {"at": math.inf}
+
+    async def client(semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            try:
+                ws = await websockets.connect(
+                    url, subprotocols=[subprotocol] if subprotocol else None, max_size=None, open_timeout=60
+                )
+            except Exception as e:
+                counters["errors"] += 1
+                counters["last_error"] = repr(e)
+                return
+        counters["connected"] += 1
+        try:
+            while True:
+                remaining = deadline["at"] - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    message = await asyncio.wait_for(ws.recv(), timeout=min(remaining, 1.0))
+                except asyncio.TimeoutError:
+                    continue
+                received_ns = time.time_ns()
+                sent_ns = _latency_sent_ns(decode(message))
+                if sent_ns is None:
+                    continue
+                counters["frames"] += 1
+                bucket = _bucket((received_ns - sent_ns) / 1000)
+                histogram[bucket] = histogram.get(bucket, 0) + 1
+        except Exception as e:
+            counters["errors"] += 1
+            counters["last_error"] = repr(e)
+        finally:
+            await ws.close()
+
+    async def main() -> None:
+        semaphore = asyncio.Semaphore(connect_concurrency)
+        tasks = [asyncio.create_task(client(semaphore)) for _ in range(clients)]
+        while counters["connected"] + counters["errors"] < clients:
+            await asyncio.sleep(0.1)
+        ready_queue.put(counters["connected"])
+        while not start_event.is_set():
+            await asyncio.sleep(0.05)
+        deadline["at"] = stop_at.value
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    result_queue.put({"histogram": histogram, "counters": counters})
+
+
+# ---------------------------------------------------------------------------
+# 采样与汇总
+# ---------------------------------------------------------------------------
+
+class ProcessSampler:
+    """采样 API 进程的 CPU 和内存（优先 psutil，否则读取 /proc）"""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.cpu: List[float] = []
+        self.rss_mb: List[float] = []
+        try:
+            import psutil
+
+            self._process = psutil.Process(pid)
+            self._process.cpu_percent(None)
+        except ImportError:
+            self._process = None
+            self._last = self._proc_cpu_seconds()
+            self._last_time = time.monotonic()
+
+    def _proc_cpu_seconds(self) -> float:
+        with open(f"/proc/{self.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+    def _proc_rss_mb(self) -> float:
+        with open(f"/proc/{self.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+        return 0.0
+
+    def sample(self) -> None:
+        if self._process is not None:
+            self.cpu.append(self._process.cpu_percent(None))
+            self.rss_mb.append(self._process.memory_info().rss / (1024 * 1024))
+            return
+        now, cpu = time.monotonic(), self._proc_cpu_seconds()
+        self.cpu.append((cpu - self._last) / (now - self._last_time) * 100)
+        self._last, self._last_time = cpu, now
+        self.rss_mb.append(self._proc_rss_mb())
+
+    def summary(self) -> Dict[str, float]:
+        if not self.cpu:
+            return {}
+        return {
+            "cpu_percent_avg": round(sum(self.cpu) / len(self.cpu), 1),
+            "cpu_percent_max": round(max(self.cpu), 1),
+            "rss_mb_max": round(max(self.rss_mb), 1),
+        }
+
+
+def _percentiles(histogram: Dict[int, int]) -> Dict[str, float]:
+    total = sum(histogram.values())
+    if not total:
+        return {}
+    result = {}
+    targets = [("p50", 0.50), ("p90", 0.90), ("p99", 0.99), ("p999", 0.999), ("max", 1.0)]
+    cumulative = 0
+    buckets = sorted(histogram.items())
+    index = 0
+    for name, quantile in targets:
+        threshold = quantile * total
+        while index < len(buckets) and cumulative + buckets[index][1] < threshold:
+            cumulative += buckets[index][1]
+            index += 1
+        bucket = buckets[min(index, len(buckets) - 1)][0]
+        result[name] = round(_bucket_upper_ms(bucket), 3)
+    return result
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    _raise_fd_limit()
+    port = args.port or _free_port()
+    config = {
+        "clients": args.clients,
+        "client_processes": args.client_processes,
+        "lines": args.lines,
+        "components": args.components,
+        "hz": args.hz,
+        "duration": args.duration,
+        "subprotocol": args.subprotocol,
+        "protocol": args.protocol,
+        "client_class": args.client_class,
+        "seed": args.seed,
+        "drain": args.drain,
+    }
+
+    ctx = multiprocessing.get_context("spawn")
+    manager = ctx.Manager()
+    stats = manager.dict({"published": 0, "publish_failed": 0, "ingest_lag_ms_max": 0.0})
+    start_event = manager.Event()
+
+    # 服务端进程还要启动采集进程，不能是守护进程，结束时显式终止
+    server = ctx.Process(target=_serve, args=(port, config, start_event, stats))
+    server.start()
+    try:
+        results = _drive(args, ctx, port, server, start_event, stats)
+    finally:
+        server.terminate()
+        server.join(timeout=10)
+        manager.shutdown()
+    return {"revision": _git_revision(), "config": config, "results": results}
+
+
+def _drive(args: argparse.Namespace, ctx, port: int, server, start_event, stats) -> Dict[str, Any]:
+    """等待服务端就绪，启动客户端进程并运行一轮压测"""
+    deadline = time.monotonic() + 60
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            if time.monotonic() > deadline or not server.is_alive():
+                raise RuntimeError("服务端启动失败")
+            time.sleep(0.2)
+
+    url = f"ws://127.0.0.1:{port}/ws?client_class={args.client_class}&protocol={args.protocol}"
+    ready_queue, result_queue = ctx.Queue(), ctx.Queue()
+    per_process = [args.clients // args.client_processes] * args.client_processes
+    for i in range(args.clients % args.client_processes):
+        per_process[i] += 1
+    # 结束时间在全部连接建立后才确定
+    stop_at = ctx.Value("d", math.inf)
+    clients = [
+        ctx.Process(
+            target=_client_process,
+            args=(url, n, args.subprotocol if args.subprotocol != "json" else None, args.connect_concurrency,
+                  ready_queue, start_event, stop_at, result_queue),
+            daemon=True,
+        )
+        for n in per_process if n
+    ]
+    connect_started = time.monotonic()
+    for process in clients:
+        process.start()
+    connected = sum(ready_queue.get() for _ in clients)
+    connect_seconds = time.monotonic() - connect_started
+    print(f"已连接 {connected}/{args.clients} 个客户端，用时 {connect_seconds:.1f}s")
+
+    # 采集结束后再等待 drain 秒，接收队列中剩余的帧
+    stop_at.value = time.time() + args.duration + args.drain
+    sampler = ProcessSampler(server.pid)
+    start_event.set()
+    while time.time() < stop_at.value:
+        time.sleep(0.5)
+        sampler.sample()
+
+    histogram: Dict[int, int] = {}
+    counters = {"connected": 0, "frames": 0, "errors": 0}
+    last_error = None
+    for _ in clients:
+        result = result_queue.get()
+        for bucket, count in result["histogram"].items():
+            histogram[bucket] = histogram.get(bucket, 0) + count
+        for key in counters:
+            counters[key] += result["counters"][key]
+        last_error = result["counters"].get("last_error") or last_error
+    for process in clients:
+        process.join(timeout=10)
+
+    published = stats["published"]
+    expected = published * connected
+    results = {
+        "clients_connected": connected,
+        "connect_seconds": round(connect_seconds, 2),
+        "client_errors": counters["errors"],
+        "frames_published": published,
+        "frames_publish_failed": stats["publish_failed"],
+        "frames_expected": expected,
+        "frames_received": counters["frames"],
+        "delivery_rate": round(counters["frames"] / expected, 4) if expected else None,
+        "drop_rate": round(1 - counters["frames"] / expected, 4) if expected else None,
+        "latency_ms": _percentiles(histogram),
+        "ingest_lag_ms_max": stats["ingest_lag_ms_max"],
+        "server": sampler.summary(),
+    }
+    if last_error:
+        results["last_client_error"] = last_error
+    return results
+
+
+def _flatten(prefix: str, value: Any, out: Dict[str, float]) -> None:
+    if isinstance(value, dict):
+        for k, v in value.items():
+            _flatten(f"{prefix}.{k}" if prefix else k, v, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = value
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> None:
+    """打印两次结果的指标对比"""
+    before, after = {}, {}
+    _flatten("", baseline.get("results", {}), before)
+    _flatten("", current.get("results", {}), after)
+    if baseline.get("config") != current.get("config"):
+        print("注意：两次压测配置不同")
+    print(f"{'指标':<28}{'基线 ' + str(baseline.get('revision')):>18}{'当前 ' + str(current.get('revision')):>18}{'变化':>10}")
+    for key in sorted(set(before) | set(after)):
+        a, b = before.get(key), after.get(key)
+        change = f"{(b - a) / a * 100:+.1f}%" if a and b is not None else ""
+        print(f"{key:<28}{str(a):>18}{str(b):>18}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket 压测")
+    parser.add_argument("--clients", type=int, default=1000, help="WebSocket 客户端数量")
+    parser.add_argument("--client-processes", type=int, default=max(1, min(8, (os.cpu_count() or 2) // 2)),
+                        help="客户端进程数")
+    parser.add_argument("--connect-concurrency", type=int, default=200, help="每个客户端进程同时建立的连接数")
+    parser.add_argument("--lines", type=int, default=10, help="生产线数量")
+    parser.add_argument("--components", type=int, default=1, help="每条生产线的部件数量")
+    parser.add_argument("--hz", type=float, default=5.0, help="每条生产线/部件的采样频率")
+    parser.add_argument("--duration", type=float, default=30.0, help="采集持续时间（秒）")
+    parser.add_argument("--drain", type=float, default=2.0, help="采集结束后继续接收的时间（秒）")
+    parser.add_argument("--subprotocol", choices=["json", "scada.json", "scada.msgpack"], default="json",
+                        help="WebSocket 子协议")
+    parser.add_argument("--protocol", type=int, default=1, help="协议版本（2 为增量协议）")
+    parser.add_argument("--client-class", default="realtime", help="客户端类别（决定合并窗口）")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--port", type=int, default=0, help="服务端端口（默认随机）")
+    parser.add_argument("--output", help="结果 JSON 文件")
+    parser.add_argument("--compare", help="与之前的结果 JSON 对比")
+    args = parser.parse_args()
+
+    result = run(args)
+    text = json.dumps(result, ensure_ascii=False, indent=2, sort_keys=True)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), result)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+"""
+流式分析模块单元测试
+Streaming Analytics Unit Tests
+
+只测试 Worker 内的纯计算逻辑，不依赖数据库
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import statistics
+
+from app.analytics.energy import EnergyAccumulator, ENERGY_CHANNELS, RUNNING_TOTAL_COMPONENT
+from app.core.latest_values import LatestValueCache
+from app.mqtt.sensor_configs import SIMULATED_LINE_IDS
+from app.analytics.stats import RunningStats, LineStatsTracker, merge_stats
+from app.analytics.spc import SpcChart, SpcMonitor, SpcViolation
+from app.analytics.runs import ProductionRunTracker
+from app.mqtt.routing import worker_index
+from app.schemas.alarm_record import AlarmRecordCreate
+from app.services.sensor_data_service import SensorDataService
+
+
+def _record(ts: datetime, current: float, line_id: str = "LINE_001", component_id: str = None) -> dict:
+    record = {"timestamp": ts.isoformat(), "line_id": line_id, "component_id": component_id}
+    record.update({channel: current for channel in ENERGY_CHANNELS})
+    return record
+
+
+class TestEnergyAccumulator:
+    """测试能耗累加器 / Test energy accumulator"""
+
+    def test_trapezoid_integration(self):
+        acc = EnergyAccumulator(default_voltage=1000.0, max_gap_seconds=10)
+        t0 = datetime(2024, 1, 1, 8, 0, 0)
+        acc.add_sample(_record(t0, 10.0))
+        acc.add_sample(_record(t0 + timedelta(seconds=2), 20.0))
+
+        # 1000V × 15A(平均) × 2s = 30000J
+        expected = 30000 / 3.6e6
+        assert acc.totals["LINE_001"]["motor_current"] == pytest.approx(expected)
+        assert acc.line_total_kwh("LINE_001") == pytest.approx(expected * len(ENERGY_CHANNELS))
+
+    def test_gap_not_integrated(self):
+        acc = EnergyAccumulator(max_gap_seconds=5)
+        t0 = datetime(2024, 1, 1, 8, 0, 0)
+        acc.add_sample(_record(t0, 10.0))
+        acc.add_sample(_record(t0 + timedelta(seconds=60), 10.0))
+        assert acc.line_total_kwh("LINE_001") == 0
+        assert acc.drain() == []
+
+    def test_partitioned_workers_match_single_stream(self):
+        # 两条生产线 × 两个部件交错到达，1 Hz，每个部件电流恒定
+        currents = {("LINE_001", "master"): 10.0, ("LINE_001", "slave"): 20.0,
+                    ("LINE_004", "master"): 30.0, ("LINE_004", "slave"): 40.0}
+        t0 = datetime(2024, 1, 1, 8, 0, 0)
+        stream = [
+            _record(t0 + timedelta(seconds=i), current, line_id, component_id)
+            for i in range(10)
+            for (line_id, component_id), current in currents.items()
+        ]
+
+        single = EnergyAccumulator(default_voltage=1000.0, max_gap_seconds=10)
+        workers = [EnergyAccumulator(default_voltage=1000.0, max_gap_seconds=10) for _ in range(2)]
+        for record in stream:
+            single.add_sample(record)
+            workers[worker_index(record["line_id"], len(workers))].add_sample(record)
+
+        for line_id in ("LINE_001", "LINE_004"):
+            # 每个部件 9 个 1 秒区间，部件之间互不干扰
+            expected = sum(
+                1000.0 * current * 9 / 3.6e6 * len(ENERGY_CHANNELS)
+                for (line, _), current in currents.items() if line == line_id
+            )
+            assert single.line_total_kwh(line_id) == pytest.approx(expected)
+            assert sum(worker.line_total_kwh(line_id) for worker in workers) == pytest.approx(expected)
+        # 两个 Worker 都分到了生产线
+        assert all(worker.totals for worker in workers)
+
+    def test_simulated_lines_partitioned(self):
+        # 每条模拟生产线恰好属于一个 Worker
+        owners = [[line_id for line_id in SIMULATED_LINE_IDS if worker_index(line_id, 2) == i] for i in range(2)]
+        assert sorted(owners[0] + owners[1]) == sorted(SIMULATED_LINE_IDS)
+
+    def test_publish_running_totals(self):
+        acc = EnergyAccumulator(default_voltage=1000.0, max_gap_seconds=10)
+        t0 = datetime(2024, 1, 1, 8, 0, 0)
+        acc.add_sample(_record(t0, 10.0))
+        acc.add_sample(_record(t0 + timedelta(seconds=2), 20.0))
+
+        cache = LatestValueCache(ENERGY_CHANNELS, slots=4)
+        try:
+            acc.publish(cache, "LINE_001")
+            acc.publish(cache, "LINE_999")  # 尚无积分的生产线不写入
+            (record, _), = cache.get_all()
+            assert record["line_id"] == "LINE_001"
+            assert record["component_id"] == RUNNING_TOTAL_COMPONENT
+            assert record["motor_current"] == pytest.approx(acc.totals["LINE_001"]["motor_current"])
+            assert record["timestamp"] == (t0 + timedelta(seconds=2)).isoformat()
+        finally:
+            cache.close()
+
+    def test_drain_by_hour_and_restore(self):
+        acc = EnergyAccumulator(max_gap_seconds=10)
+        t0 = datetime(2024, 1, 1, 8, 59, 59)
+        acc.add_sample(_record(t0, 10.0))
+        acc.add_sample(_record(t0 + timedelta(seconds=2), 10.0))
+        acc.add_sample(_record(t0 + timedelta(seconds=4), 10.0))
+
+        rows = acc.drain()
+        hours = {row[0] for row in rows}
+        assert hours == {datetime(2024, 1, 1, 8), datetime(2024, 1, 1, 9)}
+        assert acc.drain() == []
+
+        acc.restore(rows)
+        assert len(acc.drain()) == len(rows)
+
+
+class TestRunningStats:
+    """测试滚动统计 / Test running statistics"""
+
+    values = [170.5, 182.25, 175.0, 190.75, 168.0, 185.5]
+
+    def test_welford_matches_statistics(self):
+        stats = RunningStats()
+        for value in self.values:
+            stats.update(value, alpha=0.5)
+
+        assert stats.count == len(self.values)
+        assert stats.mean == pytest.approx(statistics.mean(self.values))
+        assert stats.variance == pytest.approx(statistics.variance(self.values))
+        assert stats.min == min(self.values)
+        assert stats.max == max(self.values)
+
+    def test_merge_matches_single_pass(self):
+        a, b = RunningStats(), RunningStats()
+        for value in self.values[:2]:
+            a.update(value, alpha=0.5)
+        for value in self.values[2:]:
+            b.update(value, alpha=0.5)
+
+        merged = merge_stats(a, b)
+        assert merged.count == len(self.values)
+        assert merged.mean == pytest.approx(statistics.mean(self.values))
+        assert merged.variance == pytest.approx(statistics.variance(self.values))
+
+    def test_tracker_window_rollover(self):
+        tracker = LineStatsTracker(["diameter"], window_seconds=3600, ewma_alpha=0.5)
+        t0 = datetime(2024, 1, 1, 8, 30)
+        tracker.update({"timestamp": t0, "line_id": "LINE_001", "diameter": 5.0})
+        tracker.update({"timestamp": t0 + timedelta(minutes=10), "line_id": "LINE_001", "diameter": 6.0})
+        assert tracker.get("LINE_001", "diameter").count == 2
+
+        tracker.update({"timestamp": t0 + timedelta(hours=1), "line_id": "LINE_001", "diameter": 7.0})
+        current = tracker.get("LINE_001", "diameter")
+        assert current.count == 1
+        # EWMA 跨窗口延续
+        assert current.ewma == pytest.approx(0.5 * 7.0 + 0.5 * 5.5)
+
+        windows = sorted(row[0] for row in tracker.drain())
+        assert windows == [datetime(2024, 1, 1, 8), datetime(2024, 1, 1, 9)]
+
+
+class TestSpcMonitor:
+    """测试 SPC 控制图 / Test SPC control charts"""
+
+    @staticmethod
+    def _baseline(chart: SpcChart, subgroups: int = 4):
+        # 每个子组 [4.9, 5.0, 5.1, 5.0, 5.0]：中心线 5.0，R̄ = 0.2
+        for _ in range(subgroups):
+            for value in (4.9, 5.0, 5.1, 5.0, 5.0):
+                assert chart.update(value) == []
+
+    def test_baseline_limits(self):
+        chart = SpcChart(subgroup_size=5, baseline_subgroups=4)
+        self._baseline(chart)
+        limits = chart.limits()
+        assert limits["center"] == pytest.approx(5.0)
+        assert limits["r_center"] == pytest.approx(0.2)
+        assert limits["xbar_ucl"] == pytest.approx(5.0 + 0.577 * 0.2)
+
+    def test_rule1_beyond_3_sigma(self):
+        chart = SpcChart(subgroup_size=5, baseline_subgroups=4, cusum_h=1e9, ewma_l=1e9)
+        self._baseline(chart)
+        codes = []
+        for value in (5.5,) * 5:
+            codes += [code for code, _ in chart.update(value)]
+        assert "SPC_WE1" in codes
+
+    def test_rule4_run_on_one_side(self):
+        chart = SpcChart(subgroup_size=5, baseline_subgroups=4, cusum_h=1e9, ewma_l=1e9)
+        self._baseline(chart)
+        codes = []
+        for _ in range(8):
+            for value in (4.92, 5.02, 5.12, 5.02, 5.02):
+                codes += [code for code, _ in chart.update(value)]
+        assert codes == ["SPC_WE4"]
+
+    def test_cusum_detects_small_shift(self):
+        chart = SpcChart(subgroup_size=5, baseline_subgroups=4, ewma_l=1e9)
+        self._baseline(chart)
+        codes = []
+        for _ in range(20):
+            codes += [code for code, _ in chart.update(5.1)]
+        assert "SPC_CUSUM" in codes
+
+    def test_counter_charted_as_rate(self):
+        # 两个部件的长度计数器交错、持续增长；按每秒增量作图时不应每个样本都报警
+        monitor = SpcMonitor(["current_length_rate"], subgroup_size=5, baseline_subgroups=4)
+        t0 = datetime(2024, 1, 1, 8, 0, 0)
+        lengths = {"master": 0.0, "slave": 100.0}
+        speeds = {"master": 2.0, "slave": 3.0}
+        jitter = (0.0, 0.1, -0.1, 0.05, -0.05)
+        alarms = 0
+        for i in range(200):
+            for component_id in lengths:
+                lengths[component_id] += speeds[component_id] + jitter[i % len(jitter)]
+                alarms += len(monitor.update({
+                    "timestamp": t0 + timedelta(seconds=i), "line_id": "LINE_001", "component_id": component_id,
+                    "batch_product_number": "A", "current_length": lengths[component_id],
+                }))
+        assert alarms == 0
+        assert monitor.get_chart("LINE_001", "current_length_rate", "master").center == pytest.approx(2.0)
+        assert monitor.get_chart("LINE_001", "current_length_rate", "slave").center == pytest.approx(3.0)
+
+    def test_constant_baseline_not_judged(self):
+        # 设定值类参数基线极差为 0，设定值变化不应触发报警
+        chart = SpcChart(subgroup_size=5, baseline_subgroups=4)
+        for _ in range(20):
+            assert chart.update(500.0) == []
+        assert chart.ready
+        for value in (520.0, 500.0, 520.0, 500.0, 520.0):
+            assert chart.update(value) == []
+
+    def test_ewma_alarms_once_per_shift(self):
+        chart = SpcChart(subgroup_size=5, baseline_subgroups=4, cusum_h=1e9)
+        self._baseline(chart)
+        codes = []
+        for _ in range(30):
+            codes += [code for code, _ in chart.update(5.3)]
+        # 持续偏移只在进入失控时报警一次
+        assert codes.count("SPC_EWMA") == 1
+
+        for _ in range(30):
+            chart.update(5.0)
+        codes = []
+        for _ in range(30):
+            codes += [code for code, _ in chart.update(5.3)]
+        # 回到受控后再次偏移重新报警
+        assert codes.count("SPC_EWMA") == 1
+
+    def test_batch_change_resets(self):
+        monitor = SpcMonitor(["diameter"], subgroup_size=2, baseline_subgroups=1)
+        t0 = datetime(2024, 1, 1, 8, 0, 0)
+        for i, value in enumerate((5.0, 5.2)):
+            monitor.update({"timestamp": t0 + timedelta(seconds=i), "line_id": "LINE_001",
+                            "batch_product_number": "A", "diameter": value})
+        assert monitor.get_chart("LINE_001", "diameter").ready
+
+        monitor.update({"timestamp": t0 + timedelta(seconds=2), "line_id": "LINE_001",
+                        "batch_product_number": "B", "diameter": 9.0})
+        assert not monitor.get_chart("LINE_001", "diameter").ready
+
+
+class TestSpcAlarmRecords:
+    """测试 SPC 报警记录的生成 / Test SPC alarm records"""
+
+    class _Monitor:
+        def __init__(self, violations):
+            self.violations = violations
+
+        def update(self, record):
+            return self.violations
+
+    T0 = datetime(2024, 1, 1, 8, 0, 0)
+
+    def _check(self, violations, alarmed_records):
+        service = SensorDataService(None, spc_monitor=self._Monitor(violations))
+        sensor_data = {"timestamp": self.T0, "line_id": "LINE_001", "diameter": 5.5, "current_length": 120.0}
+        mutated = {k: {"value": v, "alarm": False, "alarmCode": "", "alarmMessage": ""}
+                   for k, v in sensor_data.items() if k not in ("timestamp", "line_id")}
+        return service._check_spc(sensor_data, mutated, alarmed_records), mutated
+
+    def test_merged_into_rule_alarm(self):
+        # 同一参数已有规则报警时，SPC 信息并入该记录，避免唯一约束下被丢弃
+        rule_record = AlarmRecordCreate(timestamp=self.T0, line_id="LINE_001", parameter_name="diameter",
+                                        parameter_value=5.5, alarm_message="直径超上限", alarm_rule_id=1)
+        violations = [SpcViolation(self.T0, "LINE_001", "diameter", 5.5, "SPC_WE1", "子组均值超出 3σ 控制限")]
+        records, _ = self._check(violations, [rule_record])
+        assert records == []
+        assert rule_record.alarm_message == "直径超上限；[SPC] 子组均值超出 3σ 控制限"
+
+    def test_rate_recorded_on_base_column(self):
+        violations = [SpcViolation(self.T0, "LINE_001", "current_length_rate", 2.5, "SPC_EWMA", "EWMA 超出控制限")]
+        records, mutated = self._check(violations, [])
+        assert len(records) == 1
+        assert records[0].parameter_name == "current_length"
+        assert records[0].parameter_value == 120.0
+        assert "变化率" in records[0].alarm_message
+        assert mutated["current_length"]["alarm"]
+        assert mutated["current_length"]["alarmCode"] == "SPC_EWMA"
+
+
+class TestProductionRunTracker:
+    """测试生产批次跟踪 / Test production run tracker"""
+
+    @staticmethod
+    def _record(ts: datetime, batch: str, diameter: float, length: float) -> dict:
+        return {"timestamp": ts, "line_id": "LINE_001", "batch_product_number": batch,
+                "diameter": diameter, "current_length": length, "target_length": 500.0}
+
+    def test_batch_change(self):
+        tracker = ProductionRunTracker()
+        t0 = datetime(2024, 1, 1, 8, 0, 0)
+        assert tracker.update(self._record(t0, "A", 5.0, 10.0)) is False
+        assert tracker.update(self._record(t0 + timedelta(seconds=1), "A", 5.2, 20.0)) is False
+        assert tracker.update(self._record(t0 + timedelta(seconds=2), "B", 4.8, 0.0)) is True
+
+        runs = {batch: delta for _, batch, delta in tracker.drain()}
+        assert runs["A"].row_count == 2
+        assert runs["A"].start_ts == t0
+        assert runs["A"].end_ts == t0 + timedelta(seconds=1)
+        assert runs["A"].diameter_sum / runs["A"].diameter_count == pytest.approx(5.1)
+        assert runs["A"].max_length == 20.0
+        assert runs["B"].row_count == 1
+        assert tracker.drain() == []
+
+    def test_restore_merges(self):
+        tracker = ProductionRunTracker()
+        t0 = datetime(2024, 1, 1, 8, 0, 0)
+        tracker.update(self._record(t0, "A", 5.0, 10.0))
+        rows = tracker.drain()
+        tracker.update(self._record(t0 + timedelta(seconds=1), "A", 6.0, 30.0))
+        tracker.restore(rows)
+
+        (_, _, delta), = tracker.drain()
+        assert delta.row_count == 2
+        assert delta.start_ts == t0
+        assert delta.diameter_min == 5.0
+        assert delta.diameter_max == 6.0
@@ -0,0 +1,43 @@
+"""
+按批次查询过滤条件单元测试
+Batch Query Condition Unit Tests
+
+用桩替换批次索引查询，只检查生成的 SQL 条件，不依赖数据库
+"""
+
+from datetime import datetime
+
+from sqlalchemy.dialects import postgresql
+
+from app.services.production_run_service import ProductionRunService
+from app.services.sensor_data_service import SensorDataService
+
+
+def _sql(conditions) -> str:
+    return " AND ".join(
+        str(condition.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+        for condition in conditions
+    )
+
+
+class TestBatchConditions:
+    """测试批次过滤条件 / Test batch conditions"""
+
+    def test_indexed_line_pruned_by_time(self, monkeypatch):
+        start, end = datetime(2024, 1, 1, 8), datetime(2024, 1, 1, 9)
+        monkeypatch.setattr(ProductionRunService, "get_time_ranges",
+                            lambda self, batch, line_ids=None: {"LINE_001": (start, end)})
+
+        conditions = SensorDataService(db=None)._batch_conditions("B001", ["LINE_001"])
+        sql = _sql(conditions["LINE_001"])
+        assert "sensor_data.timestamp >= '2024-01-01 08:00:00'" in sql
+        assert "sensor_data.timestamp <= " in sql
+        assert "sensor_data.batch_product_number = 'B001'" in sql
+
+    def test_unindexed_line_falls_back_to_batch_filter(self, monkeypatch):
+        monkeypatch.setattr(ProductionRunService, "get_time_ranges", lambda self, batch, line_ids=None: {})
+
+        conditions = SensorDataService(db=None)._batch_conditions("B001", ["LINE_001", "LINE_002"])
+        # 没有索引行时仍按批次号查询原始数据，而不是返回空结果
+        for line_id in ("LINE_001", "LINE_002"):
+            assert _sql(conditions[line_id]) == "sensor_data.batch_product_number = 'B001'"
@@ -0,0 +1,43 @@
+"""
+导出文件保留期清理单元测试
+Export Retention Unit Tests
+
+只测试文件清理逻辑，不依赖数据库
+"""
+
+import os
+import time
+
+from app.services.export_job_service import remove_expired_export_files
+
+
+def _touch(path, age_seconds: float) -> str:
+    with open(path, "wb") as f:
+        f.write(b"data")
+    mtime = time.time() - age_seconds
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+class TestExportRetention:
+    """测试过期导出文件清理 / Test expired export cleanup"""
+
+    def test_removes_only_expired_exports(self, tmp_path):
+        old = _touch(tmp_path / "sensor_data_export_1.xlsx", 3600)
+        fresh = _touch(tmp_path / "sensor_data_export_2.csv", 10)
+        stale_part = _touch(tmp_path / "sensor_data_export_3.xlsx.part", 3600)
+        other = _touch(tmp_path / "notes.txt", 3600)
+        (tmp_path / "cache").mkdir()
+        cached = _touch(tmp_path / "cache" / "abc.xlsx", 3600)
+
+        removed = remove_expired_export_files(str(tmp_path), time.time() - 600)
+
+        # 只有完整的导出文件对应需要标记过期的记录
+        assert removed == {1: old}
+        assert not os.path.exists(old)
+        assert not os.path.exists(stale_part)
+        for path in (fresh, other, cached):
+            assert os.path.exists(path)
+
+    def test_missing_directory(self, tmp_path):
+        assert remove_expired_export_files(str(tmp_path / "missing"), time.time()) == {}
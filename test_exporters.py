@@ -0,0 +1,179 @@
+"""
+导出引擎单元测试
+Export Engine Unit Tests
+"""
+
+import gzip
+import io
+import os
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from openpyxl import load_workbook
+
+from app.exporters import XlsxStreamWriter, ChunkSink, create_exporter, merge_parts, ExportCache, export_cache_key
+
+
+class TestXlsxStreamWriter:
+    """测试流式 XLSX 写入 / Test streaming xlsx writer"""
+
+    def test_write_sheets(self, tmp_path):
+        path = tmp_path / "export.xlsx"
+        with XlsxStreamWriter(str(path)) as writer:
+            count = writer.write_sheet("生产线_LINE_001", ["时间戳", "diameter"], (
+                (f"2024-01-01T08:00:0{i}", 5.0 + i) for i in range(3)
+            ))
+            writer.write_sheet("导出汇总", ["生产线", "记录数"], [["LINE_001", count]])
+
+        workbook = load_workbook(path, read_only=True)
+        assert workbook.sheetnames == ["生产线_LINE_001", "导出汇总"]
+        rows = list(workbook["生产线_LINE_001"].values)
+        assert rows[0] == ("时间戳", "diameter")
+        assert rows[-1] == ("2024-01-01T08:00:02", 7.0)
+        assert list(workbook["导出汇总"].values)[1] == ("LINE_001", 3)
+
+    def test_split_at_row_limit(self, tmp_path):
+        path = tmp_path / "export.xlsx"
+        title = "生产线_" + "X" * 40
+        with XlsxStreamWriter(str(path), max_rows=4) as writer:
+            assert writer.write_sheet(title, ["value"], ([i] for i in range(7))) == 7
+
+        workbook = load_workbook(path, read_only=True)
+        assert workbook.sheetnames == [title[:31], title[:29] + "_2", title[:29] + "_3"]
+        assert [len(list(workbook[name].values)) for name in workbook.sheetnames] == [4, 4, 2]
+        assert list(workbook.worksheets[2].values)[1] == (6,)
+
+    def test_empty_workbook(self, tmp_path):
+        path = tmp_path / "export.xlsx"
+        XlsxStreamWriter(str(path)).close()
+        assert load_workbook(path).sheetnames == ["Sheet1"]
+
+
+class TestTabularExporters:
+    """测试 CSV / Parquet / Arrow 写入 / Test tabular exporters"""
+
+    NAMES = ["line_id", "timestamp", "diameter"]
+    ROWS = [
+        ("LINE_001", datetime(2024, 1, 1, 8, 0, 0, tzinfo=timezone.utc), 5.0),
+        ("LINE_001", datetime(2024, 1, 1, 8, 0, 1, tzinfo=timezone.utc), None),
+    ]
+
+    def _export(self, fmt: str) -> bytes:
+        sink = ChunkSink()
+        exporter = create_exporter(fmt, sink, self.NAMES)
+        chunks = [sink.drain()]
+        exporter.write_rows(self.ROWS)
+        chunks.append(sink.drain())
+        exporter.close()
+        chunks.append(sink.drain())
+        return b"".join(chunks)
+
+    def test_csv(self):
+        data = self._export("csv")
+        assert data.startswith(b"\xef\xbb\xbf")
+        lines = data[3:].decode("utf-8").splitlines()
+        assert lines == [
+            "line_id,timestamp,diameter",
+            "LINE_001,2024-01-01T08:00:00+00:00,5.0",
+            "LINE_001,2024-01-01T08:00:01+00:00,",
+        ]
+
+    def test_csv_gzip(self):
+        assert gzip.decompress(self._export("csv.gz")).decode("utf-8").startswith("line_id,timestamp,diameter")
+
+    def test_parquet(self):
+        pq = pytest.importorskip("pyarrow.parquet")
+        table = pq.read_table(io.BytesIO(self._export("parquet")))
+        assert table.column("diameter").to_pylist() == [5.0, None]
+        assert table.num_rows == 2
+
+    def test_arrow(self):
+        pa = pytest.importorskip("pyarrow")
+        table = pa.ipc.open_stream(self._export("arrow")).read_all()
+        assert table.column("line_id").to_pylist() == ["LINE_001", "LINE_001"]
+
+
+class TestMergeParts:
+    """测试并行导出分片合并 / Test merging parallel export parts"""
+
+    NAMES = ["line_id", "timestamp", "diameter"]
+
+    def _parts(self, tmp_path, fmt: str):
+        paths = []
+        for i, line_id in enumerate(("LINE_001", "LINE_002")):
+            path = tmp_path / f"{i}.part"
+            with open(path, "wb") as f:
+                exporter = create_exporter(fmt, f, self.NAMES, header=False)
+                exporter.write_rows([(line_id, datetime(2024, 1, 1, 8, 0, i, tzinfo=timezone.utc), 5.0 + i)])
+                exporter.close()
+            paths.append(str(path))
+        return paths
+
+    def _merge(self, tmp_path, fmt: str) -> bytes:
+        sink = io.BytesIO()
+        merge_parts(fmt, self.NAMES, self._parts(tmp_path, fmt), sink)
+        return sink.getvalue()
+
+    def test_csv(self, tmp_path):
+        lines = self._merge(tmp_path, "csv")[3:].decode("utf-8").splitlines()
+        assert lines[0] == "line_id,timestamp,diameter"
+        assert [line.split(",")[0] for line in lines[1:]] == ["LINE_001", "LINE_002"]
+
+    def test_csv_gzip(self, tmp_path):
+        lines = gzip.decompress(self._merge(tmp_path, "csv.gz")).decode("utf-8").splitlines()
+        assert len(lines) == 3
+        assert lines[2].startswith("LINE_002")
+
+    def test_parquet(self, tmp_path):
+        pq = pytest.importorskip("pyarrow.parquet")
+        table = pq.read_table(io.BytesIO(self._merge(tmp_path, "parquet")))
+        assert table.column("line_id").to_pylist() == ["LINE_001", "LINE_002"]
+
+    def test_arrow(self, tmp_path):
+        pa = pytest.importorskip("pyarrow")
+        table = pa.ipc.open_stream(self._merge(tmp_path, "arrow")).read_all()
+        assert table.column("diameter").to_pylist() == [5.0, 6.0]
+
+
+class TestExportCache:
+    """测试导出缓存 / Test export cache"""
+
+    NOW = datetime(2024, 1, 2, 12, 0, 0, tzinfo=timezone.utc)
+
+    @staticmethod
+    def _filters(**overrides):
+        values = dict(
+            line_ids="LINE_001,LINE_002", parameter_names="diameter", component_id=None,
+            batch_product_number=None, start_time=datetime(2024, 1, 1, 0, 0, 0),
+            end_time=datetime(2024, 1, 1, 8, 0, 0), format="xlsx",
+        )
+        values.update(overrides)
+        return SimpleNamespace(**values)
+
+    def test_key_normalization(self):
+        key = export_cache_key(self._filters(), now=self.NOW)
+        assert key is not None
+        assert export_cache_key(self._filters(line_ids=" LINE_001, LINE_002,LINE_001"), now=self.NOW) == key
+        assert export_cache_key(self._filters(start_time=datetime(2024, 1, 1, 8, 0, 0, tzinfo=timezone(timedelta(hours=8)))), now=self.NOW) == key
+        assert export_cache_key(self._filters(format="csv"), now=self.NOW) != key
+        assert export_cache_key(self._filters(line_ids="LINE_002,LINE_001"), now=self.NOW) != key
+
+    def test_recent_range_not_cached(self):
+        assert export_cache_key(self._filters(end_time=datetime(2024, 1, 2, 11, 58, 0)), now=self.NOW) is None
+        assert export_cache_key(self._filters(end_time=None), now=self.NOW) is None
+
+    def test_lru_eviction(self, tmp_path):
+        cache = ExportCache(str(tmp_path / "cache"), max_bytes=250)
+        for i, key in enumerate(("a", "b", "c")):
+            source = tmp_path / f"{key}.tmp"
+            source.write_bytes(b"x" * 100)
+            cache.put(key, "csv", str(source))
+            os.utime(cache.path(key, "csv"), (1000 + i, 1000 + i))
+            if key == "b":
+                # 访问 a，使 b 成为最久未使用
+                os.utime(cache.path("a", "csv"), (1010, 1010))
+
+        assert cache.get("b", "csv") is None
+        assert cache.get("a", "csv") is not None
+        assert cache.get("c", "csv") is not None
@@ -0,0 +1,36 @@
+"""
+HTTP Range 解析单元测试
+HTTP Range Parsing Unit Tests
+"""
+
+import pytest
+
+from app.utils.http_range import parse_range_header, iter_file_range, RangeNotSatisfiable
+
+
+class TestParseRangeHeader:
+    """测试 Range 请求头解析 / Test Range header parsing"""
+
+    def test_no_range(self):
+        assert parse_range_header(None, 1000) is None
+        assert parse_range_header("items=0-10", 1000) is None
+        assert parse_range_header("bytes=0-10,20-30", 1000) is None
+
+    def test_ranges(self):
+        assert parse_range_header("bytes=0-499", 1000) == (0, 499)
+        assert parse_range_header("bytes=500-", 1000) == (500, 999)
+        assert parse_range_header("bytes=-200", 1000) == (800, 999)
+        assert parse_range_header("bytes=900-5000", 1000) == (900, 999)
+
+    def test_not_satisfiable(self):
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range_header("bytes=1000-", 1000)
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range_header("bytes=10-5", 1000)
+
+
+def test_iter_file_range(tmp_path):
+    path = tmp_path / "export.xlsx"
+    path.write_bytes(bytes(range(256)) * 4)
+    data = b"".join(iter_file_range(str(path), 250, 769, chunk_size=100))
+    assert data == (bytes(range(256)) * 4)[250:770]
@@ -0,0 +1,47 @@
+"""
+KPI 缓存键与缓存时长单元测试
+KPI Cache Key Unit Tests
+
+只测试时间范围对齐和 TTL 选择，不依赖数据库
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import settings
+from app.schemas.sensor_data import KpiQuery
+from app.services.kpi_service import KpiService, _cache_ttl
+
+
+def _key(start: datetime, end: datetime):
+    return KpiService(db=None)._cache_key(KpiQuery(line_ids=["LINE_002", "LINE_001"], start_time=start, end_time=end))
+
+
+class TestKpiCacheKey:
+    """测试 KPI 缓存键 / Test KPI cache key"""
+
+    def test_short_range_not_collapsed(self):
+        t0 = datetime(2024, 1, 1, 8, 0, 10, tzinfo=timezone.utc)
+        line_ids, start, end = _key(t0, t0 + timedelta(seconds=30))
+        assert line_ids == ("LINE_001", "LINE_002")
+        assert start == datetime(2024, 1, 1, 8, 0, tzinfo=timezone.utc)
+        assert end == datetime(2024, 1, 1, 8, 1, tzinfo=timezone.utc)
+
+    def test_aligned_end_unchanged(self):
+        t0 = datetime(2024, 1, 1, 8, 0, tzinfo=timezone.utc)
+        _, start, end = _key(t0, t0 + timedelta(minutes=5))
+        assert (start, end) == (t0, t0 + timedelta(minutes=5))
+
+
+class TestKpiCacheTtl:
+    """测试 KPI 缓存时长 / Test KPI cache TTL"""
+
+    def test_recent_range_keeps_short_ttl(self):
+        now = datetime(2024, 1, 1, 9, 0, tzinfo=timezone.utc)
+        # 刚结束的范围仍可能补入迟到数据
+        assert _cache_ttl(now - timedelta(minutes=1), now) is None
+        assert _cache_ttl(now + timedelta(minutes=1), now) is None
+
+    def test_old_range_uses_closed_ttl(self):
+        now = datetime(2024, 1, 1, 9, 0, tzinfo=timezone.utc)
+        end = now - timedelta(seconds=settings.KPI_CACHE_LATE_DATA_SECONDS)
+        assert _cache_ttl(end, now) == settings.KPI_CACHE_CLOSED_TTL_SECONDS
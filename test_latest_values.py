@@ -0,0 +1,65 @@
+"""
+共享内存最新值缓存单元测试
+LatestValueCache Unit Tests
+"""
+
+import pytest
+
+from app.core.latest_values import LatestValueCache, to_production_data
+
+PARAMETERS = ("diameter", "temp_body_zone1", "motor_current")
+
+
+@pytest.fixture
+def cache():
+    cache = LatestValueCache(PARAMETERS, slots=4)
+    yield cache
+    cache.close()
+
+
+def _record(line_id: str, diameter: float) -> dict:
+    return {
+        "timestamp": "2024-01-01T08:00:00",
+        "line_id": line_id,
+        "component_id": "master",
+        "batch_product_number": "P-1234",
+        "diameter": diameter,
+        "temp_body_zone1": None,
+        "motor_current": 42.0,
+    }
+
+
+class TestLatestValueCache:
+    """测试最新值缓存 / Test latest value cache"""
+
+    def test_put_overwrites_slot(self, cache):
+        cache.put(_record("LINE_001", 5.0))
+        cache.put(_record("LINE_001", 5.5), alarms=["diameter"])
+
+        record, alarms = cache.get("LINE_001", "master")
+        assert record["diameter"] == 5.5
+        assert record["temp_body_zone1"] is None
+        assert record["batch_product_number"] == "P-1234"
+        assert alarms == ["diameter"]
+        assert len(cache.get_all()) == 1
+
+    def test_slots_full(self, cache):
+        for i in range(6):
+            cache.put(_record(f"LINE_00{i}", float(i)))
+        assert len(cache.get_all()) == 4
+        assert cache.get("LINE_005", "master") is None
+
+    def test_attach_by_name(self, cache):
+        cache.put(_record("LINE_001", 5.0))
+        other = LatestValueCache(PARAMETERS, slots=4, name=cache.name)
+        try:
+            record, _ = other.get("LINE_001", "master")
+            assert record["diameter"] == 5.0
+        finally:
+            other.close()
+
+    def test_to_production_data(self, cache):
+        data = to_production_data(_record("LINE_001", 5.0), ["diameter"])
+        assert data["line_id"] == "LINE_001"
+        assert data["diameter"] == {"value": 5.0, "alarm": True, "alarmCode": "", "alarmMessage": ""}
+        assert data["motor_current"]["alarm"] is False
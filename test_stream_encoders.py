@@ -0,0 +1,139 @@
+"""
+流式编码工具单元测试
+Stream Encoder Unit Tests
+
+编码结果按客户端的方式解析回来，检查与原始行/列一致；列式查询用桩替换数据库会话
+"""
+
+import json
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from app.schemas.sensor_data import SensorDataColumnsFilter, SensorDataColumnsResponse
+from app.services.sensor_data_service import SensorDataService
+from app.utils.stream_encoders import (
+    ArrowStreamEncoder,
+    arrow_schema,
+    encode_columns_arrow,
+    encode_columns_json,
+    encode_ndjson,
+)
+
+NAMES = ["timestamp", "line_id", "component_id", "diameter", "current_length"]
+T0 = datetime(2024, 1, 1, 8, 0, 0, tzinfo=timezone.utc)
+T1 = datetime(2024, 1, 1, 8, 0, 1, 500000, tzinfo=timezone.utc)
+ROWS = [
+    (T0, "LINE_001", "master", 5.01, 120.0),
+    (T1, "LINE_001", "slave", None, 121.5),
+]
+
+
+class _Query:
+    """只支持列式查询用到的链式调用"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def filter(self, *conditions):
+        return self
+
+    def order_by(self, *columns):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class _Session:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def query(self, *columns):
+        return _Query(self.rows)
+
+
+class TestNdjson:
+    """测试 NDJSON 编码 / Test NDJSON encoding"""
+
+    def test_round_trip(self):
+        lines = encode_ndjson(NAMES, ROWS).decode("utf-8").splitlines()
+        parsed = [json.loads(line) for line in lines]
+        assert parsed == [
+            {"timestamp": T0.isoformat(), "line_id": "LINE_001", "component_id": "master",
+             "diameter": 5.01, "current_length": 120.0},
+            {"timestamp": T1.isoformat(), "line_id": "LINE_001", "component_id": "slave",
+             "diameter": None, "current_length": 121.5},
+        ]
+        assert datetime.fromisoformat(parsed[1]["timestamp"]) == T1
+
+    def test_empty_batch(self):
+        assert encode_ndjson(NAMES, []) == b""
+
+
+class TestArrowStream:
+    """测试 Arrow IPC 流式编码 / Test Arrow IPC stream encoding"""
+
+    def test_round_trip(self):
+        pa = pytest.importorskip("pyarrow")
+
+        encoder = ArrowStreamEncoder(NAMES)
+        # 分批写入，客户端拼接后作为一个流读取
+        data = encoder.encode(ROWS[:1]) + encoder.encode([]) + encoder.encode(ROWS[1:]) + encoder.close()
+        table = pa.ipc.open_stream(data).read_all()
+
+        assert table.schema.equals(arrow_schema(NAMES))
+        assert table.num_rows == 2
+        assert table.column("timestamp").to_pylist() == [T0, T1]
+        assert table.column("diameter").to_pylist() == [5.01, None]
+        assert table.to_pylist()[1]["component_id"] == "slave"
+
+
+class TestColumns:
+    """测试列式查询与编码 / Test columnar query and encoding"""
+
+    @staticmethod
+    def _columns(rows):
+        filters = SensorDataColumnsFilter(line_id="LINE_001", start_time=T0, end_time=T1,
+                                          parameter_names=["diameter", "current_length"])
+        return SensorDataService(_Session(rows)).get_sensor_data_columns(filters)
+
+    def test_query_keeps_nulls(self):
+        timestamps_ms, columns = self._columns([(T0, 5.01, 120.0), (T1, None, 121.5)])
+        assert timestamps_ms.tolist() == [int(T0.timestamp() * 1000), int(T1.timestamp() * 1000)]
+        assert np.isnan(columns["diameter"][1])
+
+    def test_json_round_trip(self):
+        timestamps_ms, columns = self._columns([(T0, 5.01, 120.0), (T1, None, 121.5)])
+        payload = json.loads(encode_columns_json("LINE_001", timestamps_ms, columns))
+
+        # 与接口声明的响应模型一致
+        response = SensorDataColumnsResponse(**payload)
+        assert response.count == 2
+        assert [datetime.fromtimestamp(ts / 1000, tz=timezone.utc) for ts in response.timestamps] == [T0, T1]
+        assert response.columns == {"diameter": [5.01, None], "current_length": [120.0, 121.5]}
+
+    def test_arrow_round_trip(self):
+        pa = pytest.importorskip("pyarrow")
+
+        timestamps_ms, columns = self._columns([(T0, 5.01, 120.0), (T1, None, 121.5)])
+        table = pa.ipc.open_stream(encode_columns_arrow(timestamps_ms, columns)).read_all()
+
+        assert table.column_names == ["timestamp", "diameter", "current_length"]
+        assert table.schema.field("timestamp").type == pa.timestamp("ms", tz="UTC")
+        assert table.column("timestamp").to_pylist() == [T0, T1]
+        assert table.column("diameter").to_pylist() == [5.01, None]
+        assert table.column("diameter").null_count == 1
+
+    def test_empty_result(self):
+        pa = pytest.importorskip("pyarrow")
+
+        timestamps_ms, columns = self._columns([])
+        assert json.loads(encode_columns_json("LINE_001", timestamps_ms, columns)) == {
+            "line_id": "LINE_001", "count": 0, "timestamps": [],
+            "columns": {"diameter": [], "current_length": []},
+        }
+        table = pa.ipc.open_stream(encode_columns_arrow(timestamps_ms, columns)).read_all()
+        assert table.num_rows == 0
+        assert table.column_names == ["timestamp", "diameter", "current_length"]
@@ -0,0 +1,35 @@
+"""
+进程内 TTL 缓存单元测试
+TTLCache Unit Tests
+"""
+
+import time
+
+from app.utils.cache import TTLCache
+
+
+class TestTTLCache:
+    """测试 TTLCache / Test TTLCache"""
+
+    def test_get_set(self):
+        cache = TTLCache(ttl_seconds=60)
+        cache.set(("LINE_001",), 1)
+        assert cache.get(("LINE_001",)) == 1
+        assert cache.get(("LINE_002",)) is None
+
+    def test_expiry(self):
+        cache = TTLCache(ttl_seconds=60)
+        cache.set("k", "v", ttl_seconds=0.01)
+        time.sleep(0.02)
+        assert cache.get("k") is None
+        assert len(cache) == 0
+
+    def test_lru_eviction(self):
+        cache = TTLCache(ttl_seconds=60, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # a 变为最近使用
+        cache.set("c", 3)
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
@@ -0,0 +1,72 @@
+"""
+Worker 进程到事件循环的广播通道单元测试
+BroadcastBridge Unit Tests
+"""
+
+import asyncio
+import json
+import multiprocessing
+import time
+
+from app.websocket.bridge import BroadcastBridge, BroadcastPublisher
+
+
+def _publish_from_worker(publisher: BroadcastPublisher, count: int):
+    for i in range(count):
+        publisher.publish("production_data", {"line_id": str(i % 2), "component_id": "master", "seq": i})
+
+
+def test_messages_from_worker_process_are_delivered():
+    bridge = BroadcastBridge()
+    received = []
+
+    async def run():
+        bridge.attach(asyncio.get_running_loop(), lambda *message: received.append(message))
+        worker = multiprocessing.get_context("fork").Process(target=_publish_from_worker, args=(bridge.publisher, 50))
+        worker.start()
+        deadline = time.monotonic() + 5
+        while len(received) < 50 and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        worker.join()
+        bridge.detach()
+
+    try:
+        asyncio.run(run())
+    finally:
+        bridge.close()
+
+    assert len(received) == 50
+    message_type, routing, frame = received[0]
+    assert message_type == "production_data"
+    assert routing == {"line_id": "0", "component_id": "master", "alarms": ()}
+    assert json.loads(frame)["data"]["seq"] == 0
+
+
+def test_delivery_is_immediate_without_polling():
+    bridge = BroadcastBridge()
+
+    async def run():
+        delivered = asyncio.Event()
+        bridge.attach(asyncio.get_running_loop(), lambda *message: delivered.set())
+        start = time.perf_counter()
+        bridge.publisher.publish("msg", {"text": "hello"})
+        await asyncio.wait_for(delivered.wait(), timeout=1)
+        bridge.detach()
+        return time.perf_counter() - start
+
+    try:
+        latency = asyncio.run(run())
+    finally:
+        bridge.close()
+    assert latency < 0.05
+
+
+def test_publish_drops_when_receiver_is_full():
+    bridge = BroadcastBridge(buffer_bytes=4096)
+    try:
+        results = [bridge.publisher.publish("msg", {"text": "x" * 1000}) for _ in range(2000)]
+    finally:
+        bridge.close()
+    assert results[0] is True
+    assert results[-1] is False
+    assert bridge.publisher.dropped > 0
@@ -0,0 +1,101 @@
+"""
+WebSocket 广播总线单元测试
+Broadcast Bus Unit Tests
+"""
+
+import asyncio
+import base64
+import json
+import pickle
+import time
+import zlib
+
+import pytest
+
+from app.websocket.bus import (
+    LocalBus,
+    PostgresBus,
+    PostgresPublisher,
+    create_bus,
+    decode_envelope,
+    encode_envelope,
+)
+
+
+def _data():
+    return {
+        "line_id": "2",
+        "component_id": "master",
+        "diameter": {"value": 12.0, "alarm": True, "alarmCode": "", "alarmMessage": "直径超上限"},
+    }
+
+
+def test_envelope_round_trip():
+    message_type, routing, frame = decode_envelope(encode_envelope("production_data", _data()).encode("utf-8"))
+    assert message_type == "production_data"
+    assert routing == {"line_id": "2", "component_id": "master", "alarms": ["diameter"]}
+    assert json.loads(frame)["data"]["diameter"]["alarmMessage"] == "直径超上限"
+
+
+def test_compressed_envelope_round_trip():
+    envelope = encode_envelope("msg", {"text": "x" * 10000})
+    compressed = "z:" + base64.b64encode(zlib.compress(envelope.encode("utf-8"))).decode("ascii")
+    assert decode_envelope(compressed)[2] == envelope.partition("\n")[2]
+
+
+def test_publisher_pickles_without_connection():
+    publisher = PostgresPublisher("postgresql://localhost/scada", "scada_ws_broadcast")
+    publisher._conn = object()
+    restored = pickle.loads(pickle.dumps(publisher))
+    assert restored._conn is None
+    assert restored.channel == "scada_ws_broadcast"
+
+
+def test_create_bus():
+    bus = create_bus("local")
+    try:
+        assert isinstance(bus, LocalBus)
+    finally:
+        bus.close()
+    with pytest.raises(ValueError):
+        create_bus("redis")
+
+
+def test_publisher_connect_timeout(monkeypatch):
+    import psycopg2
+
+    calls = []
+
+    def connect(dsn, **kwargs):
+        calls.append(kwargs)
+        raise psycopg2.OperationalError("timeout expired")
+
+    monkeypatch.setattr(psycopg2, "connect", connect)
+    publisher = PostgresPublisher("postgresql://localhost/scada", "scada_ws_broadcast", connect_timeout=3)
+    assert publisher.publish("msg", {"text": "x"}) is False
+    assert calls == [{"connect_timeout": 3}]
+
+
+def test_postgres_bus_connects_off_event_loop(monkeypatch):
+    """数据库不可达时连接在线程池中阻塞，事件循环照常运行，失败后安排重连"""
+    bus = PostgresBus("postgresql://localhost/scada", "scada_ws_broadcast", connect_timeout=1)
+
+    def open_listen_connection():
+        time.sleep(0.3)
+        raise OSError("connection refused")
+
+    monkeypatch.setattr(bus, "_open_listen_connection", open_listen_connection)
+
+    async def run():
+        bus.start(asyncio.get_running_loop(), lambda *args: None)
+        ticks = 0
+        while bus._connecting is not None:
+            ticks += 1
+            await asyncio.sleep(0.01)
+        reconnect = bus._reconnect
+        bus.stop()
+        return ticks, reconnect
+
+    ticks, reconnect = asyncio.run(run())
+    assert ticks > 10
+    assert reconnect is not None and reconnect.cancelled()
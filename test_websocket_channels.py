@@ -0,0 +1,115 @@
+"""
+WebSocket 频道订阅索引单元测试
+ChannelIndex Unit Tests
+"""
+
+import asyncio
+
+from app.websocket.channels import ChannelIndex, normalize_channel
+
+
+def test_normalize_channel():
+    assert normalize_channel("production_data") == "production_data:*"
+    assert normalize_channel(" production_data : 3 ") == "production_data:3"
+    assert normalize_channel("*:*") == "*"
+    assert normalize_channel(":3") == "*:3"
+
+
+def test_match_by_line_and_type():
+    index = ChannelIndex()
+    index.subscribe("line3", ["production_data:3"])
+    index.subscribe("all_data", ["production_data"])
+    index.subscribe("line5_any", ["*:5"])
+    index.subscribe("everything", [])
+
+    assert index.match("production_data", "3") == {"line3", "all_data", "everything"}
+    assert index.match("production_data", "5") == {"all_data", "line5_any", "everything"}
+    assert index.match("system_status") == {"everything"}
+
+
+def test_resubscribe_replaces_and_unsubscribe_cleans_index():
+    index = ChannelIndex()
+    index.subscribe("c", ["production_data:3"])
+    index.subscribe("c", ["production_data:4"])
+    assert index.match("production_data", "3") == set()
+    assert index.match("production_data", "4") == {"c"}
+
+    index.unsubscribe("c")
+    assert index.index == {}
+    assert len(index) == 0
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        self.sent.append(message)
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+def test_manager_routes_production_data_to_subscribed_lines():
+    from app.websocket.manager import WebSocketManager
+
+    async def run():
+        manager = WebSocketManager()
+        line3, line5 = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(line3, "line3")
+        await manager.connect(line5, "line5")
+        await manager.subscribe_client(line3, ["production_data:3"])
+        await manager.subscribe_client(line5, ["production_data:5"])
+        await asyncio.sleep(0.01)
+        line3.sent.clear()
+        line5.sent.clear()
+
+        await manager.send_message("production_data", {"line_id": 3, "component_id": "master"})
+        await asyncio.sleep(0.01)
+        for ws in (line3, line5):
+            manager.disconnect(ws)
+        return line3.sent, line5.sent
+
+    line3_sent, line5_sent = asyncio.run(run())
+    assert len(line3_sent) == 1 and '"line_id":3' in line3_sent[0]
+    assert line5_sent == []
+
+
+class FakeBinaryWebSocket(FakeWebSocket):
+    def __init__(self):
+        super().__init__()
+        self.subprotocol = None
+
+    async def accept(self, subprotocol=None):
+        self.subprotocol = subprotocol
+
+    async def send_bytes(self, message: bytes):
+        self.sent.append(message)
+
+
+def test_manager_sends_shared_msgpack_frames_to_binary_clients():
+    import msgpack
+
+    from app.websocket.manager import WebSocketManager
+
+    async def run():
+        manager = WebSocketManager()
+        a, b = FakeBinaryWebSocket(), FakeBinaryWebSocket()
+        await manager.connect(a, "a", subprotocol="scada.msgpack")
+        await manager.connect(b, "b", subprotocol="scada.msgpack")
+        await asyncio.sleep(0.01)
+        a.sent.clear()
+        b.sent.clear()
+        await manager.send_message("production_data", {"line_id": "1", "component_id": "master"})
+        await asyncio.sleep(0.01)
+        for ws in (a, b):
+            manager.disconnect(ws)
+        return a, b
+
+    a, b = asyncio.run(run())
+    assert a.subprotocol == "scada.msgpack"
+    assert a.sent[0] is b.sent[0]
+    assert msgpack.unpackb(a.sent[0])["data"]["line_id"] == "1"
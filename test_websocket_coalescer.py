@@ -0,0 +1,34 @@
+"""
+WebSocket 广播合并单元测试
+Coalescer Unit Tests
+"""
+
+from app.websocket.coalescer import AlarmStateTracker, message_routing
+
+
+def _frame(diameter_alarm: bool) -> dict:
+    return {
+        "line_id": "1",
+        "component_id": "master",
+        "diameter": {"value": 12.0, "alarm": diameter_alarm, "alarmCode": "", "alarmMessage": ""},
+        "motor_current": {"value": 40.0, "alarm": False, "alarmCode": "", "alarmMessage": ""},
+    }
+
+
+def test_message_routing_collects_alarms():
+    assert message_routing("production_data", _frame(True)) == {
+        "line_id": "1",
+        "component_id": "master",
+        "alarms": ("diameter",),
+    }
+    assert message_routing("msg", "text") == {}
+
+
+def test_alarm_state_tracker_reports_transitions_only():
+    tracker = AlarmStateTracker()
+    key = ("production_data", "1", "master")
+    assert tracker.changed(key, ()) is False
+    assert tracker.changed(key, ("diameter",)) is True
+    assert tracker.changed(key, ("diameter",)) is False
+    assert tracker.changed(key, ()) is True
+    assert tracker.changed(("production_data", "2", "master"), ("diameter",)) is True
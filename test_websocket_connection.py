@@ -0,0 +1,122 @@
+"""
+WebSocket 客户端发送队列单元测试
+ClientConnection Unit Tests
+"""
+
+import asyncio
+
+from app.websocket.connection import SLOW_CLIENT_CLOSE_CODE, ClientConnection
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent = []
+        self.close_code = None
+
+    async def send_text(self, message: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.sent.append(message)
+
+    async def close(self, code: int = 1000):
+        self.close_code = code
+
+
+def test_drop_oldest_when_queue_full():
+    async def run():
+        ws = FakeWebSocket()
+        client = ClientConnection(ws, max_queue=3)
+        for i in range(5):
+            client.enqueue(str(i))
+        assert client.dropped == 2
+        client.start()
+        await asyncio.sleep(0.01)
+        client.close()
+        return ws.sent
+
+    assert asyncio.run(run()) == ["2", "3", "4"]
+
+
+def test_coalesce_keeps_latest_in_place():
+    async def run():
+        ws = FakeWebSocket()
+        client = ClientConnection(ws, max_queue=10)
+        client.enqueue("line1-a", ("production_data", "1", "master"))
+        client.enqueue("alarm")
+        client.enqueue("line1-b", ("production_data", "1", "master"))
+        assert client.queue_size == 2
+        assert client.coalesced == 1
+        client.start()
+        await asyncio.sleep(0.01)
+        client.close()
+        return ws.sent
+
+    assert asyncio.run(run()) == ["line1-b", "alarm"]
+
+
+def test_slow_client_is_disconnected_on_timeout():
+    async def run():
+        ws = FakeWebSocket(delay=1.0)
+        closed = []
+        client = ClientConnection(ws, send_timeout=0.05, on_close=closed.append)
+        client.start()
+        client.enqueue("x")
+        await asyncio.sleep(0.2)
+        return client, closed, ws
+
+    client, closed, ws = asyncio.run(run())
+    assert client.closed
+    assert closed == [client]
+    assert ws.close_code == SLOW_CLIENT_CLOSE_CODE
+    assert not client.enqueue("y")
+
+
+def test_client_disconnected_after_drop_limit():
+    async def run():
+        ws = FakeWebSocket()
+        client = ClientConnection(ws, max_queue=2, max_dropped=3)
+        results = [client.enqueue(str(i)) for i in range(6)]
+        await asyncio.sleep(0)
+        return client, results, ws
+
+    client, results, ws = asyncio.run(run())
+    assert results == [True, True, True, True, True, False]
+    assert client.closed
+    assert ws.close_code == SLOW_CLIENT_CLOSE_CODE
+
+
+def test_window_sends_latest_frame_per_key():
+    async def run():
+        ws = FakeWebSocket()
+        client = ClientConnection(ws, window=0.05)
+        client.start()
+        key = ("production_data", "1", "master")
+        for i in range(10):
+            client.enqueue(f"line1-{i}", key)
+        await asyncio.sleep(0.01)
+        first = list(ws.sent)
+        await asyncio.sleep(0.08)
+        client.close()
+        return first, ws.sent, client.coalesced
+
+    first, sent, coalesced = asyncio.run(run())
+    assert first == ["line1-0"]
+    assert sent == ["line1-0", "line1-9"]
+    assert coalesced == 8
+
+
+def test_urgent_frame_bypasses_window():
+    async def run():
+        ws = FakeWebSocket()
+        client = ClientConnection(ws, window=10)
+        client.start()
+        key = ("production_data", "1", "master")
+        client.enqueue("normal-0", key)
+        client.enqueue("normal-1", key)
+        client.enqueue("alarm-on", key, urgent=True)
+        await asyncio.sleep(0.01)
+        client.close()
+        return ws.sent
+
+    assert asyncio.run(run()) == ["normal-0", "alarm-on"]
@@ -0,0 +1,97 @@
+"""
+production_data 增量协议单元测试
+Delta Protocol Unit Tests
+"""
+
+import asyncio
+import json
+
+from app.websocket.delta import DeltaClientState, DeltaEncoder, make_snapshot
+
+
+def _field(value, alarm=False, message=""):
+    return {"value": value, "alarm": alarm, "alarmCode": "", "alarmMessage": message}
+
+
+def _data(diameter, current=40.0, diameter_alarm=False):
+    return {
+        "timestamp": "2024-01-01T08:00:00",
+        "line_id": "1",
+        "component_id": "master",
+        "batch_product_number": "P-1234",
+        "diameter": _field(diameter, diameter_alarm, "直径超上限" if diameter_alarm else ""),
+        "motor_current": _field(current),
+    }
+
+
+KEY = ("production_data", "1", "master")
+
+
+def test_keyframe_then_changed_fields_only():
+    encoder = DeltaEncoder()
+    state = DeltaClientState()
+
+    first = json.loads(state.next_frame(encoder, KEY, make_snapshot(_data(12.0))))["data"]
+    assert first["key"] is True
+    assert first["values"]["diameter"] == 12.0
+    assert first["values"]["line_id"] == "1"
+    assert first["alarms"] == []
+
+    second = json.loads(state.next_frame(encoder, KEY, make_snapshot(_data(12.5, diameter_alarm=True))))["data"]
+    assert second["key"] is False
+    assert second["base"] == first["seq"]
+    assert second["values"] == {"diameter": 12.5}
+    assert second["alarms"] == [["diameter", "", "直径超上限"]]
+
+    third = json.loads(state.next_frame(encoder, KEY, make_snapshot(_data(12.5))))["data"]
+    assert third["values"] == {}
+    assert third["cleared"] == ["diameter"]
+
+
+def test_encoded_frame_shared_between_clients_with_same_base():
+    encoder = DeltaEncoder()
+    a, b = DeltaClientState(), DeltaClientState()
+    key_snapshot = make_snapshot(_data(12.0))
+    a.next_frame(encoder, KEY, key_snapshot)
+    b.next_frame(encoder, KEY, key_snapshot)
+
+    target = make_snapshot(_data(13.0))
+    assert a.next_frame(encoder, KEY, target) is b.next_frame(encoder, KEY, target)
+    assert encoder.encoded == 2
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        self.sent.append(json.loads(message))
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+def test_manager_sends_delta_relative_to_last_delivered_frame():
+    from app.websocket.manager import WebSocketManager
+
+    async def run():
+        manager = WebSocketManager()
+        ws = FakeWebSocket()
+        await manager.connect(ws, "delta", client_class="realtime", protocol=2)
+        await manager.send_message("production_data", _data(12.0))
+        await asyncio.sleep(0.01)
+        # 两帧在队列中合并，只发送最后一帧
+        await manager.send_message("production_data", _data(12.1))
+        await manager.send_message("production_data", _data(12.2, current=41.0))
+        await asyncio.sleep(0.01)
+        manager.disconnect(ws)
+        return [m["data"] for m in ws.sent if m["type"] == "production_data"]
+
+    frames = asyncio.run(run())
+    assert len(frames) == 2
+    assert frames[0]["key"] is True
+    assert frames[1]["base"] == frames[0]["seq"]
+    assert frames[1]["values"] == {"diameter": 12.2, "motor_current": 41.0}
@@ -0,0 +1,75 @@
+"""
+WebSocket 消息帧编码单元测试
+WebSocket Frame Encoding Unit Tests
+"""
+
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from app.websocket.frames import encode_message
+from app.websocket.types import WebSocketMessage
+
+
+def test_encode_message_matches_pydantic_model():
+    timestamp = datetime(2024, 1, 1, 8, 0, 0, 123456)
+    data = {"line_id": "1", "diameter": 12.5, "alarms": [], "timestamp": timestamp}
+
+    frame = encode_message("production_data", data, timestamp)
+    expected = WebSocketMessage(type="production_data", timestamp=timestamp, data=data).model_dump_json()
+
+    assert json.loads(frame) == json.loads(expected)
+
+
+def test_encode_message_handles_non_json_types():
+    frame = encode_message("msg", {"value": Decimal("1.5"), "text": "温度"})
+    payload = json.loads(frame)
+    assert payload["data"] == {"value": 1.5, "text": "温度"}
+    assert payload["type"] == "msg"
+
+
+def test_encode_message_without_orjson(monkeypatch):
+    from app.websocket import frames
+
+    monkeypatch.setattr(frames, "orjson", None)
+    timestamp = datetime(2024, 1, 1, 8, 0, 0)
+    payload = json.loads(encode_message("heartbeat", {"pong": True}, timestamp))
+    assert payload == {"type": "heartbeat", "timestamp": "2024-01-01T08:00:00", "data": {"pong": True}}
+
+
+def test_select_subprotocol():
+    from app.websocket.frames import select_subprotocol
+
+    assert select_subprotocol(["scada.msgpack", "scada.json"]) == "scada.msgpack"
+    assert select_subprotocol(["graphql-ws", "scada.json"]) == "scada.json"
+    assert select_subprotocol([]) is None
+
+
+def test_to_binary_matches_json_frame():
+    import msgpack
+
+    from app.websocket.frames import to_binary
+
+    frame = encode_message("production_data", {"line_id": "1", "diameter": {"value": 12.5, "alarm": False}})
+    assert msgpack.unpackb(to_binary(frame)) == json.loads(frame)
+
+
+def test_binary_history_uses_packed_arrays():
+    import math
+    import struct
+
+    import msgpack
+
+    from app.websocket.frames import encode_binary_message
+
+    history = {
+        "line_id": "1",
+        "timestamps_ms": [1000, 2000],
+        "values": {"diameter": [12.5, None]},
+        "alarms": {"diameter": [1]},
+    }
+    data = msgpack.unpackb(encode_binary_message("production_history", history))["data"]
+    assert struct.unpack("<2q", data["timestamps_ms"]) == (1000, 2000)
+    first, second = struct.unpack("<2d", data["values"]["diameter"])
+    assert first == 12.5 and math.isnan(second)
+    assert data["alarms"] == {"diameter": [1]}
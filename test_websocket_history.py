@@ -0,0 +1,94 @@
+"""
+WebSocket 历史回放缓冲区单元测试
+HistoryBuffer Unit Tests
+"""
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from app.websocket.history import HistoryBuffer
+
+PARAMETERS = ("diameter", "motor_current", "temp_body_zone1")
+
+
+def _frame(line_id: str, timestamp: datetime, diameter: float, alarm: bool = False) -> dict:
+    return {
+        "timestamp": timestamp.isoformat(),
+        "line_id": line_id,
+        "component_id": "master",
+        "batch_product_number": "P-1234",
+        "diameter": {"value": diameter, "alarm": alarm, "alarmCode": "", "alarmMessage": ""},
+        "motor_current": {"value": 40.0, "alarm": False, "alarmCode": "", "alarmMessage": ""},
+    }
+
+
+def test_replay_returns_columns_within_window():
+    buffer = HistoryBuffer(PARAMETERS, capacity=100, max_seconds=600)
+    start = datetime(2024, 1, 1, 8, 0, 0)
+    for i in range(10):
+        buffer.add(_frame("1", start + timedelta(seconds=i), 12.0 + i, alarm=(i == 9)))
+
+    now = (start + timedelta(seconds=9)).timestamp()
+    [history] = buffer.replay(3, now=now)
+    assert history["line_id"] == "1"
+    assert history["values"]["diameter"] == [18.0, 19.0, 20.0, 21.0]
+    assert history["alarms"] == {"diameter": [3]}
+    # 全为空的参数不返回
+    assert "temp_body_zone1" not in history["values"]
+    assert len(history["timestamps_ms"]) == 4
+
+
+def test_ring_buffer_keeps_latest_samples_in_order():
+    buffer = HistoryBuffer(PARAMETERS, capacity=4, max_seconds=600)
+    start = datetime(2024, 1, 1, 8, 0, 0)
+    for i in range(10):
+        buffer.add(_frame("1", start + timedelta(seconds=i), float(i)))
+
+    [history] = buffer.replay(600, now=(start + timedelta(seconds=9)).timestamp())
+    assert history["values"]["diameter"] == [6.0, 7.0, 8.0, 9.0]
+
+
+def test_replay_filters_lines():
+    buffer = HistoryBuffer(PARAMETERS, capacity=10, max_seconds=600)
+    now = datetime(2024, 1, 1, 8, 0, 0)
+    buffer.add(_frame("1", now, 1.0))
+    buffer.add(_frame("2", now, 2.0))
+    result = buffer.replay(60, now=now.timestamp(), accept=lambda line_id: line_id == "2")
+    assert [h["line_id"] for h in result] == ["2"]
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        self.sent.append(json.loads(message))
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+def test_subscribe_with_replay_sends_history_for_subscribed_lines():
+    from app.websocket.manager import WebSocketManager
+
+    async def run():
+        manager = WebSocketManager()
+        manager.history = HistoryBuffer(PARAMETERS, capacity=10, max_seconds=600)
+        now = datetime.now()
+        manager.history.add(_frame("1", now, 1.0))
+        manager.history.add(_frame("2", now, 2.0))
+
+        ws = FakeWebSocket()
+        await manager.connect(ws, "replay")
+        await manager.subscribe_client(ws, ["production_data:2"], replay_seconds=60)
+        await asyncio.sleep(0.01)
+        manager.disconnect(ws)
+        return [m["data"] for m in ws.sent if m["type"] == "production_history"]
+
+    histories = asyncio.run(run())
+    assert [h["line_id"] for h in histories] == ["2"]
+    assert histories[0]["values"]["diameter"] == [2.0]